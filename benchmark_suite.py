@@ -0,0 +1,39 @@
+import sys
+import argparse
+import tempfile
+from mp_benchmark_algorithms import run_benchmarks, save_benchmarks, load_benchmarks, compare_benchmarks
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Times the parsing, similarity, prediction and evaluation hot paths.')
+    parser.add_argument('--scale',     type = int,   default = 1,    help = 'synthetic dataset size, as a multiple of ml-100k')
+    parser.add_argument('--seed',      type = int,   default = 0,    help = 'seed of the dataset and queries')
+    parser.add_argument('--repeats',   type = int,   default = 3,    help = 'timed calls per benchmark')
+    parser.add_argument('--output',    default = 'benchmarks.json',  help = 'where to write the JSON results')
+    parser.add_argument('--compare',   default = None,               help = 'earlier JSON results to compare against')
+    parser.add_argument('--tolerance', type = float, default = 0.25, help = 'slow down accepted before a regression')
+    parser.add_argument('--only',      nargs = '*',  default = None, help = 'benchmark names (or prefixes) to run')
+    parser.add_argument('--no-fold',   action = 'store_true',        help = 'skip the cross-validation fold')
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = run_benchmarks( directory    = directory,
+                                  scale        = arguments.scale,
+                                  seed         = arguments.seed,
+                                  repeats      = arguments.repeats,
+                                  include_fold = not arguments.no_fold,
+                                  only         = arguments.only )
+    save_benchmarks(results, arguments.output)
+    for name, timings in results['benchmarks'].items():
+        memory = f"  peak {timings['peak_rss_bytes'] / 2**20:.1f} MiB" if timings.get('peak_rss_bytes') else ''
+        print(f"{name:<50} {timings['seconds_median']:>10.4f} s  {timings['seconds_per_operation']*1e6:>12.2f} us/op{memory}")
+
+    if arguments.compare:
+        baseline = load_benchmarks(arguments.compare)
+        if baseline['meta']['scale'] != results['meta']['scale'] or baseline['meta']['seed'] != results['meta']['seed']:
+            print('warning: baseline was run with a different scale or seed')
+        comparison = compare_benchmarks(baseline, results, arguments.tolerance)
+        for entry in comparison:
+            flag = 'REGRESSION' if entry['regression'] else ''
+            print(f"{entry['name']:<50} x{entry['ratio']:>6.2f} {flag}")
+        # non-zero exit status on a regression, for scripted runs
+        sys.exit(1 if any( entry['regression'] for entry in comparison ) else 0)
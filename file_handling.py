@@ -6,6 +6,7 @@
     
 """
 from io import TextIOWrapper
+from typing import List
 
 def file_reader(file_handler : TextIOWrapper) -> str | None :
     """ 
@@ -28,4 +29,20 @@ def file_reader(file_handler : TextIOWrapper) -> str | None :
         #return next data line
         return file_handler.readline()
     else:
-        return None
\ No newline at end of file
+        return None
+
+
+def file_bulk_reader(file_handler : TextIOWrapper) -> List[str] :
+    """ 
+        Function takes a file handler, produced by the python open() function,
+        and returns every remaining line of the file in one buffered read.<br>
+        Lines are split exactly as by repeated <code>file_reader</code> calls (newline characters kept),
+        without the per line eof check and seek.<br>
+        
+        Parmeters:<br>
+        - <strong>file_handler</strong>  (<code>TextIOWrapper</code>): the file handle from <code>open()</code> function call.<br>
+        
+        Returns:<br>
+        - <code>list</code>:    remaining lines of the file, empty if eof  
+    """
+    return file_handler.readlines()
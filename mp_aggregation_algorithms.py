@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 13:21:48 2026
+
+@author: jonat
+"""
+import numpy as np
+from typing import Tuple
+from mp_parsing_algorithms import ParseDatabase, UserRatingsDatabase
+
+# genders tallied, as calculate_per_genre_ratings_ratios_byGender
+GENDERS = ('M', 'F')
+
+
+class GenreRatingsCube:
+    """
+        Counts of ratings by (rater gender, rater age, rating value, genre of the rated movie), kept as running
+        totals over age and rating value, so that any slice ( age range x rating range ) is read off with four
+        lookups per genre.<br>
+        <code>counts[g, a, r, genre]</code> is the number of ratings of a movie of <code>genre</code> by raters of
+        gender <code>GENDERS[g]</code> younger than age <code>a</code> with a value among the <code>r</code> lowest
+        rating <code>levels</code>; <code>totals[g, a, r]</code> counts the ratings themselves (once per rating,
+        whatever the number of genres).
+    """
+    def __init__(self, *, counts : np.ndarray, totals : np.ndarray, levels : np.ndarray, genre_count : int) :
+        self.counts      = counts
+        self.totals      = totals
+        self.levels      = levels
+        self.genre_count = genre_count
+
+    def __slice(self, table : np.ndarray, age_range : Tuple[int, int], rating_range : Tuple[int, int]) -> np.ndarray :
+        # inclusion-exclusion over the running totals: ages [age1, age2), rating values [r1, r2]
+        age_count = table.shape[1] - 1
+        age_from  = min( max(age_range[0], 0), age_count )
+        age_to    = min( max(age_range[1], age_from), age_count )
+        level_from = int(np.searchsorted( self.levels, rating_range[0], side='left' ))
+        level_to   = max( int(np.searchsorted( self.levels, rating_range[1], side='right' )), level_from )
+        return ( table[:, age_to, level_to] - table[:, age_from, level_to]
+                 - table[:, age_to, level_from] + table[:, age_from, level_from] )
+
+    def genre_ratios(self, age_range : Tuple[int, int], rating_range : Tuple[int, int]) -> dict :
+        """
+            Returns the ratios of ratings per genre for males and females, as
+            <code>calculate_per_genre_ratings_ratios_byGender</code> with the same ranges: rating values at least r1
+            at most r2, ages at least age1 strictly less than age2; None for a gender without such ratings.
+        """
+        counts = self.__slice( self.counts, age_range, rating_range ).tolist()
+        totals = self.__slice( self.totals, age_range, rating_range ).tolist()
+        return { gender : { x : float( counts[g][x] / totals[g] ) for x in range(self.genre_count) } if totals[g] else None
+                 for g, gender in enumerate(GENDERS) }
+
+
+def generate_genre_ratings_cube(user_database : ParseDatabase, movie_database : ParseDatabase,
+                                ratings_per_user : UserRatingsDatabase, genre_count : int) -> GenreRatingsCube :
+    """
+        Function tallies every rating once into a (gender x age x rating value x genre) count cube, from which
+        any number of demographic slices are answered in O(genres).<br>
+
+        Parameters:<br>
+        - <strong>user_database</strong>    (<code>ParseDatabase</code>):       database of user information<br>
+        - <strong>movie_database</strong>   (<code>ParseDatabase</code>):       database of movie information<br>
+        - <strong>ratings_per_user</strong> (<code>UserRatingsDatabase</code>): ratings as collected per user<br>
+        - <strong>genre_count</strong>      (<code>int</code>):                 number of genres<br>
+
+        Returns:<br>
+        - <code>GenreRatingsCube</code>: the counts, as running totals over age and rating value
+    """
+    _user_database    = user_database.get_data()
+    _movie_database   = movie_database.get_data()
+    _ratings_per_user = ratings_per_user.user_ratings
+
+    # one entry per rating by a male or female rater
+    raters  = [ user for user in _ratings_per_user if _user_database[user].gender in GENDERS ]
+    counts  = np.fromiter( ( len(_ratings_per_user[user].ratings) for user in raters ), dtype=np.int64, count=len(raters) )
+    genders = np.repeat( np.fromiter( ( GENDERS.index(_user_database[user].gender) for user in raters ), dtype=np.intp,
+                                      count=len(raters) ), counts )
+    ages    = np.repeat( np.fromiter( ( _user_database[user].age for user in raters ), dtype=np.intp, count=len(raters) ), counts )
+    movies  = np.fromiter( ( movie_id for user in raters for movie_id in _ratings_per_user[user].ratings ),
+                           dtype=np.intp, count=int(counts.sum()) )
+    ratings = np.fromiter( ( rating for user in raters for rating in _ratings_per_user[user].ratings.values() ),
+                           dtype=np.float64, count=int(counts.sum()) )
+
+    levels      = np.unique(ratings)
+    level_index = np.searchsorted( levels, ratings )
+    age_count   = int(ages.max())+1 if len(ages) else 0
+    # (gender, age, rating value) cell of each rating
+    cells = ( genders * age_count + ages ) * len(levels) + level_index
+    cell_count = len(GENDERS) * age_count * len(levels)
+
+    # genres of each movie, as CSR rows; a rating is repeated once per genre of its movie
+    movie_ids     = np.arange( int(movies.max())+1 if len(movies) else 0 )
+    genre_lists   = [ list(_movie_database[movie_id].genre) if movie_id in _movie_database else [] for movie_id in movie_ids.tolist() ]
+    genre_counts  = np.fromiter( ( len(genres) for genres in genre_lists ), dtype=np.intp, count=len(genre_lists) )
+    genre_indptr  = np.concatenate(( [0], np.cumsum(genre_counts) ))
+    genre_indices = np.fromiter( ( genre for genres in genre_lists for genre in genres ), dtype=np.intp,
+                                 count=int(genre_counts.sum()) )
+    per_rating  = genre_counts[movies]
+    # position of each repeated rating among its movie's genres
+    offsets     = np.arange(int(per_rating.sum())) - np.repeat( np.cumsum(per_rating) - per_rating, per_rating )
+    rating_genres = genre_indices[ np.repeat( genre_indptr[movies], per_rating ) + offsets ]
+    genre_cells = np.repeat( cells, per_rating ) * genre_count + rating_genres
+
+    genre_table = np.bincount( genre_cells, minlength=cell_count * genre_count ).reshape(len(GENDERS), age_count, len(levels), genre_count)
+    total_table = np.bincount( cells, minlength=cell_count ).reshape(len(GENDERS), age_count, len(levels))
+
+    # running totals over age and rating value, with a leading 0 along both
+    cumulative_genres = np.zeros( (len(GENDERS), age_count+1, len(levels)+1, genre_count), dtype=np.int64 )
+    cumulative_genres[:, 1:, 1:] = genre_table.cumsum(axis=1).cumsum(axis=2)
+    cumulative_totals = np.zeros( (len(GENDERS), age_count+1, len(levels)+1), dtype=np.int64 )
+    cumulative_totals[:, 1:, 1:] = total_table.cumsum(axis=1).cumsum(axis=2)
+    return GenreRatingsCube( counts = cumulative_genres, totals = cumulative_totals, levels = levels, genre_count = genre_count )
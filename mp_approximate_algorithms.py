@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 15:48:09 2026
+
+@author: jonat
+"""
+import time
+import numpy as np
+from typing import List, Tuple
+from collections.abc import Callable
+from mp_parsing_algorithms import UserRatingsDatabase
+from mp_similarity_algorithms import similarity_rank
+
+
+class RandomProjectionIndex:
+    """
+        Locality sensitive hash index of users for approximate nearest neighbor search (random projection LSH).<br>
+        Each user is hashed by the signs of the projections of their mean centered ratings onto <code>bits</code>
+        random directions, once per table; users whose ratings point in similar directions (high cosine, which
+        tracks the Pearson similarity) tend to share a bucket. A query collects the users sharing a bucket with
+        the user in any table ( and, with <code>probes</code>, in the buckets one bit away ), and ranks only those
+        candidates by their exact <code>similarity</code> (e.g. <code>pearson_correlation_coeff_similarity_prediction</code>).<br>
+        Building costs O(ratings x tables x bits), in chunks of <code>chunk_ratings</code> ratings; a query costs
+        O(candidates) similarity calculations instead of O(users), and no user x user matrix is held.<br>
+        Pearson similarity is taken over co-rated movies only, so a pair with a handful of co-ratings can be
+        perfectly similar while their full rating vectors are far apart; such neighbors are the ones most often
+        missed. <code>evaluate_recall</code> measures recall against the exhaustive search.
+    """
+    def __init__(self, *, ratings_per_user : UserRatingsDatabase, similarity : Callable[[int, int, UserRatingsDatabase], float],
+                 tables : int = 16, bits : int | None = None, probes : bool = False, seed : int | None = 0,
+                 chunk_ratings : int = 1 << 14) :
+        _ratings_per_user = ratings_per_user.user_ratings
+        self.ratings_per_user = ratings_per_user
+        self.similarity = similarity
+        self.user_count = ratings_per_user.user_count
+        # about 32 users per bucket, unless given
+        self.bits   = bits if bits is not None else max(1, int(round(np.log2( max(self.user_count, 2) / 32 ))))
+        self.tables = tables
+        self.probes = probes
+
+        # ratings as CSR rows of mean centered values ( rows in user order )
+        counts  = np.fromiter( ( _ratings_per_user[user_id].ratings_count for user_id in range(1, self.user_count+1) ),
+                               dtype=np.int64, count=self.user_count )
+        movies  = np.fromiter( ( movie_id-1 for user_id in range(1, self.user_count+1)
+                                            for movie_id in _ratings_per_user[user_id].ratings ), dtype=np.intp, count=int(counts.sum()) )
+        ratings = np.fromiter( ( rating for user_id in range(1, self.user_count+1)
+                                        for rating in _ratings_per_user[user_id].ratings.values() ), dtype=np.float64, count=int(counts.sum()) )
+        rows    = np.repeat( np.arange(self.user_count), counts )
+        means   = np.divide( np.bincount(rows, weights=ratings, minlength=self.user_count), counts,
+                             out=np.zeros(self.user_count), where=counts > 0 )
+        deviations = ratings - means[rows]
+
+        generator = np.random.default_rng(seed)
+        movie_count = int(movies.max())+1 if len(movies) else 0
+        planes = generator.standard_normal( (movie_count, tables * self.bits) )
+        # projections summed per user with reduceat over a chunk of ratings at a time, which bounds the
+        # (ratings x tables*bits) temporary to chunk_ratings rows
+        projections = np.zeros( (self.user_count, tables * self.bits) )
+        for start in range(0, len(ratings), chunk_ratings):
+            end = start + chunk_ratings
+            chunk_rows = rows[start:end]
+            # first rating of each user in the chunk (a user split across chunks is summed in each)
+            firsts = np.flatnonzero( np.diff(chunk_rows, prepend=-1) )
+            projections[chunk_rows[firsts]] += np.add.reduceat( deviations[start:end, None] * planes[movies[start:end]],
+                                                                firsts, axis=0 )
+
+        # one integer key per user per table
+        weights = 1 << np.arange(self.bits, dtype=np.int64)
+        signs   = ( projections > 0 ).reshape(self.user_count, tables, self.bits)
+        self.keys = ( signs * weights ).sum(axis=2)
+        # table -> key -> users (0 based)
+        self.buckets = []
+        for table in range(tables):
+            order = np.argsort( self.keys[:, table], kind='stable' )
+            keys, starts = np.unique( self.keys[order, table], return_index=True )
+            ends = np.append( starts[1:], len(order) )
+            self.buckets.append({ int(key) : order[start:end] for key, start, end in zip(keys, starts, ends) })
+
+    def candidates(self, user_id : int) -> np.ndarray :
+        """
+            Returns the users (0 based) sharing a probed bucket with <code>user_id</code>, excluding the user.
+        """
+        found = []
+        for table, buckets in enumerate(self.buckets):
+            key = int(self.keys[user_id-1, table])
+            probed = [key] + ( [ key ^ (1 << bit) for bit in range(self.bits) ] if self.probes else [] )
+            for probe in probed:
+                bucket = buckets.get(probe)
+                if bucket is not None:
+                    found.append(bucket)
+        if not found:
+            return np.zeros(0, dtype=np.intp)
+        candidates = np.unique(np.concatenate(found))
+        return candidates[ candidates != user_id-1 ]
+
+    def query(self, user_id : int, k : int) -> List[Tuple[int, float]] :
+        """
+            Returns up to k of the candidates most similar to <code>user_id</code>, as <code>kNearestNeighbors</code>:
+            (user id, similarity) ordered by similarity descending, then user id ascending.
+        """
+        return self.__rank( user_id, self.candidates(user_id) + 1, k )
+
+    def exhaustive_query(self, user_id : int, k : int) -> List[Tuple[int, float]] :
+        """
+            Returns the exact k nearest neighbors of <code>user_id</code>: as <code>query</code>, but ranking every
+            other user. Costs O(users) similarity calculations and no user x user matrix.
+        """
+        alt_users = np.arange(1, self.user_count+1)
+        return self.__rank( user_id, alt_users[ alt_users != user_id ], k )
+
+    def __rank(self, user_id : int, alt_users : np.ndarray, k : int) -> List[Tuple[int, float]] :
+        # (user id, similarity) of the k best of alt_users, by similarity descending then user id ascending
+        scored = [ ( self.similarity( user_id, alt_user, self.ratings_per_user ), alt_user )
+                   for alt_user in alt_users.tolist() ]
+        scored.sort( key = lambda neighbor : ( -similarity_rank(neighbor[0]), neighbor[1] ) )
+        return [ ( alt_user, similarity ) for similarity, alt_user in scored[:max(k, 0)] ]
+
+
+def neighbor_recall(approximate : List[Tuple[int, float]], exact : List[Tuple[int, float]]) -> float :
+    """
+        Returns the share of the exact neighbors found by the approximate search (1.0 for an empty exact list).<br>
+        Users tied with the last exact neighbor are interchangeable with it, and count as found.
+    """
+    if not exact:
+        return 1.0
+    cutoff = similarity_rank(exact[-1][1])
+    exact_users = { alt_user for alt_user, similarity in exact }
+    found = sum( 1 for alt_user, similarity in approximate
+                 if alt_user in exact_users or similarity_rank(similarity) == cutoff )
+    return min(found, len(exact)) / len(exact)
+
+
+def evaluate_recall(index : RandomProjectionIndex, k : int, user_ids : List[int] | None = None,
+                    sample : int = 100, seed : int | None = 0) -> dict :
+    """
+        Function compares the approximate neighbors of <code>index</code> against the exact k nearest neighbors
+        of each evaluated user, found one user at a time by <code>exhaustive_query</code>. No user x user matrix
+        is built, so this runs at any scale, at O(users) similarity calculations per evaluated user.<br>
+
+        Parameters:<br>
+        - <strong>index</strong>    (<code>RandomProjectionIndex</code>): the approximate index<br>
+        - <strong>k</strong>        (<code>int</code>):                   number of neighbors<br>
+        - <strong>user_ids</strong> (<code>list</code>):                  (optional) users to evaluate, else a sample<br>
+        - <strong>sample</strong>   (<code>int</code>):                   number of users sampled when no user_ids are given<br>
+        - <strong>seed</strong>     (<code>int</code>):                   seed of the sample<br>
+
+        Returns:<br>
+        - <code>dict</code>: mean and minimum recall, mean candidates per query and mean query seconds
+    """
+    if user_ids is None:
+        generator = np.random.default_rng(seed)
+        user_ids  = sorted( generator.choice( np.arange(1, index.user_count+1), size=min(sample, index.user_count),
+                                              replace=False ).tolist() )
+    recalls, candidate_counts, seconds = [], [], []
+    for user_id in user_ids:
+        start = time.perf_counter()
+        approximate = index.query(user_id, k)
+        seconds.append(time.perf_counter() - start)
+        candidate_counts.append(len(index.candidates(user_id)))
+        recalls.append(neighbor_recall(approximate, index.exhaustive_query(user_id, k)))
+    return { 'k'                  : k,
+             'users'              : len(user_ids),
+             'mean_recall'        : float(np.mean(recalls)) if recalls else 1.0,
+             'min_recall'         : float(np.min(recalls)) if recalls else 1.0,
+             'mean_candidates'    : float(np.mean(candidate_counts)) if candidate_counts else 0.0,
+             'mean_query_seconds' : float(np.mean(seconds)) if seconds else 0.0 }
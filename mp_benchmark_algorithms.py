@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 09:14:33 2026
+
+@author: jonat
+"""
+import os
+import gc
+import sys
+import json
+import time
+import platform
+import statistics
+import subprocess
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from collections.abc import Callable
+from typing import List
+from mp_parsing_algorithms import generate_dataset, user_datafile_parser, movie_datafile_parser
+from mp_parsing_algorithms import ratings_datafile_parser, genre_datafile_parser
+from mp_parsing_algorithms import generate_user_set, generate_movie_set, generate_ratings_set, generate_ratings_database
+from mp_similarity_algorithms import generate_similarity_matrix, RatingsMatrix, generate_item_neighbors
+from mp_index_algorithms import generate_demographic_index, generate_genre_index
+from mp_factorization_algorithms import BiasedMatrixFactorization
+from mp_prediction_algorithms import pearson_correlation_coeff_similarity_prediction, kNearestNeighbors
+from mp_prediction_algorithms import mean_user_rating_based_prediction, mean_movie_rating_based_prediction
+from mp_prediction_algorithms import demographic_based_prediction, genre_based_prediction, hybrid_based_prediction
+from mp_prediction_algorithms import hybrid_based_predictions_batch, item_based_prediction
+from mp_math_algorithms import rmse
+from mp_metrics_algorithms import evaluate_predictions
+from mp_format_algorithms import DATASET_FORMATS, generate_ratings_database_streamed
+from mp_compact_algorithms import compact_ratings_database
+from mp_testing_suite import cross_validation_fold
+try:
+    import resource
+except ImportError:
+    # not available on Windows, peak memory is then not reported
+    resource = None
+
+
+# source release the synthetic datasets are scaled from
+SOURCE_DIRECTORY : str = 'ml-100k'
+
+
+def generate_synthetic_dataset(directory : str, *, scale : int = 1, seed : int = 0,
+                               source_directory : str = SOURCE_DIRECTORY) -> dict :
+    """
+        Function writes an ml-100k formatted dataset <code>scale</code> times the size of ml-100k.<br>
+        Every synthetic user is a copy of a randomly drawn real user (age, gender, occupation), rating the same
+        number of movies with the same ratings, each moved to a random one of the <code>scale</code> copies of
+        the movie; a fifth of the ratings are moved one star up or down. The result keeps the rating counts,
+        popularity skew and rating distribution of ml-100k, with <code>scale</code> x 943 users,
+        <code>scale</code> x 1682 movies and about <code>scale</code> x 100,000 ratings.<br>
+        The same seed always writes the same files.<br>
+
+        Parameters:<br>
+        - <strong>directory</strong>        (<code>str</code>): where to write u.users, u.movies, u.ratings and u.genres<br>
+        - <strong>scale</strong>            (<code>int</code>): size multiplier<br>
+        - <strong>seed</strong>             (<code>int</code>): random seed<br>
+        - <strong>source_directory</strong> (<code>str</code>): the ml-100k release<br>
+
+        Returns:<br>
+        - <code>dict</code>: path of each file, by name ('users', 'movies', 'ratings', 'genres')
+    """
+    os.makedirs(directory, exist_ok=True)
+    generator = np.random.default_rng(seed)
+    paths = { name : os.path.join(directory, f'u.{name}') for name in ('users', 'movies', 'ratings', 'genres') }
+
+    with open(os.path.join(source_directory, 'u.users'), 'r') as file_handle:
+        user_lines = [ line.rstrip('\n').split('|', 1)[1] for line in file_handle if line.strip() ]
+    with open(os.path.join(source_directory, 'u.movies'), 'r', encoding='windows-1252') as file_handle:
+        movie_lines = [ line.rstrip('\n').split('|', 2) for line in file_handle if line.strip() ]
+    with open(os.path.join(source_directory, 'u.genres'), 'r') as file_handle:
+        genre_text = file_handle.read()
+    source = np.loadtxt(os.path.join(source_directory, 'u.ratings'), dtype=np.int64, ndmin=2)
+
+    # users ~ copies of drawn real users
+    originals = generator.integers(0, len(user_lines), scale * len(user_lines))
+    with open(paths['users'], 'w') as file_handle:
+        for user_id, original in enumerate(originals, start=1):
+            file_handle.write(f'{user_id}|{user_lines[original]}\n')
+    # movies ~ scale copies of each real movie, copy c of movie m has id m + c x 1682
+    with open(paths['movies'], 'w', encoding='windows-1252') as file_handle:
+        for copy in range(scale):
+            for movie_id, title, rest in movie_lines:
+                title = title if copy == 0 else f'{title} [{copy}]'
+                file_handle.write(f'{int(movie_id) + copy * len(movie_lines)}|{title}|{rest}\n')
+    with open(paths['genres'], 'w') as file_handle:
+        file_handle.write(genre_text)
+
+    # ratings ~ the drawn users' ratings, spread over the movie copies
+    order    = np.argsort(source[:, 0], kind='stable')
+    by_user  = source[order]
+    starts   = np.searchsorted(by_user[:, 0], np.arange(1, len(user_lines)+2))
+    rows     = np.concatenate([ np.arange(starts[original], starts[original+1]) for original in originals ])
+    users    = np.repeat( np.arange(1, len(originals)+1), starts[originals+1] - starts[originals] )
+    movies   = by_user[rows, 1] + generator.integers(0, scale, len(rows)) * len(movie_lines)
+    ratings  = by_user[rows, 2] + np.where( generator.random(len(rows)) < 0.2, generator.choice([-1, 1], len(rows)), 0 )
+    ratings  = np.clip(ratings, 1, 5)
+    # one rating per (user, movie), in shuffled file order
+    table    = np.column_stack(( users, movies, ratings, by_user[rows, 3] ))
+    _, first = np.unique( table[:, 0] * ( scale * len(movie_lines) + 1 ) + table[:, 1], return_index=True )
+    table    = table[ generator.permutation(np.sort(first)) ]
+    np.savetxt(paths['ratings'], table, fmt='%d', delimiter='\t')
+    return paths
+
+
+def time_call(function : Callable[[], any], *, repeats : int = 3, operations : int = 1) -> dict :
+    """
+        Function times <code>repeats</code> calls of <code>function</code> (after a garbage collection each),
+        reporting wall and CPU seconds.<br>
+
+        Returns:<br>
+        - <code>dict</code>: min/median wall seconds, median CPU seconds, repeats, operations per call and
+                             median wall seconds per operation
+    """
+    wall, cpu = [], []
+    for repeat in range(repeats):
+        gc.collect()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        function()
+        wall.append(time.perf_counter() - wall_start)
+        cpu.append(time.process_time() - cpu_start)
+    median = statistics.median(wall)
+    return { 'seconds_min'          : min(wall),
+             'seconds_median'       : median,
+             'cpu_seconds_median'   : statistics.median(cpu),
+             'repeats'              : repeats,
+             'operations'           : operations,
+             'seconds_per_operation': median / operations }
+
+
+def _peak_rss_bytes() -> int | None :
+    # peak resident set size of this process so far; on Linux ru_maxrss carries over from the parent
+    # of a spawned process, the high water mark of /proc does not
+    try:
+        with open('/proc/self/status', 'r') as file_handle:
+            for line in file_handle:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _measure_ratings_build(directory : str, streamed : bool, user_count : int, movie_count : int) -> dict :
+    # runs in a fresh process, see measure_ratings_build
+    gc.collect()
+    baseline = _peak_rss_bytes()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    if streamed:
+        generate_ratings_database_streamed( DATASET_FORMATS['ml-100k'], directory, user_count = user_count, movie_count = movie_count )
+    else:
+        ratings_data = generate_ratings_set(os.path.join(directory, 'u.ratings'))
+        generate_ratings_database( user_count = user_count, movie_count = movie_count, ratings_data = ratings_data )
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    return { 'seconds_min'          : wall,
+             'seconds_median'       : wall,
+             'cpu_seconds_median'   : cpu,
+             'repeats'              : 1,
+             'operations'           : 1,
+             'seconds_per_operation': wall,
+             'baseline_rss_bytes'   : baseline,
+             'peak_rss_bytes'       : _peak_rss_bytes() }
+
+
+def measure_ratings_build(*, directory : str, streamed : bool, user_count : int, movie_count : int) -> dict :
+    """
+        Function times building the ratings database of the ml-100k formatted files in <code>directory</code>,
+        loading every rating into a <code>ParseDatabase</code> first or, with <code>streamed</code>, straight from
+        the file (<code>generate_ratings_database_streamed</code>).<br>
+        The build runs in a fresh process, so that its peak resident memory is its own.<br>
+
+        Returns:<br>
+        - <code>dict</code>: timings as <code>time_call</code> (one call), with the peak resident memory of the
+                             process before and after the build (None where the platform cannot report it)
+    """
+    with ProcessPoolExecutor( max_workers = 1, mp_context = multiprocessing.get_context('spawn') ) as executor:
+        return executor.submit( _measure_ratings_build, directory, streamed, user_count, movie_count ).result()
+
+
+def _git_commit() -> str | None :
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, timeout=10,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmarks(*, directory : str, scale : int = 1, seed : int = 0, repeats : int = 3, queries : int = 2000,
+                   include_fold : bool = True, only : List[str] | None = None) -> dict :
+    """
+        Function runs the benchmark suite on a synthetic dataset written to <code>directory</code>: parsing each
+        file, building the ratings database ( and its peak memory, loaded and streamed ), Pearson similarity, nearest neighbors, each predictor over the same
+        random queries, rmse, and one full cross-validation fold.<br>
+        Every random draw is seeded from <code>seed</code>, so two runs time the same work.<br>
+
+        Parameters:<br>
+        - <strong>directory</strong>    (<code>str</code>):  where the synthetic dataset is written<br>
+        - <strong>scale</strong>        (<code>int</code>):  dataset size as a multiple of ml-100k<br>
+        - <strong>seed</strong>         (<code>int</code>):  seed of the dataset and of the queries<br>
+        - <strong>repeats</strong>      (<code>int</code>):  timed calls per benchmark<br>
+        - <strong>queries</strong>      (<code>int</code>):  (user, movie) queries per predictor benchmark<br>
+        - <strong>include_fold</strong> (<code>bool</code>): whether to time a cross-validation fold (the slowest)<br>
+        - <strong>only</strong>         (<code>list</code>): (optional) names, or name prefixes, of the benchmarks to run<br>
+
+        Returns:<br>
+        - <code>dict</code>: <code>{'meta' : {...}, 'benchmarks' : {name : timings}}</code>, see <code>time_call</code>
+    """
+    paths = generate_synthetic_dataset(directory, scale = scale, seed = seed)
+    selected = lambda name : only is None or any( name.startswith(prefix) for prefix in only )
+    benchmarks = {}
+    def bench(name : str, function : Callable[[], any], operations : int = 1, times : int = repeats) -> None:
+        if selected(name):
+            benchmarks[name] = time_call(function, repeats = times, operations = operations)
+
+    # parsing, line by line per file and through the generate_*_set loaders
+    parsers = { 'users' : (user_datafile_parser, 'utf-8'), 'movies' : (movie_datafile_parser, 'windows-1252'),
+                'ratings' : (ratings_datafile_parser, 'utf-8'), 'genres' : (genre_datafile_parser, 'utf-8') }
+    for name, (parser, encoding) in parsers.items():
+        def parse(path = paths[name], parser = parser, encoding = encoding):
+            with open(path, 'r', encoding=encoding) as file_handle:
+                return generate_dataset(file_handle = file_handle, parser = parser)
+        bench(f'generate_dataset/{name}', parse)
+    bench('generate_user_set',    lambda : generate_user_set(paths['users']))
+    bench('generate_movie_set',   lambda : generate_movie_set(paths['movies']))
+    bench('generate_ratings_set', lambda : generate_ratings_set(paths['ratings']))
+
+    user_database  = generate_user_set(paths['users'])
+    movie_database = generate_movie_set(paths['movies'])
+    ratings_data   = generate_ratings_set(paths['ratings'])
+    user_count, movie_count = user_database.get_count(), movie_database.get_count()
+    build = lambda : generate_ratings_database( user_count = user_count, movie_count = movie_count, ratings_data = ratings_data )
+    bench('generate_ratings_database', build)
+    # peak memory of the loaded and streamed builds, each in its own process
+    for name, streamed in ( ('peak_memory/ratings_database', False), ('peak_memory/ratings_database_streamed', True) ):
+        if selected(name):
+            benchmarks[name] = measure_ratings_build( directory = directory, streamed = streamed,
+                                                      user_count = user_count, movie_count = movie_count )
+    ratings_database  = build()
+    ratings_per_user  = ratings_database.ratings_per_user
+    ratings_per_movie = ratings_database.ratings_per_movie
+
+    # fixed queries
+    generator = np.random.default_rng(seed)
+    pairs      = generator.integers(1, user_count+1, (queries, 2)).tolist()
+    query_users  = generator.integers(1, user_count+1, queries).tolist()
+    query_movies = generator.integers(1, movie_count+1, queries).tolist()
+
+    bench('pearson_correlation_coeff_similarity_prediction',
+          lambda : [ pearson_correlation_coeff_similarity_prediction(user_id, alt_user_id, ratings_per_user)
+                     for user_id, alt_user_id in pairs ], operations = queries)
+    # the same pairs over sorted compact rows (merge join of the co-ratings)
+    if selected('pearson_correlation_coeff_similarity_prediction/compact'):
+        compact_ratings_per_user = compact_ratings_database(ratings_database).ratings_per_user
+        bench('pearson_correlation_coeff_similarity_prediction/compact',
+              lambda : [ pearson_correlation_coeff_similarity_prediction(user_id, alt_user_id, compact_ratings_per_user)
+                         for user_id, alt_user_id in pairs ], operations = queries)
+    ratings_matrix = RatingsMatrix(ratings_per_user = ratings_per_user)
+    bench('generate_similarity_matrix', lambda : generate_similarity_matrix(ratings_per_user, ratings_matrix), times = 1)
+    similarity_matrix = generate_similarity_matrix(ratings_per_user, ratings_matrix)
+    # the exhaustive scan computes every pair, so only a few users are timed
+    bench('kNearestNeighbors/exhaustive', lambda : [ kNearestNeighbors(user_id, ratings_per_user, 100) for user_id in query_users[:5] ],
+          operations = 5, times = 1)
+    bench('kNearestNeighbors/similarity_matrix',
+          lambda : [ kNearestNeighbors(user_id, ratings_per_user, 100, similarity_matrix) for user_id in query_users ],
+          operations = queries)
+
+    # predictors over the same queries, indices built outside the timings
+    demographic_index = generate_demographic_index(user_database, ratings_per_user)
+    genre_index       = generate_genre_index(movie_database, ratings_per_user)
+    item_neighbors    = generate_item_neighbors(ratings_per_movie, user_count)
+    neighbors         = { user_id : kNearestNeighbors(user_id, ratings_per_user, 100, similarity_matrix) for user_id in set(query_users) }
+    factor_model      = BiasedMatrixFactorization().fit(ratings_per_user, movie_count)
+    queries_of = lambda predict : [ predict(user_id, movie_id) for user_id, movie_id in zip(query_users, query_movies) ]
+    bench('predict/mean_user',   lambda : queries_of( lambda u, m : mean_user_rating_based_prediction(u, ratings_per_user) ), queries)
+    bench('predict/mean_movie',  lambda : queries_of( lambda u, m : mean_movie_rating_based_prediction(m, ratings_per_movie) ), queries)
+    bench('predict/demographic', lambda : queries_of( lambda u, m : demographic_based_prediction(u, m, user_database, ratings_per_user,
+                                                                                                   demographic_index = demographic_index) ), queries)
+    bench('predict/demographic_scan', lambda : [ demographic_based_prediction(u, m, user_database, ratings_per_user)
+                                                 for u, m in zip(query_users[:50], query_movies[:50]) ], 50, times = 1)
+    bench('predict/genre',       lambda : queries_of( lambda u, m : genre_based_prediction(u, m, movie_database, ratings_per_user,
+                                                                                             genre_index = genre_index) ), queries)
+    bench('predict/hybrid',      lambda : queries_of( lambda u, m : hybrid_based_prediction(u, m, ratings_per_user, neighbors[u]) ), queries)
+    bench('predict/hybrid_batch', lambda : hybrid_based_predictions_batch(query_users, query_movies, ratings_matrix,
+                                                                          similarity_matrix, [10, 100, 500, None]), queries)
+    bench('predict/item',        lambda : queries_of( lambda u, m : item_based_prediction(u, m, ratings_per_user, item_neighbors) ), queries)
+    bench('predict/factorization', lambda : factor_model.predict_batch(query_users, query_movies), queries)
+    bench('fit/factorization',   lambda : BiasedMatrixFactorization().fit(ratings_per_user, movie_count), times = 1)
+
+    actual    = generator.integers(1, 6, 20 * queries).tolist()
+    predicted = ( generator.random(20 * queries) * 4 + 1 ).tolist()
+    bench('rmse', lambda : rmse( actual_ratings = actual, predicted_ratings = predicted ), 20 * queries)
+    bench('evaluate_predictions', lambda : evaluate_predictions( actual_ratings = actual, predictions = [predicted] ), 20 * queries)
+
+    if include_fold:
+        bench('cross_validation_fold', lambda : cross_validation_fold( user_database = user_database, movie_database = movie_database,
+                                                                       ratings = ratings_data, test_class_size_percent = 20,
+                                                                       fold_seed = seed ), times = 1)
+
+    meta = { 'scale'      : scale,
+             'seed'       : seed,
+             'repeats'    : repeats,
+             'queries'    : queries,
+             'users'      : user_count,
+             'movies'     : movie_count,
+             'ratings'    : ratings_data.get_count(),
+             'commit'     : _git_commit(),
+             'python'     : sys.version.split()[0],
+             'numpy'      : np.__version__,
+             'platform'   : platform.platform(),
+             'cpu_count'  : os.cpu_count(),
+             'created'    : time.strftime('%Y-%m-%dT%H:%M:%S') }
+    return { 'meta' : meta, 'benchmarks' : benchmarks }
+
+
+def save_benchmarks(results : dict, path : str) -> None :
+    """
+        Function writes benchmark results as indented JSON.
+    """
+    with open(path, 'w') as file_handle:
+        json.dump(results, file_handle, indent=2, sort_keys=True)
+
+
+def load_benchmarks(path : str) -> dict :
+    with open(path, 'r') as file_handle:
+        return json.load(file_handle)
+
+
+def compare_benchmarks(baseline : dict, current : dict, tolerance : float = 0.25) -> List[dict] :
+    """
+        Function compares two benchmark results benchmark by benchmark, on the fastest call of each
+        ( the least disturbed by other load on the machine ).<br>
+
+        Parameters:<br>
+        - <strong>baseline</strong>  (<code>dict</code>):  earlier results, e.g. of the previous commit<br>
+        - <strong>current</strong>   (<code>dict</code>):  results to check<br>
+        - <strong>tolerance</strong> (<code>float</code>): slow down accepted before a benchmark is a regression<br>
+
+        Returns:<br>
+        - <code>list</code>: one entry per benchmark present in both, with the ratio current / baseline and
+                             whether it is a regression, slowest ratio first
+    """
+    comparison = []
+    for name, timings in current['benchmarks'].items():
+        if name not in baseline['benchmarks']:
+            continue
+        before = baseline['benchmarks'][name]['seconds_min']
+        after  = timings['seconds_min']
+        ratio  = after / before if before > 0 else float('inf')
+        comparison.append({ 'name' : name, 'baseline' : before, 'current' : after, 'ratio' : ratio,
+                            'regression' : ratio > 1 + tolerance })
+    comparison.sort(key = lambda entry : -entry['ratio'])
+    return comparison
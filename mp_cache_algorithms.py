@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:02:17 2026
+
+@author: jonat
+"""
+import os
+import hashlib
+import numpy as np
+from collections.abc import Callable
+from mp_parsing_algorithms import ParseDatabase, UserRatingsDatabase
+from mp_similarity_algorithms import SimilarityMatrix, generate_similarity_matrix
+from mp_instrumentation_algorithms import count_event
+
+# similarity metrics known to the cache, by name (the name is part of the cache key)
+SIMILARITY_METRICS : dict = {
+        'pearson' : generate_similarity_matrix
+    }
+
+
+def training_set_fingerprint(ratings_data : ParseDatabase, metric : str, user_count : int) -> str :
+    """
+        Function hashes the contents of a training ratings database, in entry order, together with
+        the name of a similarity metric and the number of users (the shape of the matrix).<br>
+        Entry order is part of the fingerprint, as it decides the order in which similarity sums are accumulated.
+        Ratings are hashed as doubles, so half star ratings are told apart.<br>
+
+        Parameters:<br>
+        - <strong>ratings_data</strong>  (<code>ParseDatabase</code>): training ratings, as loaded from generate_ratings_set<br>
+        - <strong>metric</strong>        (<code>str</code>):           name of the similarity metric<br>
+        - <strong>user_count</strong>    (<code>int</code>):           number of users of the ratings database<br>
+
+        Returns:<br>
+        - <code>str</code>: hexadecimal digest usable as a file name
+    """
+    _ratings_data = ratings_data.get_data()
+    count = ratings_data.get_count()
+    # one (user_id, movie_id) pair and one rating per entry
+    pairs   = np.fromiter( ( value for i in range(1, count+1)
+                                   for value in ( _ratings_data[i].user_id, _ratings_data[i].movie_id ) ),
+                           dtype=np.int64, count=2*count )
+    ratings = np.fromiter( ( _ratings_data[i].rating for i in range(1, count+1) ), dtype=np.float64, count=count )
+    digest = hashlib.sha256()
+    # header: metric, matrix shape and the layout of the hashed columns
+    digest.update(f'{metric}|users={user_count}|entries={count}|{pairs.dtype.str}|{ratings.dtype.str}|'.encode())
+    digest.update(pairs.tobytes())
+    digest.update(ratings.tobytes())
+    return digest.hexdigest()
+
+
+class SimilarityCache:
+    """
+        On-disk cache of similarity matrices, stored as <code>.npy</code> files keyed by training set fingerprint.<br>
+        Cached matrices are memory-mapped on load, so a hit costs milliseconds regardless of matrix size.<br>
+        The directory is kept under <code>max_bytes</code> by evicting the least recently used files.
+    """
+    def __init__(self, *, directory : str = '.similarity_cache', max_bytes : int = 256 * 1024 * 1024) :
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def __path(self, key : str) -> str :
+        return os.path.join(self.directory, f'{key}.npy')
+
+    def load(self, key : str) -> SimilarityMatrix | None :
+        """
+            Returns the cached matrix for <code>key</code>, or None on a miss.
+        """
+        path = self.__path(key)
+        try:
+            similarities = np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            # missing or unreadable entry
+            return None
+        # refresh recency for eviction
+        os.utime(path)
+        return SimilarityMatrix(similarities = similarities)
+
+    def store(self, key : str, similarity_matrix : SimilarityMatrix) -> None :
+        """
+            Writes a matrix under <code>key</code>, then evicts old entries beyond the size bound.
+        """
+        path = self.__path(key)
+        # write then rename, so a concurrent reader never sees a partial file
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'wb') as file_handle:
+            np.save(file_handle, np.asarray(similarity_matrix.similarities))
+        os.replace(temporary_path, path)
+        self.evict(keep = key)
+
+    def evict(self, keep : str | None = None) -> None :
+        """
+            Removes least recently used entries until the cache fits within <code>max_bytes</code>.<br>
+            The entry named by <code>keep</code> is never removed.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.npy'):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total_bytes = sum(entry[1] for entry in entries)
+        # oldest first
+        entries.sort()
+        for _, size, name in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            if keep is not None and name == f'{keep}.npy':
+                continue
+            os.remove(os.path.join(self.directory, name))
+            total_bytes -= size
+
+    def get_similarity_matrix(self, *, ratings_data : ParseDatabase, ratings_per_user : UserRatingsDatabase,
+                              metric : str = 'pearson') -> SimilarityMatrix :
+        """
+            Function returns the similarity matrix of a training set, loading it from the cache when the
+            same training set and metric were seen before, else calculating and storing it.<br>
+
+            Parameters:<br>
+            - <strong>ratings_data</strong>      (<code>ParseDatabase</code>):       training ratings the database was built from<br>
+            - <strong>ratings_per_user</strong>  (<code>UserRatingsDatabase</code>): database of training ratings per user<br>
+            - <strong>metric</strong>            (<code>str</code>):                 similarity metric name, see SIMILARITY_METRICS<br>
+
+            Returns:<br>
+            - <code>SimilarityMatrix</code>: similarity of each user to every other user
+        """
+        key = training_set_fingerprint(ratings_data = ratings_data, metric = metric,
+                                       user_count = ratings_per_user.user_count)
+        similarity_matrix = self.load(key)
+        count_event('similarity_cache_hits' if similarity_matrix is not None else 'similarity_cache_misses')
+        if similarity_matrix is None:
+            generator : Callable[[UserRatingsDatabase], SimilarityMatrix] = SIMILARITY_METRICS[metric]
+            similarity_matrix = generator(ratings_per_user = ratings_per_user)
+            self.store(key, similarity_matrix)
+        return similarity_matrix
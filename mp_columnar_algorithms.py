@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:40:05 2026
+
+@author: jonat
+"""
+import os
+import numpy as np
+from collections import OrderedDict
+from collections.abc import Mapping, Iterator
+from mp_parsing_algorithms import ParseDatabase, RatingsDatabase
+
+
+COLUMNS = ('user_id', 'movie_id', 'rating', 'timestamp')
+
+# rows whose entries (and materialized ratings) are kept by a CSRRatingsEntries
+ENTRY_CACHE_SIZE = 1 << 12
+
+
+class ColumnarRatings:
+    """
+        Ratings stored as parallel arrays, one entry per rating in file order:<br>
+        <code>user_id</code>, <code>movie_id</code>, <code>rating</code>, <code>timestamp</code>.<br>
+        Ratings are held as int8 when every rating is a whole number (ml-100k), else as float32 (half stars).<br>
+        Arrays may be memory-mapped, see <code>load_columnar_ratings</code>.
+    """
+    def __init__(self, *, user_id : np.ndarray, movie_id : np.ndarray, rating : np.ndarray, timestamp : np.ndarray) :
+        self.user_id   = user_id
+        self.movie_id  = movie_id
+        self.rating    = rating
+        self.timestamp = timestamp
+
+    def get_count(self) -> int :
+        return len(self.user_id)
+
+    def by_user(self, user_count : int) -> 'CSRRatingsIndex' :
+        """
+            Returns a CSR index of the ratings per user (movie ids and ratings per row).
+        """
+        return CSRRatingsIndex( keys = self.user_id, others = self.movie_id, values = self.rating, key_count = user_count )
+
+    def by_movie(self, movie_count : int) -> 'CSRRatingsIndex' :
+        """
+            Returns a CSR index of the ratings per movie (user ids and ratings per row).
+        """
+        return CSRRatingsIndex( keys = self.movie_id, others = self.user_id, values = self.rating, key_count = movie_count )
+
+    def to_ratings_database(self, user_count : int, movie_count : int) -> RatingsDatabase :
+        """
+            Returns a <code>RatingsDatabase</code> whose per user and per movie databases are read-only views
+            over CSR indices, usable in place of the ones built by <code>generate_ratings_database</code>.
+        """
+        return RatingsDatabase(
+                ratings_per_user  = UserRatingsView( index = self.by_user(user_count) ),
+                ratings_per_movie = MovieRatingsView( index = self.by_movie(movie_count) ))
+
+
+def _compact_ratings(rating : np.ndarray) -> np.ndarray :
+    # whole star ratings fit int8, half stars are kept as float32
+    if np.array_equal(rating, np.round(rating)):
+        return rating.astype(np.int8)
+    return rating.astype(np.float32)
+
+
+def generate_columnar_ratings(path : str = 'ml-100k/u.ratings') -> ColumnarRatings :
+    """
+        Function loads a <code>'./ml-100k/u.ratings'</code> formatted file
+        ( "USER-ID    MOVIE-ID    RATING   TIME-STAMP\\n" ) into a <code>ColumnarRatings</code>.<br>
+
+        Parameters:<br>
+        - <strong>path</strong> (<code>str</code>): ratings file<br>
+
+        Returns:<br>
+        - <code>ColumnarRatings</code>: columns of the ratings file
+    """
+    with open(path, 'r') as file_handle:
+        table = np.loadtxt(file_handle, dtype=np.float64, ndmin=2)
+    return ColumnarRatings(
+            user_id   = table[:, 0].astype(np.int32),
+            movie_id  = table[:, 1].astype(np.int32),
+            rating    = _compact_ratings(table[:, 2]),
+            timestamp = table[:, 3].astype(np.int64))
+
+
+def columnar_from_parse_database(ratings_data : ParseDatabase) -> ColumnarRatings :
+    """
+        Function converts a ratings <code>ParseDatabase</code> (e.g. a training partition) into columns,
+        in entry order. <code>RatingData</code> carries no time stamp, so timestamps are 0.
+    """
+    _ratings_data = ratings_data.get_data()
+    count = ratings_data.get_count()
+    entries = [ _ratings_data[i] for i in range(1, count+1) ]
+    return ColumnarRatings(
+            user_id   = np.fromiter( (x.user_id for x in entries), dtype=np.int32, count=count ),
+            movie_id  = np.fromiter( (x.movie_id for x in entries), dtype=np.int32, count=count ),
+            rating    = _compact_ratings(np.fromiter( (x.rating for x in entries), dtype=np.float64, count=count )),
+            timestamp = np.zeros( count, dtype=np.int64 ))
+
+
+def save_columnar_ratings(ratings : ColumnarRatings, directory : str) -> None :
+    """
+        Function writes each column to <code>directory/column.npy</code>, to be memory-mapped by
+        <code>load_columnar_ratings</code>.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for column in COLUMNS:
+        np.save(os.path.join(directory, f'{column}.npy'), getattr(ratings, column))
+
+
+def load_columnar_ratings(directory : str, mmap : bool = True) -> ColumnarRatings :
+    """
+        Function loads the columns written by <code>save_columnar_ratings</code>. With <code>mmap</code>
+        the columns are memory-mapped read-only, so pages are only read from disk as accessed.
+    """
+    mmap_mode = 'r' if mmap else None
+    return ColumnarRatings(**{ column : np.load(os.path.join(directory, f'{column}.npy'), mmap_mode=mmap_mode)
+                               for column in COLUMNS })
+
+
+class CSRRatingsIndex:
+    """
+        Compressed sparse row index of ratings keyed by user or by movie (ids are 1 based).<br>
+        Row <code>key</code> spans <code>indptr[key-1]:indptr[key]</code> of <code>indices</code> (the other id) and
+        <code>values</code> (the rating), in original rating order.<br>
+        <code>sorted_positions</code> holds each row's positions ordered by the other id, for binary search lookups.
+    """
+    def __init__(self, *, keys : np.ndarray, others : np.ndarray, values : np.ndarray, key_count : int) :
+        self.key_count = key_count
+        # stable, so that a row keeps the original order of its ratings
+        order = np.argsort(keys, kind='stable')
+        counts = np.bincount(keys, minlength=key_count+1)[1:key_count+1]
+        self.indptr  = np.zeros(key_count+1, dtype=np.int64)
+        np.cumsum(counts, out=self.indptr[1:])
+        self.indices = np.asarray(others)[order]
+        self.values  = np.asarray(values)[order]
+        self.counts  = counts
+        self.scores  = np.bincount(keys, weights=values, minlength=key_count+1)[1:key_count+1]
+        # positions sorted by (row, other id)
+        rows = np.repeat(np.arange(key_count), counts)
+        self.sorted_positions = np.lexsort((self.indices, rows))
+        self.sorted_indices   = self.indices[self.sorted_positions]
+
+    def row(self, key : int) -> tuple :
+        """
+            Returns the (other ids, ratings) arrays of row <code>key</code>.
+        """
+        start, end = self.indptr[key-1], self.indptr[key]
+        return self.indices[start:end], self.values[start:end]
+
+    def find(self, key : int, other : int) -> int :
+        """
+            Returns the position of the rating (key, other), or -1 if there is none.
+        """
+        start, end = int(self.indptr[key-1]), int(self.indptr[key])
+        position = start + int(np.searchsorted(self.sorted_indices[start:end], other))
+        if position < end and self.sorted_indices[position] == other:
+            return int(self.sorted_positions[position])
+        return -1
+
+
+class CSRRatingsRow(Mapping):
+    """
+        Read-only <code>dict</code>-like view of one CSR row ( other id -> rating ), iterating in original rating order.<br>
+        The row is materialized into a <code>dict</code> on first use, so lookups then cost what they cost on the
+        dictionary databases; <code>arrays</code> gives the row's (other ids, ratings) arrays without materializing it.
+    """
+    def __init__(self, index : CSRRatingsIndex, key : int) :
+        self.__index   = index
+        self.__key     = key
+        self.__ratings = None
+
+    def __materialized(self) -> dict :
+        if self.__ratings is None:
+            others, values = self.__index.row(self.__key)
+            self.__ratings = dict(zip(others.tolist(), values.tolist()))
+        return self.__ratings
+
+    def arrays(self) -> tuple :
+        """
+            Returns the (other ids, ratings) arrays of the row, in original rating order.
+        """
+        return self.__index.row(self.__key)
+
+    def __getitem__(self, other : int) -> int | float :
+        return self.__materialized()[other]
+
+    def get(self, other : int, default : int | float | None = None) -> int | float | None :
+        return self.__materialized().get(other, default)
+
+    def __contains__(self, other : object) -> bool :
+        return other in self.__materialized()
+
+    def __iter__(self) -> Iterator[int] :
+        return iter(self.__materialized())
+
+    def __len__(self) -> int :
+        return int(self.__index.counts[self.__key-1])
+
+    def values(self) -> list :
+        return list(self.__materialized().values())
+
+    def items(self) -> list :
+        return list(self.__materialized().items())
+
+
+class CSRRatingsEntry:
+    """
+        Stand-in for <code>UserRatings</code>/<code>MovieRatings</code> over one CSR row.
+    """
+    __slots__ = ('user_id', 'movie_id', 'score', 'ratings_count', 'ratings')
+
+    def __init__(self, index : CSRRatingsIndex, key : int, key_name : str) :
+        self.user_id  = key if key_name == 'user_id' else None
+        self.movie_id = key if key_name == 'movie_id' else None
+        score = index.scores[key-1]
+        # whole number totals are reported as int, as in the dictionary databases
+        self.score         = int(score) if index.values.dtype.kind == 'i' else float(score)
+        self.ratings_count = int(index.counts[key-1])
+        self.ratings       = CSRRatingsRow(index, key)
+
+
+class CSRRatingsEntries(Mapping):
+    """
+        <code>dict</code>-like mapping of id -> <code>CSRRatingsEntry</code>; entries are created on access and
+        the <code>cache_size</code> most recently used are kept, so repeated passes over the users
+        (e.g. kNearestNeighbors) reuse their materialized rows while memory stays bounded.
+    """
+    def __init__(self, index : CSRRatingsIndex, key_name : str, cache_size : int = ENTRY_CACHE_SIZE) :
+        self.__index      = index
+        self.__key_name   = key_name
+        self.__cache_size = cache_size
+        self.__entries    = OrderedDict()
+
+    def __getitem__(self, key : int) -> CSRRatingsEntry :
+        if not ( isinstance(key, (int, np.integer)) and 1 <= key <= self.__index.key_count ):
+            raise KeyError(key)
+        entry = self.__entries.get(key)
+        if entry is not None:
+            self.__entries.move_to_end(key)
+            return entry
+        entry = CSRRatingsEntry(self.__index, int(key), self.__key_name)
+        self.__entries[int(key)] = entry
+        if len(self.__entries) > self.__cache_size:
+            self.__entries.popitem(last=False)
+        return entry
+
+    def __iter__(self) -> Iterator[int] :
+        return iter(range(1, self.__index.key_count+1))
+
+    def __len__(self) -> int :
+        return self.__index.key_count
+
+
+class UserRatingsView:
+    """
+        Read-only stand-in for <code>UserRatingsDatabase</code> backed by a per user <code>CSRRatingsIndex</code>.
+    """
+    def __init__(self, *, index : CSRRatingsIndex) :
+        self.index        = index
+        self.user_count   = index.key_count
+        self.user_ratings = CSRRatingsEntries(index, 'user_id')
+
+
+class MovieRatingsView:
+    """
+        Read-only stand-in for <code>MovieRatingsDatabase</code> backed by a per movie <code>CSRRatingsIndex</code>.
+    """
+    def __init__(self, *, index : CSRRatingsIndex) :
+        self.index         = index
+        self.movie_count   = index.key_count
+        self.movie_ratings = CSRRatingsEntries(index, 'movie_id')
@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 10:12:40 2026
+
+@author: jonat
+"""
+import numpy as np
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, Iterator
+from mp_parsing_algorithms import RatingsDatabase, UserRatingsDatabase, MovieRatingsDatabase
+from mp_columnar_algorithms import ColumnarRatings
+
+
+def _id_typecode(largest_id : int) -> str :
+    # 2 byte ids where they fit (ml-100k to ml-10m), else 4 bytes
+    return 'H' if largest_id < 1 << 16 else 'I'
+
+
+def _rating_typecode(values : np.ndarray) -> str :
+    # whole star ratings in 1 byte, anything else (half stars) as double
+    if not len(values):
+        return 'b'
+    if np.array_equal(values, np.round(values)) and -128 <= values.min() and values.max() <= 127:
+        return 'b'
+    return 'd'
+
+
+class CompactRatings(Mapping):
+    """
+        Read-only <code>dict</code>-like ratings of one user or movie ( other id -> rating ), held as two parallel
+        <code>array</code> columns sorted by id: 2 or 4 bytes per id and 1 byte per whole star rating, instead of a
+        dictionary entry and an int object per rating.<br>
+        Lookups are binary searches; iteration is in increasing id order (not the order the ratings were added),
+        so that two rows can be intersected by a merge join.
+    """
+    __slots__ = ('ids', 'ratings')
+
+    def __init__(self, ids : array, ratings : array) :
+        self.ids     = ids
+        self.ratings = ratings
+
+    def __getitem__(self, other : int) -> int | float :
+        position = bisect_left(self.ids, other)
+        if position < len(self.ids) and self.ids[position] == other:
+            return self.ratings[position]
+        raise KeyError(other)
+
+    def __contains__(self, other : object) -> bool :
+        position = bisect_left(self.ids, other)
+        return position < len(self.ids) and self.ids[position] == other
+
+    def get(self, other : int, default : any = None) -> any :
+        position = bisect_left(self.ids, other)
+        if position < len(self.ids) and self.ids[position] == other:
+            return self.ratings[position]
+        return default
+
+    def __iter__(self) -> Iterator[int] :
+        return iter(self.ids)
+
+    def __len__(self) -> int :
+        return len(self.ids)
+
+    def keys(self) -> array :
+        return self.ids
+
+    def values(self) -> array :
+        return self.ratings
+
+    def items(self) -> Iterator[tuple] :
+        return zip(self.ids, self.ratings)
+
+
+class CoRatings:
+    """
+        Sums over the co-rated ids of two rows ( <code>count</code> ids ), of the ratings less their centres:
+        <code>sum_X</code>, <code>sum_Y</code>, <code>sum_XX</code>, <code>sum_YY</code> and <code>sum_XY</code>.
+    """
+    __slots__ = ('count', 'sum_X', 'sum_Y', 'sum_XX', 'sum_YY', 'sum_XY')
+
+    def __init__(self, count : int, sum_X : float, sum_Y : float, sum_XX : float, sum_YY : float, sum_XY : float) :
+        self.count  = count
+        self.sum_X  = sum_X
+        self.sum_Y  = sum_Y
+        self.sum_XX = sum_XX
+        self.sum_YY = sum_YY
+        self.sum_XY = sum_XY
+
+
+# the sums of two rows without a co-rated id
+NO_CO_RATINGS = CoRatings(0, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+
+# a row this many times longer than the other is searched (galloping) rather than walked
+GALLOP_RATIO = 8
+# from this many ids in the shorter row, its ids are searched in the longer all at once by numpy
+SEARCH_LENGTH = 32
+# from this many co-rated ids found by that search, their sums are vectorized too
+SUM_LENGTH = 32
+
+
+def _gallop_co_ratings(short : CompactRatings, long : CompactRatings, centre_short : float, centre_long : float) -> tuple :
+    # the shorter row walked, each id binary searched in the longer row from the last position found
+    short_ids, short_ratings = short.ids, short.ratings
+    long_ids, long_ratings   = long.ids, long.ratings
+    long_length = len(long_ids)
+    count = 0
+    sum_short = sum_long = sum_short_short = sum_long_long = sum_short_long = 0.0
+    position = 0
+    for index, other in enumerate(short_ids):
+        position = bisect_left(long_ids, other, position)
+        if position == long_length:
+            break
+        if long_ids[position] == other:
+            dev_value_short = short_ratings[index] - centre_short
+            dev_value_long  = long_ratings[position] - centre_long
+            count           += 1
+            sum_short       += dev_value_short
+            sum_long        += dev_value_long
+            sum_short_long  += dev_value_short * dev_value_long
+            sum_short_short += dev_value_short * dev_value_short
+            sum_long_long   += dev_value_long * dev_value_long
+    return count, sum_short, sum_long, sum_short_short, sum_long_long, sum_short_long
+
+
+def _search_co_ratings(short : CompactRatings, long : CompactRatings, centre_short : float, centre_long : float) -> tuple :
+    # positions of the shorter row's ids in the longer one by one vectorized binary search, then the sums over
+    # the co-rated ids vectorized too: the deviations as a 2 x count matrix, whose product with its transpose
+    # holds the sums of squares and of cross products
+    short_ids = np.frombuffer(short.ids, dtype=short.ids.typecode)
+    long_ids  = np.frombuffer(long.ids, dtype=long.ids.typecode)
+    positions = np.searchsorted(long_ids, short_ids)
+    np.minimum(positions, len(long_ids)-1, out=positions)
+    matched   = np.flatnonzero( long_ids[positions] == short_ids )
+    if matched.size < SUM_LENGTH:
+        # few co-ratings: summed in a loop, cheaper than the fixed cost of the array operations
+        short_ratings, long_ratings = short.ratings, long.ratings
+        count = 0
+        sum_short = sum_long = sum_short_short = sum_long_long = sum_short_long = 0.0
+        for index, position in zip(matched.tolist(), positions[matched].tolist()):
+            dev_value_short = short_ratings[index] - centre_short
+            dev_value_long  = long_ratings[position] - centre_long
+            count           += 1
+            sum_short       += dev_value_short
+            sum_long        += dev_value_long
+            sum_short_long  += dev_value_short * dev_value_long
+            sum_short_short += dev_value_short * dev_value_short
+            sum_long_long   += dev_value_long * dev_value_long
+        return count, sum_short, sum_long, sum_short_short, sum_long_long, sum_short_long
+    deviations = np.empty( (2, matched.size), dtype=np.float64 )
+    np.subtract( np.frombuffer(short.ratings, dtype=short.ratings.typecode)[matched], centre_short, out=deviations[0] )
+    np.subtract( np.frombuffer(long.ratings, dtype=long.ratings.typecode)[positions[matched]], centre_long, out=deviations[1] )
+    products = deviations @ deviations.T
+    sums     = deviations.sum(axis=1)
+    return ( int(matched.size), float(sums[0]), float(sums[1]),
+             float(products[0, 0]), float(products[1, 1]), float(products[0, 1]) )
+
+
+def _merge_co_ratings(X : CompactRatings, Y : CompactRatings, centre_X : float, centre_Y : float) -> tuple :
+    # both rows walked together, the one with the smaller id advancing
+    X_ids, X_ratings = X.ids, X.ratings
+    Y_ids, Y_ratings = Y.ids, Y.ratings
+    X_length, Y_length = len(X_ids), len(Y_ids)
+    count = 0
+    sum_X = sum_Y = sum_XX = sum_YY = sum_XY = 0.0
+    X_index = Y_index = 0
+    X_id, Y_id = X_ids[0], Y_ids[0]
+    while True:
+        if X_id < Y_id:
+            X_index += 1
+            if X_index == X_length:
+                break
+            X_id = X_ids[X_index]
+        elif Y_id < X_id:
+            Y_index += 1
+            if Y_index == Y_length:
+                break
+            Y_id = Y_ids[Y_index]
+        else:
+            dev_value_X = X_ratings[X_index] - centre_X
+            dev_value_Y = Y_ratings[Y_index] - centre_Y
+            count  += 1
+            sum_X  += dev_value_X
+            sum_Y  += dev_value_Y
+            sum_XY += dev_value_X * dev_value_Y
+            sum_XX += dev_value_X * dev_value_X
+            sum_YY += dev_value_Y * dev_value_Y
+            X_index += 1
+            Y_index += 1
+            if X_index == X_length or Y_index == Y_length:
+                break
+            X_id, Y_id = X_ids[X_index], Y_ids[Y_index]
+    return count, sum_X, sum_Y, sum_XX, sum_YY, sum_XY
+
+
+def co_ratings(X : CompactRatings, Y : CompactRatings, centre_X : float = 0.0, centre_Y : float = 0.0) -> CoRatings :
+    """
+        Function intersects two sorted rows (merge join, galloping or vectorized search) and sums their co-ratings, the
+        primitive of any pairwise similarity over co-rated ids (Pearson, cosine, ...).<br>
+        Rows of comparable length are walked together; when one is <code>GALLOP_RATIO</code> times longer, the
+        shorter is walked and each of its ids binary searched in the longer from the last position found; from
+        <code>SEARCH_LENGTH</code> ids in the shorter row the searches are made at once by numpy, and from
+        <code>SUM_LENGTH</code> co-rated ids so are the sums. Rows whose id ranges do not overlap return at once.<br>
+        Squares are products, and sums run in increasing id order (or numpy's order) rather than the order the
+        dictionary databases were filled in, so a Pearson similarity from these sums can differ from the dictionary
+        path in its last bits (about 1e-15); neighbor rankings are not affected, see <code>similarity_rank</code>.
+        On ml-100k a Pearson similarity costs about 12 µs this way against 16 µs on the dictionaries, and on
+        the 4 x ml-100k synthetic benchmark dataset 10 µs against 20 µs.<br>
+
+        Parameters:<br>
+        - <strong>X</strong>        (<code>CompactRatings</code>): first row<br>
+        - <strong>Y</strong>        (<code>CompactRatings</code>): second row<br>
+        - <strong>centre_X</strong> (<code>float</code>):          (optional) value subtracted from X's ratings, e.g. its mean<br>
+        - <strong>centre_Y</strong> (<code>float</code>):          (optional) value subtracted from Y's ratings<br>
+
+        Returns:<br>
+        - <code>CoRatings</code>: count and sums over the co-rated ids
+    """
+    X_ids, Y_ids = X.ids, Y.ids
+    if not X_ids or not Y_ids or X_ids[-1] < Y_ids[0] or Y_ids[-1] < X_ids[0]:
+        return NO_CO_RATINGS
+    if len(X_ids) <= len(Y_ids) and len(X_ids) >= SEARCH_LENGTH:
+        count, sum_X, sum_Y, sum_XX, sum_YY, sum_XY = _search_co_ratings( X, Y, centre_X, centre_Y )
+    elif len(Y_ids) < len(X_ids) and len(Y_ids) >= SEARCH_LENGTH:
+        count, sum_Y, sum_X, sum_YY, sum_XX, sum_XY = _search_co_ratings( Y, X, centre_Y, centre_X )
+    elif len(Y_ids) >= GALLOP_RATIO * len(X_ids):
+        count, sum_X, sum_Y, sum_XX, sum_YY, sum_XY = _gallop_co_ratings( X, Y, centre_X, centre_Y )
+    elif len(X_ids) >= GALLOP_RATIO * len(Y_ids):
+        count, sum_Y, sum_X, sum_YY, sum_XX, sum_XY = _gallop_co_ratings( Y, X, centre_Y, centre_X )
+    else:
+        count, sum_X, sum_Y, sum_XX, sum_YY, sum_XY = _merge_co_ratings( X, Y, centre_X, centre_Y )
+    if not count:
+        return NO_CO_RATINGS
+    return CoRatings(count, sum_X, sum_Y, sum_XX, sum_YY, sum_XY)
+
+
+class CompactUserRatings:
+    """
+        Slotted, read-only stand-in for <code>UserRatings</code> over <code>CompactRatings</code>.
+    """
+    __slots__ = ('user_id', 'score', 'ratings_count', 'ratings')
+
+    def __init__(self, *, user_id : int, score : int | float, ratings_count : int, ratings : CompactRatings) :
+        self.user_id       = user_id
+        self.score         = score
+        self.ratings_count = ratings_count
+        self.ratings       = ratings
+
+
+class CompactMovieRatings:
+    """
+        Slotted, read-only stand-in for <code>MovieRatings</code> over <code>CompactRatings</code>.
+    """
+    __slots__ = ('movie_id', 'score', 'ratings_count', 'ratings')
+
+    def __init__(self, *, movie_id : int, score : int | float, ratings_count : int, ratings : CompactRatings) :
+        self.movie_id      = movie_id
+        self.score         = score
+        self.ratings_count = ratings_count
+        self.ratings       = ratings
+
+
+def _compact_rows(keys : np.ndarray, others : np.ndarray, values : np.ndarray, key_count : int, other_count : int) -> list :
+    # per key (1..key_count) sorted CompactRatings, the last rating of a repeated (key, other) pair kept
+    id_typecode     = _id_typecode( max(other_count, int(others.max()) if len(others) else 0) )
+    rating_typecode = _rating_typecode(values)
+    order  = np.lexsort(( np.arange(len(keys)), others, keys ))
+    keys, others, values = keys[order], others[order], values[order]
+    last   = np.ones(len(keys), dtype=bool)
+    last[:-1] = ( keys[1:] != keys[:-1] ) | ( others[1:] != others[:-1] )
+    keys, others, values = keys[last], others[last], values[last]
+    bounds = np.searchsorted( keys, np.arange(1, key_count+2) )
+    id_bytes     = others.astype( np.uint16 if id_typecode == 'H' else np.uint32 )
+    rating_bytes = values.astype( np.int8 if rating_typecode == 'b' else np.float64 )
+    rows = []
+    for key in range(key_count):
+        start, end = bounds[key], bounds[key+1]
+        ids, ratings = array(id_typecode), array(rating_typecode)
+        ids.frombytes( id_bytes[start:end].tobytes() )
+        ratings.frombytes( rating_bytes[start:end].tobytes() )
+        rows.append( CompactRatings(ids, ratings) )
+    return rows
+
+
+def _compact_database(user_ids : np.ndarray, movie_ids : np.ndarray, values : np.ndarray,
+                      user_count : int, movie_count : int) -> RatingsDatabase :
+    integral = _rating_typecode(values) == 'b'
+    total    = ( lambda row : int(sum(row.ratings)) ) if integral else ( lambda row : float(sum(row.ratings)) )
+    ratings_per_user  = UserRatingsDatabase( user_count = 0 )
+    ratings_per_movie = MovieRatingsDatabase( movie_count = 0 )
+    ratings_per_user.user_count   = user_count
+    ratings_per_movie.movie_count = movie_count
+    ratings_per_user.user_ratings = { user_id : CompactUserRatings( user_id = user_id, score = total(row),
+                                                                    ratings_count = len(row), ratings = row )
+                                      for user_id, row in enumerate(_compact_rows( user_ids, movie_ids, values,
+                                                                                   user_count, movie_count ), start=1) }
+    ratings_per_movie.movie_ratings = { movie_id : CompactMovieRatings( movie_id = movie_id, score = total(row),
+                                                                        ratings_count = len(row), ratings = row )
+                                        for movie_id, row in enumerate(_compact_rows( movie_ids, user_ids, values,
+                                                                                      movie_count, user_count ), start=1) }
+    return RatingsDatabase( ratings_per_user = ratings_per_user, ratings_per_movie = ratings_per_movie )
+
+
+def generate_compact_ratings_database(ratings : ColumnarRatings, user_count : int | None = None,
+                                      movie_count : int | None = None) -> RatingsDatabase :
+    """
+        Function builds a read-only ratings database of <code>CompactUserRatings</code> and
+        <code>CompactMovieRatings</code> straight from columnar ratings, without dictionaries per user or movie.<br>
+        Scores and counts are those of the stored ratings; a repeated (user, movie) rating keeps the last one.<br>
+
+        Parameters:<br>
+        - <strong>ratings</strong>     (<code>ColumnarRatings</code>): ratings, e.g. from generate_columnar_ratings_streamed<br>
+        - <strong>user_count</strong>  (<code>int</code>):             (optional) number of users, else the largest user id<br>
+        - <strong>movie_count</strong> (<code>int</code>):             (optional) number of movies, else the largest movie id<br>
+
+        Returns:<br>
+        - <code>RatingsDatabase</code>: database containing compact ratings data per user and per movie
+    """
+    user_ids  = np.asarray(ratings.user_id, dtype=np.int64)
+    movie_ids = np.asarray(ratings.movie_id, dtype=np.int64)
+    values    = np.asarray(ratings.rating, dtype=np.float64)
+    if user_count is None:
+        user_count  = int(user_ids.max()) if len(user_ids) else 0
+    if movie_count is None:
+        movie_count = int(movie_ids.max()) if len(movie_ids) else 0
+    return _compact_database(user_ids, movie_ids, values, user_count, movie_count)
+
+
+def compact_ratings_database(ratings_database : RatingsDatabase) -> RatingsDatabase :
+    """
+        Function converts a ratings database (e.g. from generate_ratings_database) to the compact, read-only form.<br>
+        The ratings are unchanged, but each user's and movie's ratings iterate in increasing id order.<br>
+
+        Parameters:<br>
+        - <strong>ratings_database</strong> (<code>RatingsDatabase</code>): database containing ratings data per user and per movie<br>
+
+        Returns:<br>
+        - <code>RatingsDatabase</code>: database containing compact ratings data per user and per movie
+    """
+    _user_ratings = ratings_database.ratings_per_user.user_ratings
+    counts    = [ len(_user_ratings[user_id].ratings) for user_id in _user_ratings ]
+    user_ids  = np.repeat( np.fromiter( _user_ratings, dtype=np.int64, count=len(_user_ratings) ), counts )
+    movie_ids = np.fromiter( ( movie_id for user_id in _user_ratings for movie_id in _user_ratings[user_id].ratings ),
+                             dtype=np.int64, count=sum(counts) )
+    values    = np.fromiter( ( rating for user_id in _user_ratings for rating in _user_ratings[user_id].ratings.values() ),
+                             dtype=np.float64, count=sum(counts) )
+    return _compact_database( user_ids, movie_ids, values,
+                              ratings_database.ratings_per_user.user_count, ratings_database.ratings_per_movie.movie_count )
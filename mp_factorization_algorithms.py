@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 10:26:51 2026
+
+@author: jonat
+"""
+import numpy as np
+from typing import List
+from mp_parsing_algorithms import UserRatingsDatabase
+
+
+class BiasedMatrixFactorization:
+    """
+        Latent factor model of the ratings: rating(u, i) ~ mean + user_bias[u] + item_bias[i] + user_factors[u] . item_factors[i].<br>
+        Trained by alternating least squares: with the item side fixed, each user's factors and bias are the
+        solution of a small regularized least squares problem over the user's ratings, and likewise for items.
+        An epoch therefore costs O(ratings x factors^2) plus one (factors+1)^2 solve per user and per movie.<br>
+        A share of the training ratings (<code>validation_percent</code>) is held out; training stops once the
+        validation RMSE has not improved by <code>tolerance</code> for <code>patience</code> epochs, keeping the best
+        epoch's factors.<br>
+        Predictions are clipped to the range of the training ratings.<br>
+        Ids are 1 based; row <code>id - 1</code> of each array belongs to that user or movie.
+    """
+    def __init__(self, *, factors : int = 20, regularization : float = 15.0, epochs : int = 30, patience : int = 2,
+                 tolerance : float = 1e-3, validation_percent : float = 5, seed : int | None = 0) :
+        self.factors            = factors
+        self.regularization     = regularization
+        self.epochs             = epochs
+        self.patience           = patience
+        self.tolerance          = tolerance
+        self.validation_percent = validation_percent
+        self.seed               = seed
+        self.global_mean  = 0.0
+        self.user_bias    = np.zeros(0)
+        self.item_bias    = np.zeros(0)
+        self.user_factors = np.zeros((0, factors))
+        self.item_factors = np.zeros((0, factors))
+        self.rating_range = (1.0, 5.0)
+        # validation rmse per epoch of the last fit
+        self.history : List[float] = []
+
+    def fit(self, ratings_per_user : UserRatingsDatabase, movie_count : int) -> 'BiasedMatrixFactorization' :
+        """
+            Function trains the model on a ratings database.<br>
+
+            Parameters:<br>
+            - <strong>ratings_per_user</strong> (<code>UserRatingsDatabase</code>): training ratings per user<br>
+            - <strong>movie_count</strong>      (<code>int</code>):                 number of movies (ids 1 to movie_count)<br>
+
+            Returns:<br>
+            - <code>BiasedMatrixFactorization</code>: the fitted model
+        """
+        _ratings_per_user = ratings_per_user.user_ratings
+        user_count = ratings_per_user.user_count
+        users   = np.fromiter( ( user_id-1 for user_id in range(1, user_count+1)
+                                           for movie_id in _ratings_per_user[user_id].ratings ), dtype=np.intp )
+        movies  = np.fromiter( ( movie_id-1 for user_id in range(1, user_count+1)
+                                            for movie_id in _ratings_per_user[user_id].ratings ), dtype=np.intp )
+        ratings = np.fromiter( ( rating for user_id in range(1, user_count+1)
+                                        for rating in _ratings_per_user[user_id].ratings.values() ), dtype=np.float64 )
+        # ordered by (user, movie), so that the validation split and every sum are independent of
+        # dictionary order ( e.g. of an IncrementalRatingsDatabase after apply_fold )
+        order   = np.lexsort(( movies, users ))
+        users, movies, ratings = users[order], movies[order], ratings[order]
+
+        generator = np.random.default_rng(self.seed)
+        validation = np.zeros( len(ratings), dtype=bool )
+        validation[ generator.permutation(len(ratings))[: int( len(ratings) * self.validation_percent/100 )] ] = True
+        training = ~validation
+
+        self.global_mean  = float(ratings[training].mean()) if training.any() else 0.0
+        self.rating_range = ( float(ratings.min()), float(ratings.max()) ) if len(ratings) else (1.0, 5.0)
+        self.user_bias    = np.zeros(user_count)
+        self.item_bias    = np.zeros(movie_count)
+        self.user_factors = generator.normal( 0.0, 0.1, (user_count, self.factors) )
+        self.item_factors = generator.normal( 0.0, 0.1, (movie_count, self.factors) )
+
+        # CSR layouts of the training ratings by user and by movie
+        by_user  = _csr_rows( users[training], movies[training], ratings[training], user_count )
+        by_movie = _csr_rows( movies[training], users[training], ratings[training], movie_count )
+
+        self.history = []
+        best = None
+        best_rmse = np.inf
+        stale_epochs = 0
+        for epoch in range(self.epochs):
+            # users given items, then items given users
+            _solve_side( by_user, self.user_factors, self.user_bias, self.item_factors, self.item_bias,
+                         self.global_mean, self.regularization )
+            _solve_side( by_movie, self.item_factors, self.item_bias, self.user_factors, self.user_bias,
+                         self.global_mean, self.regularization )
+            if not validation.any():
+                continue
+            predictions = self.__predict_indices( users[validation], movies[validation] )
+            validation_rmse = float(np.sqrt(np.mean( ( predictions - ratings[validation] ) ** 2 )))
+            self.history.append(validation_rmse)
+            # an epoch counts as progress only when it improves on the best by the tolerance
+            stale_epochs = 0 if validation_rmse < best_rmse - self.tolerance else stale_epochs + 1
+            if validation_rmse < best_rmse:
+                best_rmse = validation_rmse
+                best      = ( self.user_bias.copy(), self.item_bias.copy(), self.user_factors.copy(), self.item_factors.copy() )
+            # early stopping
+            if stale_epochs >= self.patience:
+                break
+        if best is not None:
+            self.user_bias, self.item_bias, self.user_factors, self.item_factors = best
+        return self
+
+    def __predict_indices(self, users : np.ndarray, movies : np.ndarray) -> np.ndarray :
+        # 0 based indices
+        predictions = ( self.global_mean + self.user_bias[users] + self.item_bias[movies]
+                        + np.einsum( 'ij,ij->i', self.user_factors[users], self.item_factors[movies] ) )
+        return np.clip( predictions, *self.rating_range )
+
+    def predict(self, user_id : int, movie_id : int) -> float | None :
+        """
+            Returns the predicted rating of <code>movie_id</code> by <code>user_id</code>, an O(factors) dot product;
+            None for ids the model was not fitted with.
+        """
+        if not ( 1 <= user_id <= len(self.user_bias) and 1 <= movie_id <= len(self.item_bias) ):
+            return None
+        return float( self.__predict_indices( np.array([user_id-1]), np.array([movie_id-1]) )[0] )
+
+    def predict_batch(self, user_ids : List[int], movie_ids : List[int]) -> List[float | None] :
+        """
+            Returns the predictions of many (user_id, movie_id) pairs at once, in order.
+        """
+        user_ids  = np.asarray(user_ids, dtype=np.intp)
+        movie_ids = np.asarray(movie_ids, dtype=np.intp)
+        known = ( user_ids >= 1 ) & ( user_ids <= len(self.user_bias) ) & ( movie_ids >= 1 ) & ( movie_ids <= len(self.item_bias) )
+        predictions = np.full( len(user_ids), np.nan )
+        predictions[known] = self.__predict_indices( user_ids[known]-1, movie_ids[known]-1 )
+        return [ None if np.isnan(prediction) else float(prediction) for prediction in predictions ]
+
+    def save(self, path : str) -> None :
+        """
+            Writes the fitted factors and biases in <code>.npz</code> format to exactly <code>path</code> (no suffix
+            is added), so that <code>load(path)</code> reads them back.
+        """
+        # through a file handle, as np.savez appends .npz to a path without it
+        with open(path, 'wb') as file_handle:
+            np.savez( file_handle, global_mean = self.global_mean, rating_range = np.array(self.rating_range),
+                      user_bias = self.user_bias, item_bias = self.item_bias,
+                      user_factors = self.user_factors, item_factors = self.item_factors,
+                      settings = np.array([ self.factors, self.regularization, self.epochs, self.patience, self.tolerance,
+                                            self.validation_percent ]) )
+
+    @classmethod
+    def load(cls, path : str) -> 'BiasedMatrixFactorization' :
+        """
+            Reads a model written by <code>save</code> to <code>path</code>.
+        """
+        with open(path, 'rb') as file_handle, np.load(file_handle) as data:
+            factors, regularization, epochs, patience, tolerance, validation_percent = data['settings'].tolist()
+            model = cls( factors = int(factors), regularization = regularization, epochs = int(epochs),
+                         patience = int(patience), tolerance = tolerance, validation_percent = validation_percent )
+            model.global_mean  = float(data['global_mean'])
+            model.rating_range = tuple(data['rating_range'].tolist())
+            model.user_bias    = data['user_bias']
+            model.item_bias    = data['item_bias']
+            model.user_factors = data['user_factors']
+            model.item_factors = data['item_factors']
+        return model
+
+
+def _csr_rows(keys : np.ndarray, others : np.ndarray, values : np.ndarray, key_count : int) -> tuple :
+    # (indptr, others, values) grouped by key (0 based)
+    order  = np.argsort(keys, kind='stable')
+    indptr = np.zeros( key_count+1, dtype=np.intp )
+    np.cumsum( np.bincount(keys, minlength=key_count), out=indptr[1:] )
+    return indptr, others[order], values[order]
+
+
+def _solve_side(rows : tuple, factors : np.ndarray, bias : np.ndarray, other_factors : np.ndarray, other_bias : np.ndarray,
+                global_mean : float, regularization : float) -> None :
+    # one ALS half step: each row's [factors, bias] solves a ridge regression on the other side's [factors, 1]
+    indptr, others, values = rows
+    factor_count = factors.shape[1]
+    identity = regularization * np.eye(factor_count+1)
+    for row in range(len(indptr)-1):
+        start, end = indptr[row], indptr[row+1]
+        if start == end:
+            # no ratings ~ the regularized solution is 0
+            factors[row] = 0.0
+            bias[row]    = 0.0
+            continue
+        columns = others[start:end]
+        design  = np.empty( (end-start, factor_count+1) )
+        design[:, :factor_count] = other_factors[columns]
+        design[:, factor_count]  = 1.0
+        target  = values[start:end] - global_mean - other_bias[columns]
+        solution = np.linalg.solve( design.T @ design + identity, design.T @ target )
+        factors[row] = solution[:factor_count]
+        bias[row]    = solution[factor_count]
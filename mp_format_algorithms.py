@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:21:48 2026
+
+@author: jonat
+"""
+import os
+import csv
+import numpy as np
+from dataclasses import dataclass
+from collections.abc import Callable, Iterator
+from typing import List, Tuple
+from mp_parsing_algorithms import ParseDatabase, UserData, MovieData, RatingData
+from mp_parsing_algorithms import RatingsDatabase, UserRatingsDatabase, MovieRatingsDatabase, accumulate_ratings
+from mp_parsing_algorithms import user_datafile_parser, movie_datafile_parser
+from mp_columnar_algorithms import ColumnarRatings
+from mp_compact_algorithms import generate_compact_ratings_database
+
+
+# genre names of the ml-100k/ml-1m/ml-10m releases, in u.genres order
+MOVIELENS_GENRES : List[str] = [ 'unknown', 'Action', 'Adventure', 'Animation', "Children's", 'Comedy', 'Crime',
+                                 'Documentary', 'Drama', 'Fantasy', 'Film-Noir', 'Horror', 'Musical', 'Mystery',
+                                 'Romance', 'Sci-Fi', 'Thriller', 'War', 'Western' ]
+# the csv releases spell "Children" and add two genres, appended so earlier indices are unchanged
+MOVIELENS_CSV_GENRES : List[str] = MOVIELENS_GENRES + [ 'IMAX', '(no genres listed)' ]
+# ml-20m/25m "Children" shares the index of "Children's"
+GENRE_ALIASES : dict = { 'Children' : "Children's" }
+
+
+@dataclass (kw_only=True, frozen=True)
+class DatasetFormat:
+    """
+        Layout of one MovieLens release: file names, field delimiter, header line, text encoding and genres.<br>
+        <code>users_file</code> is None for releases without demographic data (ml-10m and later).
+    """
+    name         : str
+    directory    : str
+    ratings_file : str
+    movies_file  : str
+    users_file   : str | None
+    delimiter    : str | None # None ~ any whitespace
+    header       : bool
+    encoding     : str
+    genres       : List[str]
+
+
+DATASET_FORMATS : dict = {
+    'ml-100k' : DatasetFormat( name = 'ml-100k', directory = 'ml-100k', ratings_file = 'u.ratings', movies_file = 'u.movies',
+                               users_file = 'u.users', delimiter = None, header = False, encoding = 'windows-1252',
+                               genres = MOVIELENS_GENRES ),
+    'ml-1m'   : DatasetFormat( name = 'ml-1m', directory = 'ml-1m', ratings_file = 'ratings.dat', movies_file = 'movies.dat',
+                               users_file = 'users.dat', delimiter = '::', header = False, encoding = 'latin-1',
+                               genres = MOVIELENS_GENRES ),
+    'ml-10m'  : DatasetFormat( name = 'ml-10m', directory = 'ml-10M100K', ratings_file = 'ratings.dat', movies_file = 'movies.dat',
+                               users_file = None, delimiter = '::', header = False, encoding = 'utf-8',
+                               genres = MOVIELENS_CSV_GENRES ),
+    'ml-20m'  : DatasetFormat( name = 'ml-20m', directory = 'ml-20m', ratings_file = 'ratings.csv', movies_file = 'movies.csv',
+                               users_file = None, delimiter = ',', header = True, encoding = 'utf-8',
+                               genres = MOVIELENS_CSV_GENRES ),
+    'ml-25m'  : DatasetFormat( name = 'ml-25m', directory = 'ml-25m', ratings_file = 'ratings.csv', movies_file = 'movies.csv',
+                               users_file = None, delimiter = ',', header = True, encoding = 'utf-8',
+                               genres = MOVIELENS_CSV_GENRES ),
+}
+
+
+def stream_lines(path : str, encoding : str, chunk_bytes : int = 1 << 24) -> Iterator[List[str]] :
+    """
+        Function yields the lines of a file in chunks of roughly <code>chunk_bytes</code>,
+        so that only one chunk of text is held in memory at a time.
+    """
+    with open(path, 'r', encoding=encoding) as file_handle:
+        lines = file_handle.readlines(chunk_bytes)
+        while lines:
+            yield lines
+            lines = file_handle.readlines(chunk_bytes)
+
+
+def stream_ratings(dataset : DatasetFormat, directory : str | None = None, chunk_bytes : int = 1 << 24) -> Iterator[np.ndarray] :
+    """
+        Function yields the ratings file of a dataset as chunks of (user id, movie id, rating, time stamp) rows.<br>
+
+        Parameters:<br>
+        - <strong>dataset</strong>     (<code>DatasetFormat</code>): layout of the release<br>
+        - <strong>directory</strong>   (<code>str</code>):           (optional) location of the release, else <code>dataset.directory</code><br>
+        - <strong>chunk_bytes</strong> (<code>int</code>):           approximate size of each chunk of text<br>
+
+        Returns:<br>
+        - <code>Iterator</code>: float64 arrays of shape (rows, 4)
+    """
+    path = os.path.join(directory or dataset.directory, dataset.ratings_file)
+    first_chunk = True
+    for lines in stream_lines(path, dataset.encoding, chunk_bytes):
+        if first_chunk and dataset.header:
+            lines = lines[1:]
+        first_chunk = False
+        text = ''.join(lines)
+        if dataset.delimiter is not None:
+            text = text.replace(dataset.delimiter, ' ')
+        table = np.array( text.split(), dtype=np.float64 )
+        yield table.reshape(-1, 4)
+
+
+def _rating_values(ratings : np.ndarray) -> list :
+    # whole star ratings as python int (as parsed from ml-100k), half stars as float
+    if np.array_equal(ratings, np.round(ratings)):
+        return ratings.astype(np.int64).tolist()
+    return ratings.tolist()
+
+
+def generate_ratings_set_streamed(dataset : DatasetFormat, directory : str | None = None) -> ParseDatabase :
+    """
+        Function loads the ratings of any supported release into a <code>ParseDatabase</code>,
+        keyed from 1 in file order as by <code>generate_ratings_set</code>.<br>
+        This holds one <code>RatingData</code> per rating, as the cross-validation folds need, which is practical up
+        to ml-1m; larger releases load with <code>generate_columnar_ratings_streamed</code> or
+        <code>generate_ratings_database_streamed(..., compact=True)</code>.
+    """
+    database = ParseDatabase()
+    entry_number = 1
+    for user_id, movie_id, rating in stream_rating_tuples(dataset, directory, 1 << 24):
+        database.add( id = entry_number, data = RatingData( user_id = user_id, movie_id = movie_id, rating = rating ) )
+        entry_number += 1
+    return database
+
+
+def stream_rating_tuples(dataset : DatasetFormat, directory : str | None = None,
+                         chunk_bytes : int = 1 << 20) -> Iterator[Tuple[int, int, int | float]] :
+    """
+        Function yields the (user id, movie id, rating) of each line of a ratings file, in file order, parsing
+        one chunk of roughly <code>chunk_bytes</code> of text at a time.
+    """
+    for table in stream_ratings(dataset, directory, chunk_bytes):
+        ids = table[:, :2].astype(np.int64).tolist()
+        for (user_id, movie_id), rating in zip(ids, _rating_values(table[:, 2])):
+            yield user_id, movie_id, rating
+
+
+def generate_ratings_database_streamed(dataset : DatasetFormat, directory : str | None = None, *, user_count : int = 0,
+                                       movie_count : int = 0, chunk_bytes : int = 1 << 20,
+                                       compact : bool = False) -> RatingsDatabase :
+    """
+        Function builds the per user and per movie ratings of any supported release straight from the ratings
+        file: each chunk of lines is parsed and added to the aggregates before the next is read, without a
+        <code>ParseDatabase</code> of every rating in between. Peak memory is the aggregates plus one chunk.<br>
+        The result equals <code>generate_ratings_database</code> over <code>generate_ratings_set</code> of the same file.<br>
+        With <code>compact</code> the chunks are instead narrowed into columns and built into the read-only compact
+        database of <code>generate_compact_ratings_database</code>: no Python object per rating, which is what
+        ml-20m and ml-25m need. Its rows iterate in increasing id order.<br>
+
+        Parameters:<br>
+        - <strong>dataset</strong>     (<code>DatasetFormat</code>): layout of the release<br>
+        - <strong>directory</strong>   (<code>str</code>):           (optional) location of the release, else <code>dataset.directory</code><br>
+        - <strong>user_count</strong>  (<code>int</code>):           (optional) number of users, else the largest user id rated<br>
+        - <strong>movie_count</strong> (<code>int</code>):           (optional) number of movies, else the largest movie id rated<br>
+        - <strong>chunk_bytes</strong> (<code>int</code>):           approximate size of each chunk of text<br>
+        - <strong>compact</strong>     (<code>bool</code>):          build the compact database from columns<br>
+
+        Returns:<br>
+        - <code>RatingsDatabase</code>: database containing ratings data per user and per movie
+    """
+    if compact:
+        return generate_compact_ratings_database( ratings     = generate_columnar_ratings_streamed(dataset, directory, chunk_bytes),
+                                                  user_count  = user_count or None,
+                                                  movie_count = movie_count or None )
+    ratings_database = RatingsDatabase( ratings_per_user  = UserRatingsDatabase( user_count = user_count ),
+                                        ratings_per_movie = MovieRatingsDatabase( movie_count = movie_count ) )
+    return accumulate_ratings( ratings_database = ratings_database,
+                               ratings          = stream_rating_tuples(dataset, directory, chunk_bytes) )
+
+
+def generate_columnar_ratings_streamed(dataset : DatasetFormat, directory : str | None = None,
+                                       chunk_bytes : int = 1 << 24) -> ColumnarRatings :
+    """
+        Function loads the ratings of any supported release into a <code>ColumnarRatings</code>.<br>
+        Each chunk is narrowed to compact columns before the next is read, so peak memory is the
+        compact columns plus one chunk of text.
+    """
+    columns = { 'user_id' : [], 'movie_id' : [], 'rating' : [], 'timestamp' : [] }
+    for table in stream_ratings(dataset, directory, chunk_bytes):
+        columns['user_id'].append(table[:, 0].astype(np.int32))
+        columns['movie_id'].append(table[:, 1].astype(np.int32))
+        columns['rating'].append(table[:, 2].astype(np.float32))
+        columns['timestamp'].append(table[:, 3].astype(np.int64))
+    merged = { name : np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32 if name == 'rating' else np.int64)
+               for name, chunks in columns.items() }
+    # whole star releases are narrowed to int8
+    if np.array_equal(merged['rating'], np.round(merged['rating'])):
+        merged['rating'] = merged['rating'].astype(np.int8)
+    return ColumnarRatings(**merged)
+
+
+def _genre_flags(names : str, genres : List[str]) -> dict :
+    # "Action|Comedy" -> {1:1, 5:1}, in the ml-100k encoding
+    flags = {}
+    for name in names.split('|'):
+        name = GENRE_ALIASES.get(name, name)
+        if name in genres:
+            flags[genres.index(name)] = 1
+    return dict(sorted(flags.items()))
+
+
+def delimited_user_parser(data_feed : str) -> Tuple[int, UserData] | None :
+    """
+        Function parses a line of an ml-1m <code>users.dat</code> file ( "ID::GENDER::AGE::OCCUPATION::ZIP\\n" ).
+    """
+    if not data_feed[0].isdigit():
+        return None
+    fields = data_feed.rstrip('\n').split('::')
+    return int(fields[0]), UserData( age = int(fields[2]), gender = fields[1] )
+
+
+def delimited_movie_parser(dataset : DatasetFormat) -> Callable[[str], Tuple[int, MovieData] | None] :
+    """
+        Function returns a parser of movie lines for the '::' releases ( "ID::TITLE (YEAR)::GENRE|GENRE\\n" )
+        and csv releases ( 'ID,"TITLE (YEAR)",GENRE|GENRE\\n' ).
+    """
+    def parser(data_feed : str) -> Tuple[int, MovieData] | None :
+        if not data_feed[0].isdigit():
+            return None
+        if dataset.delimiter == ',':
+            # titles may be quoted and contain commas
+            fields = next(csv.reader([data_feed]))
+        else:
+            fields = data_feed.rstrip('\n').split(dataset.delimiter)
+        genre = _genre_flags(fields[2], dataset.genres)
+        return int(fields[0]), MovieData( title = fields[1], release_date = '', video_release_date = '', IMDB_url = '',
+                                          genre = genre )
+    return parser
+
+
+def generate_keyed_set(path : str, encoding : str, parser : Callable[[str], Tuple[int, any] | None]) -> ParseDatabase :
+    """
+        Function streams a users or movies file into a <code>ParseDatabase</code> keyed by the id found in each line,
+        as later releases do not number their movies contiguously.
+    """
+    database = ParseDatabase()
+    for lines in stream_lines(path, encoding):
+        for line in lines:
+            parsed = parser(line) if line.strip() else None
+            if parsed:
+                database.add( id = parsed[0], data = parsed[1] )
+    return database
+
+
+def generate_user_set_for(dataset : DatasetFormat, directory : str | None = None) -> ParseDatabase | None :
+    """
+        Function loads the users of a release, or returns None if the release has no users file.
+    """
+    if dataset.users_file is None:
+        return None
+    path = os.path.join(directory or dataset.directory, dataset.users_file)
+    if dataset.delimiter is None:
+        # ml-100k lines are keyed by their number, which is the user id
+        return generate_keyed_set(path, dataset.encoding, lambda line : _numbered(line, user_datafile_parser))
+    return generate_keyed_set(path, dataset.encoding, delimited_user_parser)
+
+
+def generate_movie_set_for(dataset : DatasetFormat, directory : str | None = None) -> ParseDatabase :
+    """
+        Function loads the movies of a release, keyed by movie id.
+    """
+    path = os.path.join(directory or dataset.directory, dataset.movies_file)
+    if dataset.delimiter is None:
+        return generate_keyed_set(path, dataset.encoding, lambda line : _numbered(line, movie_datafile_parser))
+    return generate_keyed_set(path, dataset.encoding, delimited_movie_parser(dataset))
+
+
+def _numbered(line : str, parser : Callable[[str], any]) -> Tuple[int, any] | None :
+    # ml-100k lines start with their id, followed by '|'
+    data = parser(line)
+    return ( int(line.split('|', 1)[0]), data ) if data else None
+
+
+def dataset_dimensions(ratings : ColumnarRatings) -> Tuple[int, int] :
+    """
+        Function returns the (user_count, movie_count) to size <code>generate_ratings_database</code>
+        and the CSR indices with: the largest ids, since ids need not be contiguous.
+    """
+    if not ratings.get_count():
+        return 0, 0
+    return int(ratings.user_id.max()), int(ratings.movie_id.max())
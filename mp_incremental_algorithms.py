@@ -0,0 +1,477 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:30:12 2026
+
+@author: jonat
+"""
+import numpy as np
+from collections.abc import Mapping
+from typing import List, Tuple
+from mp_parsing_algorithms import ParseDatabase, RatingsDatabase, UserRatingsDatabase
+from mp_parsing_algorithms import generate_ratings_database
+from mp_similarity_algorithms import RatingsMatrix, SimilarityMatrix, top_k_similar_users, rank_similar_users
+from mp_instrumentation_algorithms import count_event
+
+
+class PearsonStatistics:
+    """
+        Integer sufficient statistics of the Pearson similarity of every pair of users.<br>
+        For users x and y, over the movies both rated:<br>
+        - <code>co_count[x, y]</code>  number of co-rated movies<br>
+        - <code>co_sum[x, y]</code>    summation of x's ratings<br>
+        - <code>co_sum_sq[x, y]</code> summation of x's squared ratings<br>
+        - <code>co_cross[x, y]</code>  summation of x's rating times y's rating<br>
+        and per user <code>counts</code>/<code>scores</code> over all of the user's ratings (the mean).<br>
+        Ratings are multiplied by <code>scale</code> (2 for half star ratings) so that all sums are exact integers;
+        ratings that are not whole multiples of <code>1/scale</code> (e.g. quarter stars) raise ValueError.
+        Each rating added or removed updates the statistics of the raters of that movie only.
+    """
+    def __init__(self, *, co_count : np.ndarray, co_sum : np.ndarray, co_sum_sq : np.ndarray, co_cross : np.ndarray,
+                 counts : np.ndarray, scores : np.ndarray, scale : int) :
+        self.co_count  = co_count
+        self.co_sum    = co_sum
+        self.co_sum_sq = co_sum_sq
+        self.co_cross  = co_cross
+        self.counts    = counts
+        self.scores    = scores
+        self.scale     = scale
+
+    def __update(self, user_id : int, rating : int | float, raters : Mapping, sign : int) -> None :
+        # raters ~ the other users who rated the movie ( user_id -> rating ), excluding user_id
+        x = user_id - 1
+        r = _scaled_rating(rating, self.scale)
+        if len(raters):
+            ys = np.fromiter( raters.keys(), dtype=np.intp, count=len(raters) ) - 1
+            ry = _scaled_ratings( np.fromiter( raters.values(), dtype=np.float64, count=len(raters) ), self.scale ).astype(np.int64)
+            self.co_count[x, ys]  += sign
+            self.co_count[ys, x]  += sign
+            self.co_sum[x, ys]    += sign * r
+            self.co_sum[ys, x]    += sign * ry
+            self.co_sum_sq[x, ys] += sign * r * r
+            self.co_sum_sq[ys, x] += sign * ry * ry
+            self.co_cross[x, ys]  += sign * r * ry
+            self.co_cross[ys, x]  += sign * r * ry
+        # the user paired with itself
+        self.co_count[x, x]  += sign
+        self.co_sum[x, x]    += sign * r
+        self.co_sum_sq[x, x] += sign * r * r
+        self.co_cross[x, x]  += sign * r * r
+        self.counts[x] += sign
+        self.scores[x] += sign * r
+
+    def add_rating(self, user_id : int, rating : int | float, raters : Mapping) -> None :
+        """
+            Adds the rating of <code>user_id</code> for a movie, given the other raters of that movie.
+        """
+        self.__update(user_id, rating, raters, 1)
+
+    def remove_rating(self, user_id : int, rating : int | float, raters : Mapping) -> None :
+        """
+            Removes the rating of <code>user_id</code> for a movie, given the other raters of that movie.
+        """
+        self.__update(user_id, rating, raters, -1)
+
+    def add_pair_totals(self, totals : 'PairTotals', sign : int = 1) -> None :
+        """
+            Adds (<code>sign</code> = 1) or subtracts (-1) the statistics of a subset of the ratings, in place,
+            touching only the user pairs and users of <code>totals</code>.
+        """
+        self.co_count [totals.rows, totals.columns] += sign * totals.co_count
+        self.co_sum   [totals.rows, totals.columns] += sign * totals.co_sum
+        self.co_sum_sq[totals.rows, totals.columns] += sign * totals.co_sum_sq
+        self.co_cross [totals.rows, totals.columns] += sign * totals.co_cross
+        self.counts[totals.users] += sign * totals.counts
+        self.scores[totals.users] += sign * totals.scores
+
+    def similarity_matrix(self) -> SimilarityMatrix :
+        """
+            Returns the Pearson similarities implied by the statistics: the same definition as
+            <code>pearson_correlation_coeff_similarity_prediction</code> (means over all ratings, deviations over
+            co-rated movies, 0.0 on zero covariance or no ratings), equal to it up to floating point rounding.<br>
+            The zero covariance test is made on exact integers. The floating point summations of
+            <code>generate_similarity_matrix</code> depend on rating order, so its values can differ from these in
+            the last few bits (about 1e-15); neighbors are ranked to <code>RANK_DECIMALS</code> places, so both rank
+            the same, see <code>similarity_parity</code>.
+        """
+        N = self.counts
+        S = self.scores
+        count_event('similarity_calls', len(N) * len(N))
+        Nx, Ny = N[:, None], N[None, :]
+        Sx, Sy = S[:, None], S[None, :]
+        # covariance and deviations scaled by Nx*Ny, Nx^2 and Ny^2 respectively, which leaves integers
+        covariance  = Nx*Ny*self.co_cross - Nx*Sy*self.co_sum - Ny*Sx*self.co_sum.T + self.co_count*Sx*Sy
+        deviation_X = Nx*Nx*self.co_sum_sq - 2*Nx*Sx*self.co_sum + self.co_count*Sx*Sx
+        deviation_Y = deviation_X.T
+        valid = ( covariance != 0 ) & ( Nx > 0 ) & ( Ny > 0 )
+        return SimilarityMatrix(similarities = _pearson(covariance, deviation_X, deviation_Y, valid))
+
+    def similarity_row(self, user_id : int) -> np.ndarray :
+        """
+            Returns row <code>user_id</code> of <code>similarity_matrix()</code> in O(number of users).
+        """
+        x = user_id - 1
+        N = self.counts
+        S = self.scores
+        Nx, Sx = N[x], S[x]
+        covariance  = Nx*N*self.co_cross[x] - Nx*S*self.co_sum[x] - N*Sx*self.co_sum[:, x] + self.co_count[x]*Sx*S
+        deviation_X = Nx*Nx*self.co_sum_sq[x] - 2*Nx*Sx*self.co_sum[x] + self.co_count[x]*Sx*Sx
+        deviation_Y = N*N*self.co_sum_sq[:, x] - 2*N*S*self.co_sum[:, x] + self.co_count[:, x]*S*S
+        valid = ( covariance != 0 ) & ( Nx > 0 ) & ( N > 0 )
+        return _pearson(covariance, deviation_X, deviation_Y, valid)
+
+
+def similarity_parity(similarity_matrix : SimilarityMatrix, reference : SimilarityMatrix, k : int) -> Tuple[float, int] :
+    """
+        Function compares a similarity matrix (e.g. of <code>IncrementalRatingsDatabase</code>) with a reference
+        (e.g. <code>generate_similarity_matrix</code> of the rebuilt training database).<br>
+
+        Parameters:<br>
+        - <strong>similarity_matrix</strong> (<code>SimilarityMatrix</code>): similarities to check<br>
+        - <strong>reference</strong>         (<code>SimilarityMatrix</code>): expected similarities<br>
+        - <strong>k</strong>                 (<code>int</code>):              neighbors compared per user<br>
+
+        Returns:<br>
+        - <code>tuple</code>: (largest absolute difference of a similarity, number of users whose k nearest neighbors differ)
+    """
+    difference = float( np.abs( similarity_matrix.similarities - reference.similarities ).max(initial=0.0) )
+    mismatches = 0
+    for user_id in range(1, reference.user_count+1):
+        neighbors, _ = rank_similar_users(user_id, similarity_matrix, k)
+        expected, _  = rank_similar_users(user_id, reference, k)
+        mismatches += not np.array_equal(neighbors, expected)
+    return difference, mismatches
+
+
+class PairTotals:
+    """
+        Statistics of a subset of the ratings for the user pairs <code>(rows[i], columns[i])</code> and users
+        <code>users[i]</code> it touches (0-based, each pair and user once), in the layout of
+        <code>PearsonStatistics</code>.
+    """
+    def __init__(self, *, rows : np.ndarray, columns : np.ndarray, co_count : np.ndarray, co_sum : np.ndarray,
+                 co_sum_sq : np.ndarray, co_cross : np.ndarray, users : np.ndarray, counts : np.ndarray, scores : np.ndarray) :
+        self.rows      = rows
+        self.columns   = columns
+        self.co_count  = co_count
+        self.co_sum    = co_sum
+        self.co_sum_sq = co_sum_sq
+        self.co_cross  = co_cross
+        self.users     = users
+        self.counts    = counts
+        self.scores    = scores
+
+
+def _scaled_rating(rating : int | float, scale : int) -> int :
+    # the rating as an exact integer multiple of 1/scale
+    scaled = rating * scale
+    if scaled != int(scaled):
+        raise ValueError(f'rating {rating} is not a multiple of 1/{scale} star')
+    return int(scaled)
+
+
+def _scaled_ratings(ratings : np.ndarray, scale : int) -> np.ndarray :
+    # array form of _scaled_rating
+    scaled = ratings * scale
+    if not np.array_equal(scaled, np.round(scaled)):
+        raise ValueError(f'ratings must be multiples of 1/{scale} star')
+    return scaled
+
+
+def _pearson(covariance : np.ndarray, deviation_X : np.ndarray, deviation_Y : np.ndarray, valid : np.ndarray) -> np.ndarray :
+    # the Nx*Ny scaling cancels between numerator and denominator
+    similarities = np.zeros( covariance.shape, dtype=np.float64 )
+    np.divide( covariance.astype(np.float64),
+               np.sqrt(deviation_X.astype(np.float64)) * np.sqrt(deviation_Y.astype(np.float64)),
+               out=similarities, where=valid )
+    return similarities
+
+
+def generate_pearson_statistics(ratings_per_user : UserRatingsDatabase, scale : int | None = None) -> PearsonStatistics :
+    """
+        Function builds the <code>PearsonStatistics</code> of a ratings database with four matrix products.<br>
+        Whole and half star ratings are supported; others raise ValueError.<br>
+
+        Parameters:<br>
+        - <strong>ratings_per_user</strong> (<code>UserRatingsDatabase</code>): database of ratings per user<br>
+        - <strong>scale</strong>            (<code>int</code>):                 (optional) rating multiplier, else 1 for whole star
+                                                                               ratings and 2 for half stars<br>
+
+        Returns:<br>
+        - <code>PearsonStatistics</code>: co-rating statistics of every pair of users
+    """
+    matrix  = RatingsMatrix(ratings_per_user = ratings_per_user)
+    # whole stars ~ scale 1, half stars ~ scale 2
+    if scale is None:
+        scale = 1 if np.array_equal(matrix.ratings, np.round(matrix.ratings)) else 2
+    ratings = _scaled_ratings(matrix.ratings, scale)
+    rated   = matrix.mask.astype(np.float64)
+    # products of integers below 2**53 are exact in float64
+    to_integers = lambda product : np.rint(product).astype(np.int64)
+    return PearsonStatistics(
+            co_count  = to_integers( rated @ rated.T ),
+            co_sum    = to_integers( ratings @ rated.T ),
+            co_sum_sq = to_integers( (ratings * ratings) @ rated.T ),
+            co_cross  = to_integers( ratings @ ratings.T ),
+            counts    = np.array( [ len(columns) for columns in matrix.rated_columns ], dtype=np.int64 ),
+            scores    = to_integers( ratings.sum(axis=1) ),
+            scale     = scale)
+
+
+def _ragged_ranges(starts : np.ndarray, lengths : np.ndarray) -> np.ndarray :
+    # concatenation of arange(start, start+length) for each (start, length)
+    total = int(lengths.sum())
+    if not total:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat( starts - np.concatenate(( [0], np.cumsum(lengths)[:-1] )), lengths )
+    return np.arange(total, dtype=np.int64) + offsets
+
+
+def _remove_database_rating(ratings_database : RatingsDatabase, user_id : int, movie_id : int) -> int | float :
+    # takes a rating out of the score, count and ratings of its user and movie
+    user_ratings  = ratings_database.ratings_per_user.user_ratings[user_id]
+    movie_ratings = ratings_database.ratings_per_movie.movie_ratings[movie_id]
+    rating = user_ratings.ratings.pop(movie_id)
+    user_ratings.score -= rating
+    user_ratings.ratings_count -= 1
+    del movie_ratings.ratings[user_id]
+    movie_ratings.score -= rating
+    movie_ratings.ratings_count -= 1
+    return rating
+
+
+def _add_database_rating(ratings_database : RatingsDatabase, user_id : int, movie_id : int, rating : int | float) -> None :
+    # puts a rating into the score, count and ratings of its user and movie
+    user_ratings  = ratings_database.ratings_per_user.user_ratings[user_id]
+    movie_ratings = ratings_database.ratings_per_movie.movie_ratings[movie_id]
+    user_ratings.ratings[movie_id] = rating
+    user_ratings.score += rating
+    user_ratings.ratings_count += 1
+    movie_ratings.ratings[user_id] = rating
+    movie_ratings.score += rating
+    movie_ratings.ratings_count += 1
+
+
+class IncrementalRatingsDatabase:
+    """
+        A ratings database of the full dataset from which each cross-validation fold removes its test ratings,
+        instead of rebuilding the per user and per movie databases from the training set.<br>
+        <code>apply_fold</code> puts back the previous fold's test ratings and takes out the new ones (scores, counts
+        and rating dictionaries), and updates the Pearson statistics in place: the previous fold's held out pairs
+        are added back and the new fold's subtracted, only in the cells of user pairs sharing a movie with a test
+        rating. Both cost in proportion to the test set (and the popularity of its movies), not the dataset.<br>
+        Ratings must be whole or half stars (see <code>PearsonStatistics</code>).<br>
+        Ratings put back are appended to their user's and movie's dictionaries, so dictionary order can differ from
+        a freshly built training database; none of the totals depend on it.<br>
+        Similarities are exact up to their final rounding, so they approximate those of the rebuilt training database
+        (summed in floating point) to about 1e-15 rather than matching them bit for bit; the neighbors ranked from
+        either are the same (see <code>similarity_parity</code>).
+    """
+    def __init__(self, *, user_count : int, movie_count : int, ratings_data : ParseDatabase) :
+        self.user_count = user_count
+        self.ratings_database = generate_ratings_database(
+                                    user_count   = user_count,
+                                    movie_count  = movie_count,
+                                    ratings_data = ratings_data)
+        self.statistics = generate_pearson_statistics(self.ratings_database.ratings_per_user)
+        scale = self.statistics.scale
+        
+        # full dataset ratings ordered by (movie, user), as a CSR index per movie
+        _ratings_data = ratings_data.get_data()
+        entries  = [ _ratings_data[i] for i in range(1, ratings_data.get_count()+1) ]
+        users    = np.fromiter( (x.user_id-1 for x in entries), dtype=np.int64, count=len(entries) )
+        movies   = np.fromiter( (x.movie_id for x in entries), dtype=np.int64, count=len(entries) )
+        ratings  = _scaled_ratings( np.fromiter( (x.rating for x in entries), dtype=np.float64, count=len(entries) ), scale )
+        order    = np.lexsort((users, movies))
+        self.__users   = users[order]
+        self.__ratings = ratings[order].astype(np.int64)
+        self.__keys    = movies[order] * user_count + self.__users
+        self.__indptr  = np.searchsorted( movies[order], np.arange(movie_count+2) )
+        # (user_id, movie_id, rating) of the ratings currently held out, and their statistics
+        self.removed  = []
+        self.held_out = None
+
+    def __held_out_statistics(self, user_ids : np.ndarray, movie_ids : np.ndarray) -> PairTotals :
+        # statistics of every pair of ratings on a movie in which at least one rating is held out,
+        # totalled per distinct user pair
+        n = self.user_count
+        positions = np.searchsorted( self.__keys, movie_ids * n + (user_ids-1) )
+        held_out  = np.zeros( len(self.__keys), dtype=bool )
+        held_out[positions] = True
+        starts  = self.__indptr[movie_ids]
+        lengths = self.__indptr[movie_ids+1] - starts
+        # (held out rating, any rating of the same movie)
+        others  = _ragged_ranges(starts, lengths)
+        repeats = np.repeat(positions, lengths)
+        # ... and (kept rating, held out rating of the same movie)
+        kept    = ~held_out[others]
+        x = np.concatenate(( repeats, others[kept] ))
+        y = np.concatenate(( others, repeats[kept] ))
+        rx, ry = self.__ratings[x], self.__ratings[y]
+        keys   = self.__users[x] * n + self.__users[y]
+        if len(keys) >= n * n:
+            # at least as many rating pairs as user pairs: a dense tally costs no more than sorting them
+            pair_index = keys
+            pairs = np.flatnonzero( np.bincount(keys, minlength=n*n) )
+            gather = lambda totals : totals[pairs]
+        else:
+            pairs, pair_index = np.unique( keys, return_inverse=True )
+            gather = lambda totals : totals
+        users, user_index = np.unique( user_ids-1, return_inverse=True )
+        # integer sums below 2**53 are exact in float64
+        total = lambda index, weights : np.rint( np.bincount(index, weights=weights) ).astype(np.int64)
+        return PairTotals(
+                rows      = pairs // n,
+                columns   = pairs % n,
+                co_count  = gather( np.bincount(pair_index).astype(np.int64) ),
+                co_sum    = gather( total( pair_index, rx.astype(np.float64) ) ),
+                co_sum_sq = gather( total( pair_index, (rx*rx).astype(np.float64) ) ),
+                co_cross  = gather( total( pair_index, (rx*ry).astype(np.float64) ) ),
+                users     = users,
+                counts    = np.bincount(user_index).astype(np.int64),
+                scores    = total( user_index, self.__ratings[positions].astype(np.float64) ))
+
+    def remove_rating(self, user_id : int, movie_id : int) -> int | float :
+        """
+            Takes a rating out of the per user and per movie databases, returning its value.
+        """
+        return _remove_database_rating(self.ratings_database, user_id, movie_id)
+
+    def add_rating(self, user_id : int, movie_id : int, rating : int | float) -> None :
+        """
+            Puts a rating into the per user and per movie databases.
+        """
+        _add_database_rating(self.ratings_database, user_id, movie_id, rating)
+
+    def apply_fold(self, test_data : ParseDatabase) -> RatingsDatabase :
+        """
+            Function turns the database into the training database of a fold: every rating but those of
+            <code>test_data</code>.<br>
+
+            Parameters:<br>
+            - <strong>test_data</strong> (<code>ParseDatabase</code>): the fold's test ratings<br>
+
+            Returns:<br>
+            - <code>RatingsDatabase</code>: the (shared, mutated) training database of the fold
+        """
+        # restore the previous fold
+        for user_id, movie_id, rating in self.removed:
+            self.add_rating(user_id, movie_id, rating)
+        self.removed = []
+        if self.held_out is not None:
+            self.statistics.add_pair_totals(self.held_out, 1)
+            self.held_out = None
+        _test_data = test_data.get_data()
+        for entry in _test_data:
+            rating_entry = _test_data[entry]
+            rating = self.remove_rating(rating_entry.user_id, rating_entry.movie_id)
+            self.removed.append((rating_entry.user_id, rating_entry.movie_id, rating))
+        
+        user_ids  = np.fromiter( (x[0] for x in self.removed), dtype=np.int64, count=len(self.removed) )
+        movie_ids = np.fromiter( (x[1] for x in self.removed), dtype=np.int64, count=len(self.removed) )
+        self.held_out = self.__held_out_statistics(user_ids, movie_ids)
+        self.statistics.add_pair_totals(self.held_out, -1)
+        return self.ratings_database
+
+    def similarity_matrix(self) -> SimilarityMatrix :
+        """
+            Returns the Pearson similarities of the current training database, from its statistics.
+        """
+        return self.statistics.similarity_matrix()
+
+
+class OnlineRatingsDatabase:
+    """
+        A ratings database which takes new, changed and withdrawn ratings one at a time and keeps its Pearson
+        similarities and neighbor lists current, instead of rebuilding the database and every neighbor list.<br>
+        A rating of user u changes the statistics of u paired with the movie's other raters and u's mean, which
+        only changes the similarities of u: row and column u are recomputed from the statistics ( O(users) ).
+        The neighbor lists of u and of the users whose similarity to u changed are marked dirty, and are
+        recomputed on their next <code>neighbors</code> call.<br>
+        Statistics are kept in half stars (scale 2), so whole and half star ratings can be mixed.
+    """
+    def __init__(self, *, user_count : int, movie_count : int, ratings_data : ParseDatabase) :
+        self.ratings_database = generate_ratings_database(
+                                    user_count   = user_count,
+                                    movie_count  = movie_count,
+                                    ratings_data = ratings_data)
+        self.statistics = generate_pearson_statistics(self.ratings_database.ratings_per_user, scale = 2)
+        self.similarity_matrix = self.statistics.similarity_matrix()
+        # user_id -> (k, neighbor list) of the largest k asked for
+        self.__neighbors = {}
+        self.dirty_users = set()
+
+    def __raters(self, user_id : int, movie_id : int) -> dict :
+        # the other users who rated movie_id
+        raters = dict(self.ratings_database.ratings_per_movie.movie_ratings[movie_id].ratings)
+        raters.pop(user_id, None)
+        return raters
+
+    def __refresh(self, user_id : int) -> None :
+        # recompute the similarities of user_id and mark the neighbor lists they affect
+        x = user_id - 1
+        similarities = self.similarity_matrix.similarities
+        row     = self.statistics.similarity_row(user_id)
+        changed = np.flatnonzero( row != similarities[x] ) + 1
+        similarities[x, :] = row
+        similarities[:, x] = row
+        self.dirty_users.add(user_id)
+        self.dirty_users.update(changed.tolist())
+        for dirty_user in self.dirty_users:
+            self.__neighbors.pop(dirty_user, None)
+
+    def add_rating(self, user_id : int, movie_id : int, rating : int | float) -> None :
+        """
+            Records a new rating; <code>user_id</code> must not have rated <code>movie_id</code> yet.
+        """
+        if movie_id in self.ratings_database.ratings_per_user.user_ratings[user_id].ratings:
+            raise ValueError(f'user {user_id} already rated movie {movie_id}, see update_rating')
+        self.statistics.add_rating(user_id, rating, self.__raters(user_id, movie_id))
+        _add_database_rating(self.ratings_database, user_id, movie_id, rating)
+        self.__refresh(user_id)
+
+    def update_rating(self, user_id : int, movie_id : int, rating : int | float) -> int | float :
+        """
+            Replaces the rating of <code>user_id</code> for <code>movie_id</code>, returning the previous rating.
+        """
+        raters   = self.__raters(user_id, movie_id)
+        previous = self.ratings_database.ratings_per_user.user_ratings[user_id].ratings[movie_id]
+        self.statistics.remove_rating(user_id, previous, raters)
+        self.statistics.add_rating(user_id, rating, raters)
+        user_ratings  = self.ratings_database.ratings_per_user.user_ratings[user_id]
+        movie_ratings = self.ratings_database.ratings_per_movie.movie_ratings[movie_id]
+        user_ratings.ratings[movie_id] = rating
+        user_ratings.score += rating - previous
+        movie_ratings.ratings[user_id] = rating
+        movie_ratings.score += rating - previous
+        self.__refresh(user_id)
+        return previous
+
+    def remove_rating(self, user_id : int, movie_id : int) -> int | float :
+        """
+            Withdraws the rating of <code>user_id</code> for <code>movie_id</code>, returning it.
+        """
+        rating = self.ratings_database.ratings_per_user.user_ratings[user_id].ratings[movie_id]
+        self.statistics.remove_rating(user_id, rating, self.__raters(user_id, movie_id))
+        _remove_database_rating(self.ratings_database, user_id, movie_id)
+        self.__refresh(user_id)
+        return rating
+
+    def mean_rating(self, user_id : int) -> float :
+        """
+            Returns the mean rating of <code>user_id</code> (0.0 without ratings).
+        """
+        user_ratings = self.ratings_database.ratings_per_user.user_ratings[user_id]
+        return user_ratings.score / user_ratings.ratings_count if user_ratings.ratings_count else 0.0
+
+    def neighbors(self, user_id : int, k : int) -> List[Tuple[int, float]] :
+        """
+            Returns the k users most similar to <code>user_id</code>, as <code>kNearestNeighbors</code>, from a
+            cached list unless a rating made it dirty.
+        """
+        cached = self.__neighbors.get(user_id)
+        if cached is None or cached[0] < k:
+            cached = ( k, top_k_similar_users(user_id, self.similarity_matrix, k) )
+            self.__neighbors[user_id] = cached
+            self.dirty_users.discard(user_id)
+        # any prefix of a neighbor list is the list for a smaller k
+        return cached[1][:k]
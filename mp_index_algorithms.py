@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:55:31 2026
+
+@author: jonat
+"""
+from bisect import bisect_left
+from mp_parsing_algorithms import ParseDatabase, UserRatingsDatabase
+
+
+class DemographicIndex:
+    """
+        Ratings of each movie grouped by rater gender, with the raters sorted by age.<br>
+        Entry <code>(movie_id, gender)</code> holds <code>(ages, prefix_sums)</code>: the ascending ages of the
+        raters and the running total of their ratings ( <code>prefix_sums[i]</code> = sum of the first i ratings ).
+    """
+    def __init__(self, *, groups : dict) :
+        self.groups = groups
+
+    def age_window_summation(self, movie_id : int, gender : str, age_from : int, age_to : int) -> tuple :
+        """
+            Returns (summation of ratings, number of ratings) of <code>movie_id</code> by raters of
+            <code>gender</code> aged at least <code>age_from</code> and strictly less than <code>age_to</code>.
+        """
+        group = self.groups.get((movie_id, gender))
+        if group is None:
+            return 0, 0
+        ages, prefix_sums = group
+        start = bisect_left(ages, age_from)
+        end   = bisect_left(ages, age_to)
+        return prefix_sums[end] - prefix_sums[start], end - start
+
+
+def generate_demographic_index(user_database : ParseDatabase, ratings_per_user : UserRatingsDatabase) -> DemographicIndex :
+    """
+        Function groups every rating by (movie, rater gender) and sorts each group by rater age, so that the
+        ratings of an age window are found with two binary searches and a subtraction.<br>
+
+        Parameters:<br>
+        - <strong>user_database</strong>     (<code>ParseDatabase</code>)      : database of user information<br>
+        - <strong>ratings_per_user</strong>  (<code>UserRatingsDatabase</code>): ratings as collected per user<br>
+
+        Returns:<br>
+        - <code>DemographicIndex</code>: per (movie, gender) age sorted ratings
+    """
+    _user_database    = user_database.get_data()
+    _ratings_per_user = ratings_per_user.user_ratings
+
+    # (movie_id, gender) -> [(age, rating),...]
+    raters = {}
+    for user in _ratings_per_user:
+        user_ratings = _ratings_per_user[user].ratings
+        if not user_ratings:
+            continue
+        age    = _user_database[user].age
+        gender = _user_database[user].gender
+        for movie_id, rating in user_ratings.items():
+            raters.setdefault((movie_id, gender), []).append((age, rating))
+
+    groups = {}
+    for key, group in raters.items():
+        group.sort(key = lambda rater: rater[0])
+        ages        = [ rater[0] for rater in group ]
+        prefix_sums = [0]
+        for rater in group:
+            prefix_sums.append(prefix_sums[-1] + rater[1])
+        groups[key] = (ages, prefix_sums)
+    return DemographicIndex(groups = groups)
+
+
+class GenreIndex:
+    """
+        Per user rating totals grouped by the genre combination (bitmask) of the rated movies.<br>
+        <code>combinations[user_id]</code> maps genre mask -> [summation of ratings, number of ratings].<br>
+        <code>movie_masks[movie_id]</code> holds each movie's genre mask.
+    """
+    def __init__(self, *, combinations : dict, movie_masks : dict) :
+        self.combinations = combinations
+        self.movie_masks  = movie_masks
+
+    def overlap_summation(self, user_id : int, genre_mask : int) -> tuple :
+        """
+            Returns (summation of ratings, number of ratings) over the movies <code>user_id</code> rated which
+            share at least one genre with <code>genre_mask</code>. Cost grows with the number of distinct genre
+            combinations the user rated, not with the number of ratings.
+        """
+        summation_of_ratings = 0
+        total_number_ratings = 0
+        for mask, (summation, count) in self.combinations.get(user_id, {}).items():
+            if mask & genre_mask:
+                summation_of_ratings += summation
+                total_number_ratings += count
+        return summation_of_ratings, total_number_ratings
+
+
+def generate_genre_index(movie_database : ParseDatabase, ratings_per_user : UserRatingsDatabase) -> GenreIndex :
+    """
+        Function totals each user's ratings per genre combination.<br>
+
+        Parameters:<br>
+        - <strong>movie_database</strong>    (<code>ParseDatabase</code>)      : database of movies<br>
+        - <strong>ratings_per_user</strong>  (<code>UserRatingsDatabase</code>): ratings as collected per user<br>
+
+        Returns:<br>
+        - <code>GenreIndex</code>: per user, per genre combination totals
+    """
+    _movie_database   = movie_database.get_data()
+    _ratings_per_user = ratings_per_user.user_ratings
+    movie_masks = { movie_id : _movie_database[movie_id].genre_mask for movie_id in _movie_database }
+
+    combinations = {}
+    for user in _ratings_per_user:
+        user_combinations = {}
+        for movie_id, rating in _ratings_per_user[user].ratings.items():
+            totals = user_combinations.setdefault(movie_masks[movie_id], [0, 0])
+            totals[0] += rating
+            totals[1] += 1
+        combinations[user] = user_combinations
+    return GenreIndex(combinations = combinations, movie_masks = movie_masks)
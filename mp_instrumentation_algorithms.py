@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 14:02:57 2026
+
+@author: jonat
+"""
+import io
+import time
+import pstats
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+from collections.abc import Iterator
+
+
+class Instrumentation:
+    """
+        Per stage timers and counters of a <code>precision_testing</code> run, with optional profiling.<br>
+        - <code>stage(name)</code> times a block (wall and CPU seconds), summed over folds in <code>stages</code>
+          and kept per fold in <code>folds</code><br>
+        - <code>count(name, amount)</code> adds to a counter; the algorithms count through
+          <code>count_event</code>, which does nothing unless an instrumentation is active<br>
+        - with <code>profile</code> a cProfile of the run is summarized (the <code>profile_top</code> functions by
+          cumulative time), with <code>trace_memory</code> the tracemalloc peak and largest allocation sites<br>
+        Profiling covers the calling process only; folds run in worker processes report their timers and
+        counters, but not their profiles.
+    """
+    def __init__(self, *, profile : bool = False, trace_memory : bool = False, profile_top : int = 25) :
+        self.profile      = profile
+        self.trace_memory = trace_memory
+        self.profile_top  = profile_top
+        self.stages   = {}
+        self.folds    = []
+        self.counters = {}
+        self.profile_summary = None
+        self.memory_summary  = None
+        self.__profiler = None
+
+    @contextmanager
+    def stage(self, name : str) -> Iterator[None] :
+        """
+            Times the enclosed block as stage <code>name</code>.
+        """
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.__add_stage( name, time.perf_counter() - wall_start, time.process_time() - cpu_start, 1 )
+
+    def __add_stage(self, name : str, wall : float, cpu : float, calls : int) -> None :
+        targets = [ self.stages ] + ( [ self.folds[-1]['stages'] ] if self.folds else [] )
+        for stages in targets:
+            totals = stages.setdefault(name, { 'wall_seconds' : 0.0, 'cpu_seconds' : 0.0, 'calls' : 0 })
+            totals['wall_seconds'] += wall
+            totals['cpu_seconds']  += cpu
+            totals['calls']        += calls
+
+    def count(self, name : str, amount : int = 1) -> None :
+        self.counters[name] = self.counters.get(name, 0) + amount
+        if self.folds:
+            fold_counters = self.folds[-1]['counters']
+            fold_counters[name] = fold_counters.get(name, 0) + amount
+
+    def begin_fold(self) -> None :
+        """
+            Starts the per fold record of the following stages and counts.
+        """
+        self.folds.append({ 'stages' : {}, 'counters' : {} })
+
+    def merge_fold(self, fold : dict) -> None :
+        """
+            Adds a fold recorded elsewhere (a worker process's <code>begin_fold</code> record).
+        """
+        self.begin_fold()
+        for name, totals in fold['stages'].items():
+            self.__add_stage( name, totals['wall_seconds'], totals['cpu_seconds'], totals['calls'] )
+        for name, amount in fold['counters'].items():
+            self.count(name, amount)
+
+    def start(self) -> None :
+        """
+            Starts the profiler and memory tracing, if enabled.
+        """
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.profile:
+            self.__profiler = cProfile.Profile()
+            self.__profiler.enable()
+
+    def stop(self) -> None :
+        """
+            Stops the profiler and memory tracing, and summarizes them.
+        """
+        if self.__profiler is not None:
+            self.__profiler.disable()
+            statistics = pstats.Stats(self.__profiler, stream = io.StringIO())
+            statistics.sort_stats('cumulative')
+            self.profile_summary = []
+            for function in statistics.fcn_list[: self.profile_top]:
+                primitive_calls, calls, total_time, cumulative_time, callers = statistics.stats[function]
+                file_name, line_number, function_name = function
+                self.profile_summary.append({ 'function'           : f'{file_name}:{line_number}({function_name})',
+                                              'calls'              : calls,
+                                              'total_seconds'      : total_time,
+                                              'cumulative_seconds' : cumulative_time })
+            self.__profiler = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # allocations of the profiler and of tracemalloc itself are left out
+            snapshot = tracemalloc.take_snapshot().filter_traces([ tracemalloc.Filter(False, tracemalloc.__file__),
+                                                                   tracemalloc.Filter(False, cProfile.__file__) ])
+            tracemalloc.stop()
+            self.memory_summary = { 'peak_bytes'    : peak,
+                                    'current_bytes' : current,
+                                    'top'           : [ { 'location'   : str(statistic.traceback),
+                                                          'size_bytes' : statistic.size,
+                                                          'count'      : statistic.count }
+                                                        for statistic in snapshot.statistics('lineno')[: self.profile_top] ] }
+
+    def report(self) -> dict :
+        """
+            Returns the structured report: stage totals, per fold stages and counters, counters, and the
+            profile and memory summaries (None unless enabled).
+        """
+        return { 'stages'   : self.stages,
+                 'folds'    : self.folds,
+                 'counters' : self.counters,
+                 'profile'  : self.profile_summary,
+                 'memory'   : self.memory_summary }
+
+
+# the instrumentation of the running precision_testing call, None when not instrumenting
+ACTIVE : Instrumentation | None = None
+
+
+def count_event(name : str, amount : int = 1) -> None :
+    """
+        Adds to a counter of the active instrumentation, if any.
+    """
+    if ACTIVE is not None:
+        ACTIVE.count(name, amount)
+
+
+@contextmanager
+def stage(name : str) -> Iterator[None] :
+    """
+        Times the enclosed block as a stage of the active instrumentation, if any.
+    """
+    if ACTIVE is None:
+        yield
+        return
+    with ACTIVE.stage(name):
+        yield
+
+
+@contextmanager
+def activate(instrumentation : Instrumentation | None) -> Iterator[Instrumentation | None] :
+    """
+        Makes <code>instrumentation</code> the active one for the enclosed block (no-op for None).
+    """
+    global ACTIVE
+    previous = ACTIVE
+    ACTIVE = instrumentation
+    try:
+        yield instrumentation
+    finally:
+        ACTIVE = previous
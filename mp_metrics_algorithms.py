@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 09:37:15 2026
+
+@author: jonat
+"""
+import numpy as np
+from typing import List
+from dataclasses import dataclass
+
+
+@dataclass(kw_only=True, frozen=True)
+class ErrorBreakdown:
+    """
+        Errors of one algorithm grouped by user or by movie, for the ids with at least one test rating:
+        <code>ids</code>, test ratings per id (<code>totals</code>), predicted ratings per id (<code>counts</code>),
+        and the <code>rmse</code> and <code>mae</code> per id (NaN where nothing was predicted).
+    """
+    ids    : np.ndarray
+    totals : np.ndarray
+    counts : np.ndarray
+    rmse   : np.ndarray
+    mae    : np.ndarray
+
+
+@dataclass(kw_only=True, frozen=True)
+class PredictionMetrics:
+    """
+        Evaluation of one algorithm's predictions: rmse and mae over the predicted ratings (None if there are
+        none), the number <code>predicted</code> and share <code>coverage</code> of test ratings predicted, and
+        the per user and per movie breakdowns (None unless the ids were given).
+    """
+    rmse      : float | None
+    mae       : float | None
+    predicted : int
+    coverage  : float
+    per_user  : ErrorBreakdown | None = None
+    per_movie : ErrorBreakdown | None = None
+
+
+def _error_breakdown(ids : np.ndarray, predicted : np.ndarray, squared_errors : np.ndarray,
+                     absolute_errors : np.ndarray) -> List[ErrorBreakdown] :
+    # per algorithm breakdown by id: one bincount over (algorithm, id) cells for all algorithms
+    algorithm_count = predicted.shape[0]
+    present, inverse = np.unique(ids, return_inverse=True)
+    cells  = ( np.arange(algorithm_count)[:, None] * len(present) + inverse[None, :] ).ravel()
+    size   = algorithm_count * len(present)
+    totals = np.bincount( inverse, minlength=len(present) )
+    counts = np.bincount( cells, weights=predicted.ravel(), minlength=size ).reshape(algorithm_count, -1)
+    squared_summation  = np.bincount( cells, weights=squared_errors.ravel(),  minlength=size ).reshape(algorithm_count, -1)
+    absolute_summation = np.bincount( cells, weights=absolute_errors.ravel(), minlength=size ).reshape(algorithm_count, -1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rmse = np.sqrt( squared_summation / counts )
+        mae  = absolute_summation / counts
+    return [ ErrorBreakdown( ids = present, totals = totals, counts = counts[algorithm].astype(np.int64),
+                             rmse = rmse[algorithm], mae = mae[algorithm] )
+             for algorithm in range(algorithm_count) ]
+
+
+#USAGE: EVALUATE THE PREDICTIONS OF EVERY ALGORITHM AT ONCE
+def evaluate_predictions(*, actual_ratings : List[int | float], predictions : List[List[int | float | None]],
+                         user_ids : List[int] | None = None, movie_ids : List[int] | None = None) -> List[PredictionMetrics] :
+    """
+        Function evaluates the predictions of several algorithms against the same actual ratings in one pass
+        over a (algorithms x ratings) array, None (or NaN) predictions being left out.<br>
+        The squares are summed sequentially in rating order, as <code>rmse</code> of mp_math_algorithms does. They are
+        taken as products rather than with <code>pow</code>, which rounds differently in the last bit for about one
+        value in a thousand, so the two rmse can differ in their last bit.<br>
+
+        Parameters:<br>
+        - <strong>actual_ratings</strong> (<code>list</code>): real rating values<br>
+        - <strong>predictions</strong>    (<code>list</code>): per algorithm list of predicted values, in the order of actual_ratings<br>
+        - <strong>user_ids</strong>       (<code>list</code>): (optional) user of each rating, for the per user breakdown<br>
+        - <strong>movie_ids</strong>      (<code>list</code>): (optional) movie of each rating, for the per movie breakdown<br>
+
+        Returns:<br>
+        - <code>list</code>: PredictionMetrics per algorithm
+    """
+    actual    = np.asarray(actual_ratings, dtype=np.float64)
+    # None -> NaN
+    predicted_ratings = np.array(predictions, dtype=np.float64).reshape(len(predictions), len(actual))
+    predicted = ~np.isnan(predicted_ratings)
+    errors    = np.where( predicted, predicted_ratings - actual[None, :], 0.0 )
+    squared_errors  = errors * errors
+    absolute_errors = np.abs(errors)
+
+    counts = predicted.sum(axis=1)
+    # sequential summations, as the rmse loop; unpredicted cells add 0.0
+    squared_summation  = np.cumsum( squared_errors, axis=1 )[:, -1] if len(actual) else np.zeros(len(predictions))
+    absolute_summation = np.cumsum( absolute_errors, axis=1 )[:, -1] if len(actual) else np.zeros(len(predictions))
+
+    per_user  = ( _error_breakdown( np.asarray(user_ids), predicted, squared_errors, absolute_errors )
+                  if user_ids is not None else [None] * len(predictions) )
+    per_movie = ( _error_breakdown( np.asarray(movie_ids), predicted, squared_errors, absolute_errors )
+                  if movie_ids is not None else [None] * len(predictions) )
+    return [ PredictionMetrics( rmse      = float(np.sqrt( squared_summation[algorithm] / counts[algorithm] )) if counts[algorithm] else None,
+                                mae       = float( absolute_summation[algorithm] / counts[algorithm] ) if counts[algorithm] else None,
+                                predicted = int(counts[algorithm]),
+                                coverage  = float( counts[algorithm] / len(actual) ) if len(actual) else 0.0,
+                                per_user  = per_user[algorithm],
+                                per_movie = per_movie[algorithm] )
+             for algorithm in range(len(predictions)) ]
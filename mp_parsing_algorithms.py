@@ -6,9 +6,10 @@ Created on Thu Oct 31 17:50:38 2024
 @author: jonat
 """
 from dataclasses import dataclass , field
-from file_handling import file_reader
-from typing import List
-from collections.abc import Callable
+from file_handling import file_reader, file_bulk_reader
+import numpy as np
+from typing import List, Tuple
+from collections.abc import Callable, Iterable
 from io import TextIOWrapper
 
 
@@ -64,6 +65,22 @@ def generate_dataset( file_handle : TextIOWrapper , parser : Callable[[str], any
     return database
 
 
+def generate_dataset_bulk( file_handle : TextIOWrapper , parser : Callable[[str], any] ) -> ParseDatabase:
+    """ 
+        Function generates the same database as <code>generate_dataset</code>, reading the whole file
+        in one buffered pass instead of line by line.<br>
+        
+        Returns:<br>
+        - <code>ParseDatabase</code>: database of parsed data containers, keyed from 1 in file order
+    """
+    lines = file_bulk_reader(file_handle)
+    #parse every line, skipping those which are not data
+    parsed = ( parser(line) for line in lines if line )
+    database = ParseDatabase()
+    database.override_data({ (idx+1) : data for idx, data in enumerate(x for x in parsed if x) })
+    return database
+
+
 
 #### USER DATA FILE PARSING FUNCTIONS
 @dataclass (kw_only=True, frozen=True)
@@ -114,7 +131,7 @@ def user_datafile_parser( data_feed : str ) -> UserData | None :
     return user_data_parsed
 
 
-def generate_user_set() -> List[UserData]:
+def generate_user_set(path : str = 'ml-100k/u.users') -> List[UserData]:
     """ 
         Function decorates the generate_dataset function<br>
         
@@ -122,10 +139,10 @@ def generate_user_set() -> List[UserData]:
         - <code>List</code>: list of user information
     """
     #Create file handle attached to user dataset
-    file_handle = open('ml-100k/u.users' , 'r')
-    return generate_dataset(
-                file_handle = file_handle, 
-                parser      = user_datafile_parser)
+    with open(path , 'r') as file_handle:
+        return generate_dataset_bulk(
+                    file_handle = file_handle, 
+                    parser      = user_datafile_parser)
 
 #### MOVIE DATA FILE PARSING FUNCTIONS
 @dataclass (kw_only=True, frozen=True)
@@ -135,6 +152,22 @@ class MovieData:
     video_release_date : str 
     IMDB_url           : str 
     genre              : dict = field(default_factory=dict, init=True)
+    genre_mask         : int  = field(default=0, init=False)# bit i set ~ genre i in genre
+
+    def __post_init__(self) -> None :
+        # derived from genre, however the movie was built
+        object.__setattr__(self, 'genre_mask', genre_bitmask(self.genre))
+    
+
+def genre_bitmask( genre : dict ) -> int :
+    """
+        Function encodes a genre dictionary ( {genre index : 1,...} ) as an integer with bit <code>index</code> set per genre,
+        so that a genre overlap check is a single <code>&</code>.
+    """
+    mask = 0
+    for index in genre:
+        mask |= 1 << index
+    return mask
 
 def movie_datafile_parser( data_feed : str ) -> MovieData | None :
     """ 
@@ -178,20 +211,20 @@ def movie_datafile_parser( data_feed : str ) -> MovieData | None :
     video_release_date = movie_data[3]
     url = movie_data[4]
 
+    genre = {i : 1 for i, x in enumerate(genre_code) if x==1}
     # load parsed results
     movie_data_parsed = MovieData(
             title              = title, 
             release_date       = release, 
             video_release_date = video_release_date, 
             IMDB_url           = url, 
-            genre              = {i : 1 for i, x in enumerate(genre_code) if x==1}
-        
+            genre              = genre
         )
    
     return movie_data_parsed
         
 
-def generate_movie_set():
+def generate_movie_set(path : str = 'ml-100k/u.movies'):
     """ 
         Function decorates the generate_dataset function<br>
         
@@ -199,10 +232,10 @@ def generate_movie_set():
         - <code>List</code>: list of movie information
     """
     #create file handler attached to movie dataset
-    file_handle = open('ml-100k/u.movies', 'r', encoding='windows-1252')
-    return generate_dataset(
-                file_handle = file_handle, 
-                parser      = movie_datafile_parser)
+    with open(path, 'r', encoding='windows-1252') as file_handle:
+        return generate_dataset_bulk(
+                    file_handle = file_handle, 
+                    parser      = movie_datafile_parser)
 
 #### RATINGS DATA FILE PARSING FUNCTIONS
 @dataclass (kw_only=True, frozen=True)
@@ -289,7 +322,31 @@ def ratings_datafile_parser(data_feed : str ) -> RatingData | None :
    
     return rating_data_parsed
 
-def generate_ratings_set():
+def ratings_datafile_bulk_parser( data_feed : str ) -> List[RatingData] | None :
+    """ 
+        Function parses the full contents of a <code>'./ml-100k/u.ratings'</code> formatted file
+        with a single vectorized split, returning the <code>RatingData</code> objects in file order.<br>
+        
+        Parameters:<br>
+        - <strong>data_feed</strong> (<code>str</code>): contents of the ratings file<br>
+        
+        Returns:<br>
+        - <code>list</code> or <code>None</code> if the contents are not 4 integer columns per line 
+    """
+    # rating data format  "USER-ID    MOVIE-ID    RATING   TIME-STAMP\n"
+    try:
+        table = np.array( data_feed.split(), dtype=np.int64 )
+    except ValueError:
+        return None
+    line_count = len(data_feed.splitlines())
+    if len(table) != 4 * line_count:
+        return None
+    # omit time stamp (not used), format as python integers
+    table = table.reshape(line_count, 4)[:, :3].tolist()
+    return [ RatingData( user_id = user_id, movie_id = movie_id, rating = rating ) 
+             for user_id, movie_id, rating in table ]
+
+def generate_ratings_set(path : str = 'ml-100k/u.ratings'):
     """ 
         Function decorates the generate_dataset function<br>
         
@@ -297,10 +354,17 @@ def generate_ratings_set():
         - <code>List</code>: list of movie information
     """
     #create file handler attached to ratings dataset
-    file_handle = open('ml-100k/u.ratings', 'r')
-    return generate_dataset(
-                file_handle = file_handle, 
-                parser      = ratings_datafile_parser)
+    with open(path, 'r') as file_handle:
+        ratings = ratings_datafile_bulk_parser(file_handle.read())
+    if ratings is None:
+        # not a plain table of integers, fall back to parsing line by line
+        with open(path, 'r') as file_handle:
+            return generate_dataset_bulk(
+                        file_handle = file_handle, 
+                        parser      = ratings_datafile_parser)
+    database = ParseDatabase()
+    database.override_data({ (idx+1) : data for idx, data in enumerate(ratings) })
+    return database
        
 def generate_ratings_database(user_count : int, movie_count : int, ratings_data : ParseDatabase) -> RatingsDatabase:
     """ 
@@ -324,22 +388,60 @@ def generate_ratings_database(user_count : int, movie_count : int, ratings_data
                 )
     
     # ratings_data format: [{ user_id : int, movie_id : int, rating : int }...]
+    _ratings_data = ratings_data.get_data()
+    # each entry is read once, in key order
+    entries = ( _ratings_data[i] for i in range(1, ratings_data.get_count()+1) )
+    return accumulate_ratings(
+                ratings_database = ratings_database, 
+                ratings          = ( (entry.user_id, entry.movie_id, entry.rating) for entry in entries ))
+
+
+def accumulate_ratings(ratings_database : RatingsDatabase, ratings : Iterable[Tuple[int, int, int | float]]) -> RatingsDatabase:
+    """ 
+        Function adds ratings to the per user and per movie aggregates of a database as they are produced,
+        so that a generator (e.g. reading a file) can feed the database without holding the ratings.<br>
+        Users and movies not yet in the database are added, and the counts grown to the largest id; once the
+        ratings are exhausted, every id from 1 to the count is present, in increasing order.<br>
+        
+        Parameters:<br>
+        - <strong>ratings_database</strong> (<code>RatingsDatabase</code>) database to add to<br>
+        - <strong>ratings</strong>          (<code>Iterable</code>)        (user_id, movie_id, rating) tuples<br>
+    
+        Returns:<br>
+        - <code>RatingsDatabase</code> the same database
+    """
+    _user_ratings  = ratings_database.ratings_per_user.user_ratings
+    _movie_ratings = ratings_database.ratings_per_movie.movie_ratings
+    grown = False
     # for each rating...
-    for i in range(ratings_data.get_count()):
-        # extract data for entries
-        i += 1
-        user_id   =  ratings_data.get_data()[i].user_id 
-        movie_id  =  ratings_data.get_data()[i].movie_id
-        rating    =  ratings_data.get_data()[i].rating
+    for user_id, movie_id, rating in ratings:
+        user_ratings  = _user_ratings.get(user_id)
+        if user_ratings is None:
+            user_ratings = _user_ratings[user_id] = UserRatings( user_id = user_id )
+            grown = True
+        movie_ratings = _movie_ratings.get(movie_id)
+        if movie_ratings is None:
+            movie_ratings = _movie_ratings[movie_id] = MovieRatings( movie_id = movie_id )
+            grown = True
         #---ratings-per-user-update-------------------------------------------------------------------------
-        ratings_database.ratings_per_user.user_ratings[ user_id ].ratings[  movie_id  ]  = rating
-        ratings_database.ratings_per_user.user_ratings[ user_id ].score += rating
-        ratings_database.ratings_per_user.user_ratings[ user_id ].ratings_count += 1
+        user_ratings.ratings[  movie_id  ]  = rating
+        user_ratings.score += rating
+        user_ratings.ratings_count += 1
         #---ratings-per-movie-update-------------------------------------------------------------------------
-        ratings_database.ratings_per_movie.movie_ratings[ movie_id ].ratings[  user_id  ] = rating
-        ratings_database.ratings_per_movie.movie_ratings[ movie_id ].score += rating
-        ratings_database.ratings_per_movie.movie_ratings[ movie_id ].ratings_count += 1
+        movie_ratings.ratings[  user_id  ] = rating
+        movie_ratings.score += rating
+        movie_ratings.ratings_count += 1
         #--------------------------------------------------------------------------------
+    if grown:
+        # ids 1..count in order, with empty entries for ids never rated
+        ratings_per_user  = ratings_database.ratings_per_user
+        ratings_per_movie = ratings_database.ratings_per_movie
+        ratings_per_user.user_count   = max( [ratings_per_user.user_count] + list(_user_ratings) )
+        ratings_per_movie.movie_count = max( [ratings_per_movie.movie_count] + list(_movie_ratings) )
+        ratings_per_user.user_ratings   = { x : _user_ratings.get(x) or UserRatings( user_id = x )
+                                            for x in range(1, ratings_per_user.user_count+1) }
+        ratings_per_movie.movie_ratings = { x : _movie_ratings.get(x) or MovieRatings( movie_id = x )
+                                            for x in range(1, ratings_per_movie.movie_count+1) }
     return ratings_database
 
 #### GENRE DATA FILE PARSING FUNCTIONS
@@ -380,7 +482,7 @@ def genre_datafile_parser( data_feed : str ) -> GenreData | None :
    
 
 #USAGE: PRODUCES A LIST OF MOVIE GENRES IN ACCORDANCE WITH U.GENRES FILE
-def generate_genre_set():
+def generate_genre_set(path : str = 'ml-100k/u.genres'):
     """
        Function decorates the generate_dataset function<br>
         
@@ -388,7 +490,7 @@ def generate_genre_set():
         - <code>List</code>: list of genre information
     """
     #create file handler attached to rating dataset
-    file_handle = open('ml-100k/u.genres', 'r')
+    file_handle = open(path, 'r')
     genre_data = generate_dataset(
                 file_handle = file_handle, 
                 parser      = genre_datafile_parser)
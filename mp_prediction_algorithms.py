@@ -1,8 +1,15 @@
 import random
+import heapq
+import numpy as np
 from typing import List, Tuple
 from mp_parsing_algorithms import UserRatingsDatabase, MovieRatingsDatabase, ParseDatabase
 from mp_math_algorithms import division_calculation
-from mp_accessory_algorithms import key_match, mergeSort
+from mp_similarity_algorithms import SimilarityMatrix, RatingsMatrix, top_k_similar_users, rank_similar_users
+from mp_similarity_algorithms import ItemNeighbors, similarity_rank
+from mp_approximate_algorithms import RandomProjectionIndex
+from mp_index_algorithms import DemographicIndex, GenreIndex
+from mp_instrumentation_algorithms import count_event
+from mp_compact_algorithms import CompactRatings, co_ratings
 
 def random_prediction() -> int :
     """
@@ -54,7 +61,8 @@ def mean_movie_rating_based_prediction( movie_id : int ,ratings_per_movie : Movi
         return None
     
 def demographic_based_prediction(user_id : int , movie_id : int , user_database : ParseDatabase,
-                                 ratings_by_user : UserRatingsDatabase) -> float | None:
+                                 ratings_by_user : UserRatingsDatabase, 
+                                 demographic_index : DemographicIndex | None = None) -> float | None:
     """
         Returns the average rating a given movie has received by people like a given user, based on 
         demographic data... here, the demographic in common with the provided <code>user_id</code>.<br>
@@ -66,7 +74,9 @@ def demographic_based_prediction(user_id : int , movie_id : int , user_database
         -<strong>user_id</strong>           (<code>int</code>)<br> user detailing demographic and prediction<br> 
         -<strong>movie_id</strong>          (<code>int</code>)<br> movie that prediction is based off of<br>
         -<strong>user_database</strong>     (<code>ParseDatabase</code>)<br> database of user information<br>
-        -<strong>ratings_by_user</strong>   (<code>UserRatingsDatabase</code>)<br> ratings as collected for each user
+        -<strong>ratings_by_user</strong>   (<code>UserRatingsDatabase</code>)<br> ratings as collected for each user<br>
+        -<strong>demographic_index</strong> (<code>DemographicIndex</code>)<br> (optional) index built from the same databases,
+                                                                          answering in O(log users) rather than O(users)
         
         Returns:<br>
         - the average rating for <code>movie_id</code> given a demographic corresponding to <code>user_id</code>
@@ -80,9 +90,23 @@ def demographic_based_prediction(user_id : int , movie_id : int , user_database
     gender_filter  = _user_database[user_id].gender
     age_filter     = _user_database[user_id].age
     
+    if demographic_index is not None:
+        count_event('index_searches')
+        summation_of_ratings, total_number_ratings = demographic_index.age_window_summation(
+                                                        movie_id = movie_id,
+                                                        gender   = gender_filter,
+                                                        age_from = age_filter-5,
+                                                        age_to   = age_filter+6)
+        #subset should not contain subject user (user_id), who is always within their own window
+        if movie_id in _ratings_by_user[user_id].ratings:
+            summation_of_ratings -= _ratings_by_user[user_id].ratings[movie_id]
+            total_number_ratings -= 1
+        return division_calculation( summation_of_ratings , total_number_ratings )
+    
     #variables to calculate mean of all ratings that users in subset group G have provided for movie_id
     summation_of_ratings = 0
     total_number_ratings = 0
+    count_event('dict_probes', len(_ratings_by_user))
     #Attempt to calculate mean
     for user in _ratings_by_user:
         #subset should not contain subject user (user_id)
@@ -106,7 +130,7 @@ def demographic_based_prediction(user_id : int , movie_id : int , user_database
 
 
 def genre_based_prediction(user_id : int , movie_id : int , movie_database : ParseDatabase , 
-                           ratings_per_user : UserRatingsDatabase) -> float | None :
+                           ratings_per_user : UserRatingsDatabase, genre_index : GenreIndex | None = None) -> float | None :
     """
         Function returns the average rating that a user has given for movies of a genre 
         equivalent to the movie in question for prediction.<br>
@@ -116,6 +140,8 @@ def genre_based_prediction(user_id : int , movie_id : int , movie_database : Par
         - <strong>move_id</strong>            (<code>int</code>)                : movie for which prediction is desired<br>
         - <strong>movie_database</strong>     (<code>ParseDatabase</code>)      : database of movies<br>
         - <strong>ratings_per_user</strong>   (<code>UserRatingsDatabase</code>): ratings as collected per user<br>
+        - <strong>genre_index</strong>        (<code>GenreIndex</code>)         : (optional) per genre combination totals
+                                                                             built from the same databases<br>
         
         Returns:<br>
         - <code>float</code>: the average rating the user provided for movies of the same genre as movie_id
@@ -128,8 +154,21 @@ def genre_based_prediction(user_id : int , movie_id : int , movie_database : Par
     _movie_database   = movie_database.get_data()
     _ratings_by_user = ratings_per_user.user_ratings[user_id].ratings
     
-    m_genre = _movie_database[movie_id].genre
+    m_genre_mask = _movie_database[movie_id].genre_mask
+    
+    if genre_index is not None:
+        count_event('index_searches')
+        summation_of_ratings, total_number_ratings = genre_index.overlap_summation(
+                                                        user_id    = user_id, 
+                                                        genre_mask = m_genre_mask)
+        #subject movie (movie_id) not in the subset
+        if m_genre_mask and movie_id in _ratings_by_user:
+            summation_of_ratings -= _ratings_by_user[movie_id]
+            total_number_ratings -= 1
+        return division_calculation( summation_of_ratings , total_number_ratings )
+    
     #Attempt to calculate mean
+    count_event('dict_probes', len(_ratings_by_user))
     
     #looking through all of the users ratings.
     for movie in _ratings_by_user:
@@ -138,7 +177,7 @@ def genre_based_prediction(user_id : int , movie_id : int , movie_database : Par
             continue
     
         #If the movie in question is of the same genre as the target movie m
-        if key_match(d1=m_genre, d2=_movie_database[movie].genre):
+        if m_genre_mask & _movie_database[movie].genre_mask:
             #adding the value of rating the user gave this movie
             summation_of_ratings += _ratings_by_user[movie]
             #adding total number of ratings in subset
@@ -172,20 +211,35 @@ def pearson_correlation_coeff_similarity_prediction( user_id : int , alt_user_id
     except:
         # arithmetic error or unknown
         return 0.0
-    
-    cov_summation_Pearson = 0.0
-    stddev_summation_Pearson_X = 0.0
-    stddev_summation_Pearson_Y = 0.0
+    count_event('similarity_calls')
+
+    if isinstance(X.ratings, CompactRatings) and isinstance(Y.ratings, CompactRatings):
+        # sorted rows: intersection of the co-rated movies (summed in id order, see co_ratings)
+        sums = co_ratings( X.ratings, Y.ratings, X_user_Mean_Rating, Y_alt_user_Mean_Rating )
+        if not sums.count:
+            return 0.0
+        cov_summation_Pearson      = sums.sum_XY
+        stddev_summation_Pearson_X = sums.sum_XX
+        stddev_summation_Pearson_Y = sums.sum_YY
+    else:
+        # one probe of alt_user_id's ratings per movie of user_id
+        count_event('dict_probes', len(X.ratings))
+
+        cov_summation_Pearson = 0.0
+        stddev_summation_Pearson_X = 0.0
+        stddev_summation_Pearson_Y = 0.0
 
-    for movie_id in _ratings_per_user[user_id].ratings:
-        if movie_id in _ratings_per_user[alt_user_id].ratings:
+        Y_ratings = Y.ratings
+        for movie_id, rating in X.ratings.items():
+            alt_rating = Y_ratings.get(movie_id)
+            if alt_rating is not None:
 
-            dev_value_X = (_ratings_per_user[user_id].ratings[movie_id] - X_user_Mean_Rating)
-            dev_value_Y = (_ratings_per_user[alt_user_id].ratings[movie_id] - Y_alt_user_Mean_Rating)
+                dev_value_X = (rating - X_user_Mean_Rating)
+                dev_value_Y = (alt_rating - Y_alt_user_Mean_Rating)
 
-            cov_summation_Pearson += float(  dev_value_X  *  dev_value_Y  )
-            stddev_summation_Pearson_X += float( pow( dev_value_X ,2 ))
-            stddev_summation_Pearson_Y += float( pow( dev_value_Y,2 ))
+                cov_summation_Pearson += float(  dev_value_X  *  dev_value_Y  )
+                stddev_summation_Pearson_X += float( pow( dev_value_X ,2 ))
+                stddev_summation_Pearson_Y += float( pow( dev_value_Y,2 ))
     
     stddev_Pearson_X = float(pow(stddev_summation_Pearson_X,0.5))
     stddev_Pearson_Y = float(pow(stddev_summation_Pearson_Y,0.5))
@@ -198,7 +252,9 @@ def pearson_correlation_coeff_similarity_prediction( user_id : int , alt_user_id
 
 # IMPLEMENTATION OF K-NEAREST NEIGHBORS 
 # WILL RETURN THE K MOST SIMILAR (IN REGARDS TO MOVIE TASTES) USERS TO U
-def kNearestNeighbors(user_id : int , ratings_per_user : UserRatingsDatabase, k : int ) -> List[Tuple[ int , float]]:
+def kNearestNeighbors(user_id : int , ratings_per_user : UserRatingsDatabase, k : int ,
+                      similarity_matrix : SimilarityMatrix | None = None,
+                      neighbor_index : RandomProjectionIndex | None = None ) -> List[Tuple[ int , float]]:
     """
         Function implements the K-NearestNeighbors algorithm to determine k most similar users, in terms of 
         movie ratings/taste, to the specified user_id.<br>
@@ -208,14 +264,32 @@ def kNearestNeighbors(user_id : int , ratings_per_user : UserRatingsDatabase, k
         - <strong>user_id</strong>            (<code>int</code>):                 the user in question<br>
         - <strong>ratings_per_user</strong>   (<code>UserRatingsDatabase</code>): database of ratings as collected per user <br>
         - <strong>k</strong>                  (<code>int</code>):                 number of neighbors desired<br>
+        - <strong>similarity_matrix</strong>  (<code>SimilarityMatrix</code>):    (optional) precomputed similarities, 
+                                                                                  read instead of recalculating each pair<br>
+        - <strong>neighbor_index</strong>     (<code>RandomProjectionIndex</code>): (optional) approximate search: only the 
+                                                                                  users hashed near user_id are considered,
+                                                                                  so fewer than k may be returned<br>
+        
+        Neighbors are ordered by similarity descending, then user_id ascending, similarities equal to 
+        <code>RANK_DECIMALS</code> places being ties (see <code>similarity_rank</code>); any prefix of the 
+        result is the result for a smaller k.<br>
     
         Returns:<br>
         - <code>list</code> list of tuples of  neighbor id's and their similarity scores
     """
     
-    # Output list will be in form [(userID, similarity),...]
-    output = []
-    # Buffer will hold all similary matchups between user user_id and other users... [(similarity, alt_user),...]
+    # approximate search ? rank the index's candidates only
+    if neighbor_index is not None:
+        return neighbor_index.query(user_id, k)
+    
+    # precomputed similarities ? select directly from the matrix row
+    if similarity_matrix is not None:
+        return top_k_similar_users(
+                    user_id           = user_id,
+                    similarity_matrix = similarity_matrix,
+                    k                 = k)
+    
+    # Buffer will hold all similary matchups between user user_id and other users... [(alt_user, similarity),...]
     buffer = []
     # iteration variable (other user ids)
     alt_user = 1
@@ -224,43 +298,17 @@ def kNearestNeighbors(user_id : int , ratings_per_user : UserRatingsDatabase, k
         if alt_user == user_id:
             alt_user += 1
             continue
-        # adding the similarity value between u and j and sort for future optimal choice selection
+        # adding the similarity value between u and j for future optimal choice selection
         taste_similarity = pearson_correlation_coeff_similarity_prediction( 
                                             user_id           = user_id,
                                             alt_user_id       = alt_user,
                                             ratings_per_user  = ratings_per_user)
-        buffer.append((taste_similarity, alt_user))
+        buffer.append((alt_user, taste_similarity))
         alt_user += 1
-        
-    # sorting all data by highest similarity then user_id decreasing
-    buffer.sort(reverse=True)
-    similarity_score = buffer[0][0]
     
-    # now sort at each similarity value from lowest user_id to highest
-    _from = 0
-    to   = 0
-    for neighbor in buffer:
-        # seeking range of equal similarity values...
-        if not (neighbor[0] == similarity_score):
-            similarity_score = neighbor[0]
-            # sort up to cutoff such that sorted by similarity value, then id increasing
-            mergeSort(buffer,_from,to-1)
-            # advance
-            _from = to
-            # enough neighbors processed ?
-            if to >= k: 
-                break
-        to += 1
-    
-    #iteration variable
-    i = 0
-    #adding k "neighbors" to output list
-    while (k > 0) and ( i < len(buffer) ):
-        #add most similar neighbor to output in form (id, similarity_score)
-        output.append((buffer[i][1],buffer[i][0]))
-        k -= 1
-        i += 1
-    return output
+    # heap selection of the k best neighbors, by highest similarity then user_id increasing.
+    # Output list will be in form [(userID, similarity),...]
+    return heapq.nsmallest( max(k, 0), buffer, key = lambda neighbor: (-similarity_rank(neighbor[1]), neighbor[0]) )
 
 def hybrid_based_prediction(user_id : int , movie_id : int , ratings_per_user : UserRatingsDatabase,
                        similar_users : List[Tuple[int , float]]) -> float:
@@ -291,6 +339,7 @@ def hybrid_based_prediction(user_id : int , movie_id : int , ratings_per_user :
     
     numerator_summation = 0.0
     denominator_summation = 0.0
+    count_event('dict_probes', len(similar_users))
     
     for alt_user, similarity in similar_users:
         # Has the alt_user rated the movie ?
@@ -310,3 +359,115 @@ def hybrid_based_prediction(user_id : int , movie_id : int , ratings_per_user :
 
 
 
+
+
+def hybrid_based_predictions_batch(user_ids : List[int] , movie_ids : List[int] , ratings_matrix : RatingsMatrix,
+                                   similarity_matrix : SimilarityMatrix, k_values : List[int | None]) -> List[List[float | None]]:
+    """
+        Batch form of <code>hybrid_based_prediction</code> over many (user, movie) queries and several neighborhood sizes.<br>
+        Queries are grouped by user; each user's neighbors are ranked once, and the similarity weighted residuals of the 
+        queried movies are accumulated down the ranking with a single cumulative sum, from which every k is read off.<br>
+        Values are identical to calling <code>hybrid_based_prediction</code> with the first k neighbors of 
+        <code>kNearestNeighbors</code> (the sums are accumulated in the same neighbor order).<br>
+        
+        Parameters:<br>
+        - <strong>user_ids</strong>          (<code>list</code>):             user of each query<br>
+        - <strong>movie_ids</strong>         (<code>list</code>):             movie of each query<br>
+        - <strong>ratings_matrix</strong>    (<code>RatingsMatrix</code>):    matrix view of the ratings per user<br>
+        - <strong>similarity_matrix</strong> (<code>SimilarityMatrix</code>): similarities of the same ratings<br>
+        - <strong>k_values</strong>          (<code>list</code>):             neighborhood sizes, None ~ all neighbors<br>
+        
+        Returns:<br>
+        - <code>list</code>: per k value list of predictions, in query order
+    """
+    user_ids  = np.asarray(user_ids, dtype=np.intp)
+    movie_ids = np.asarray(movie_ids, dtype=np.intp)
+    neighbor_count = ratings_matrix.user_count - 1
+    # neighborhood sizes as positions into the cumulative sums
+    positions = [ min(neighbor_count, k) if k is not None else neighbor_count for k in k_values ]
+    
+    predictions = np.full( (len(k_values), len(user_ids)), np.nan )
+    # residuals of every rating from its user's mean, 0.0 where unrated
+    residuals = np.where( ratings_matrix.mask, ratings_matrix.ratings - ratings_matrix.means[:, None], 0.0 )
+    
+    order = np.argsort(user_ids, kind='stable')
+    boundaries = np.flatnonzero(np.diff(user_ids[order])) + 1
+    for queries in np.split(order, boundaries):
+        if not len(queries):
+            continue
+        user_id = int(user_ids[queries[0]])
+        #average rating user_id has given ~ no ratings, no prediction
+        if not len(ratings_matrix.rated_columns[user_id-1]):
+            continue
+        user_mean_rating = ratings_matrix.means[user_id-1]
+        count_event('neighbor_rankings')
+        neighbors, similarities = rank_similar_users(user_id, similarity_matrix, neighbor_count)
+        columns = movie_ids[queries] - 1
+        # movies beyond the matrix were rated by no training user ~ no neighbor contributes
+        rated   = columns < ratings_matrix.movie_count
+        columns = np.where( rated, columns, 0 )
+        # (neighbors x queries), rows in neighbor order ~ only those cells are gathered
+        cells = np.ix_( neighbors, columns )
+        numerator_summation   = np.cumsum( np.where( rated, residuals[cells], 0.0 ) * similarities[:, None], axis=0 )
+        denominator_summation = np.cumsum( np.where( rated & ratings_matrix.mask[cells], 
+                                                     np.abs(similarities)[:, None], 0.0 ), axis=0 )
+        for variant, position in enumerate(positions):
+            if position == 0:
+                predictions[variant, queries] = user_mean_rating
+                continue
+            numerator   = numerator_summation[position-1]
+            denominator = denominator_summation[position-1]
+            #empty similar_users subset ~ user mean
+            result = np.full( len(queries), user_mean_rating )
+            nonzero = denominator != 0
+            result[nonzero] = user_mean_rating + ( numerator[nonzero] / denominator[nonzero] )
+            predictions[variant, queries] = result
+    
+    return [ [ None if np.isnan(prediction) else float(prediction) for prediction in variant ] 
+             for variant in predictions ]
+
+
+def item_based_prediction(user_id : int , movie_id : int , ratings_per_user : UserRatingsDatabase,
+                          item_neighbors : ItemNeighbors) -> float | None :
+    """
+        Function predicts a user's rating of a movie from the user's own ratings of similar movies: the average of
+        those ratings weighted by each movie's (adjusted cosine) similarity to <code>movie_id</code>.<br>
+        Only the precomputed top k neighbors of <code>movie_id</code> take part, so a prediction walks the user's
+        ratings once, whatever the number of users.<br>
+        
+        Parameters:<br>
+        - <strong>user_id</strong>          (<code>int</code>):                 user in question<br>
+        - <strong>movie_id</strong>         (<code>int</code>):                 movie for which prediction is desired<br>
+        - <strong>ratings_per_user</strong> (<code>UserRatingsDatabase</code>): database of ratings per user<br>
+        - <strong>item_neighbors</strong>   (<code>ItemNeighbors</code>):       top k neighbors of each movie,
+                                                                               from generate_item_neighbors<br>
+        
+        Returns:<br>
+        - <code>float</code>: the predicted rating, None if the user rated none of the movie's neighbors
+    """
+    try:
+        user_ratings = ratings_per_user.user_ratings[user_id].ratings
+    except:
+        # unknown user
+        return None
+    neighbors = item_neighbors.get_neighbors(movie_id)
+    
+    numerator_summation   = 0.0
+    denominator_summation = 0.0
+    count_event('dict_probes', min(len(user_ratings), len(neighbors)))
+    # walk whichever of the two is shorter
+    if len(user_ratings) <= len(neighbors):
+        for rated_movie, rating in user_ratings.items():
+            similarity = neighbors.get(rated_movie)
+            if similarity is not None:
+                numerator_summation   += float( similarity * rating )
+                denominator_summation += similarity
+    else:
+        for neighbor, similarity in neighbors.items():
+            rating = user_ratings.get(neighbor)
+            if rating is not None:
+                numerator_summation   += float( similarity * rating )
+                denominator_summation += similarity
+    
+    #return weighted mean rating - returns None if no neighbor was rated
+    return division_calculation( numerator_summation , denominator_summation )
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 17:03:26 2026
+
+@author: jonat
+"""
+import heapq
+from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from mp_parsing_algorithms import UserRatingsDatabase
+from mp_math_algorithms import division_calculation
+from mp_similarity_algorithms import SimilarityMatrix, generate_similarity_matrix
+from mp_prediction_algorithms import kNearestNeighbors
+
+
+def top_n_recommendations(user_id : int , ratings_per_user : UserRatingsDatabase, similar_users : List[Tuple[int , float]],
+                          n : int , movie_count : int , min_support : int = 1 ) -> List[Tuple[int , float]] :
+    """
+        Function recommends the n movies <code>user_id</code> has not rated with the highest hybrid predictions.<br>
+        Every unrated movie is scored at once by walking each neighbor's ratings a single time and accumulating the
+        similarity weighted residuals per movie, rather than one <code>hybrid_based_prediction</code> call per movie.
+        Scores are identical to <code>hybrid_based_prediction</code> with the same neighbors (per movie, the sums are
+        accumulated in the same neighbor order).<br>
+        Only movies rated by at least <code>min_support</code> neighbors of nonzero similarity are candidates: a movie
+        no neighbor rated would score the user's mean with no evidence behind it, so fewer than n movies may be
+        returned.<br>
+        The n best are selected with a heap ( O(candidates log n) ).<br>
+        
+        (!!) Function paired with output of k-nearest neighbors algorithm... (similar_users)
+        
+        Parameters:<br>
+        - <strong>user_id</strong>          (<code>int</code>):                 user in question<br>
+        - <strong>ratings_per_user</strong> (<code>UserRatingsDatabase</code>): database of ratings per user<br>
+        - <strong>similar_users</strong>    (<code>list</code>):                neighbors of user_id as (user id, similarity)<br>
+        - <strong>n</strong>                (<code>int</code>):                 number of recommendations<br>
+        - <strong>movie_count</strong>      (<code>int</code>):                 number of movies (ids 1 to movie_count)<br>
+        - <strong>min_support</strong>      (<code>int</code>):                 (optional) neighbors who must have rated a movie<br>
+        
+        Returns:<br>
+        - <code>list</code>: (movie id, predicted rating) ordered by prediction descending, then movie id ascending;
+                             empty if the user has no ratings
+    """
+    _ratings_per_user = ratings_per_user.user_ratings
+    
+    #average rating user_id has given
+    user_mean_rating = division_calculation( _ratings_per_user[user_id].score , _ratings_per_user[user_id].ratings_count )
+    if not user_mean_rating:
+        return []
+    rated = _ratings_per_user[user_id].ratings
+    
+    # movie_id -> [numerator summation, denominator summation, supporting neighbors]
+    summations = {}
+    for alt_user, similarity in similar_users:
+        alt_user_ratings     = _ratings_per_user[alt_user]
+        alt_user_mean_rating = division_calculation( alt_user_ratings.score , alt_user_ratings.ratings_count )
+        for movie_id, alt_user_rating in alt_user_ratings.ratings.items():
+            if movie_id in rated:
+                continue
+            residual = float(alt_user_rating - alt_user_mean_rating)
+            summation = summations.setdefault(movie_id, [0.0, 0.0, 0])
+            summation[0] += float( residual * similarity )
+            summation[1] += abs(similarity)
+            if similarity:
+                summation[2] += 1
+    
+    def scores():
+        for movie_id, summation in summations.items():
+            # unsupported ~ no evidence beyond the user's mean
+            if summation[2] < max(min_support, 1) or movie_id > movie_count:
+                continue
+            yield float( user_mean_rating + float( summation[0] / summation[1] ) ), movie_id
+    
+    best = heapq.nsmallest( n, scores(), key = lambda scored : ( -scored[0], scored[1] ) )
+    return [ ( movie_id, score ) for score, movie_id in best ]
+
+
+# data shared with a recommendation worker process, set once per process by the pool initializer
+_recommendation_worker_data : dict = {}
+
+def _initialize_recommendation_worker( recommendation_worker_data : dict ) -> None:
+    _recommendation_worker_data.update(recommendation_worker_data)
+
+def _run_recommendation_worker( user_ids : List[int] ) -> List[List[Tuple[int , float]]]:
+    return recommend_users( user_ids, **_recommendation_worker_data )
+
+
+def recommend_users(user_ids : List[int] , *, ratings_per_user : UserRatingsDatabase, similarity_matrix : SimilarityMatrix,
+                    n : int , k : int , movie_count : int , min_support : int = 1 ) -> List[List[Tuple[int , float]]] :
+    """
+        Function returns the <code>top_n_recommendations</code> of each user, with the k nearest neighbors of
+        <code>kNearestNeighbors</code> read from <code>similarity_matrix</code>.
+    """
+    return [ top_n_recommendations(
+                    user_id          = user_id,
+                    ratings_per_user = ratings_per_user,
+                    similar_users    = kNearestNeighbors(user_id, ratings_per_user, k, similarity_matrix),
+                    n                = n,
+                    movie_count      = movie_count,
+                    min_support      = min_support)
+             for user_id in user_ids ]
+
+
+def top_n_recommendations_batch(*, ratings_per_user : UserRatingsDatabase, movie_count : int , n : int , k : int ,
+                                user_ids : List[int] | None = None, similarity_matrix : SimilarityMatrix | None = None,
+                                workers : int = 1, min_support : int = 1) -> dict :
+    """
+        Function produces the top n recommendations of many users (by default every user).<br>
+        With <code>workers</code> > 1 the users are split into one contiguous chunk per worker process, and the
+        ratings and similarities are handed to each process once.<br>
+        
+        Parameters:<br>
+        - <strong>ratings_per_user</strong>  (<code>UserRatingsDatabase</code>): database of ratings per user<br>
+        - <strong>movie_count</strong>       (<code>int</code>):                 number of movies<br>
+        - <strong>n</strong>                 (<code>int</code>):                 recommendations per user<br>
+        - <strong>k</strong>                 (<code>int</code>):                 neighbors per user<br>
+        - <strong>user_ids</strong>          (<code>list</code>):                (optional) users to recommend for<br>
+        - <strong>similarity_matrix</strong> (<code>SimilarityMatrix</code>):    (optional) precomputed similarities<br>
+        - <strong>workers</strong>           (<code>int</code>):                 number of worker processes<br>
+        - <strong>min_support</strong>       (<code>int</code>):                 (optional) neighbors who must have rated a recommended movie<br>
+        
+        Returns:<br>
+        - <code>dict</code>: user id -> list of (movie id, predicted rating)
+    """
+    if user_ids is None:
+        user_ids = list(range(1, ratings_per_user.user_count+1))
+    if similarity_matrix is None:
+        similarity_matrix = generate_similarity_matrix(ratings_per_user)
+    recommendation_data = {
+            'ratings_per_user'  : ratings_per_user,
+            'similarity_matrix' : similarity_matrix,
+            'n'                 : n,
+            'k'                 : k,
+            'movie_count'       : movie_count,
+            'min_support'       : min_support
+        }
+    
+    if workers > 1 and len(user_ids) > 1:
+        chunk_size = -(-len(user_ids) // workers)
+        chunks = [ user_ids[i:i+chunk_size] for i in range(0, len(user_ids), chunk_size) ]
+        with ProcessPoolExecutor( max_workers = workers, 
+                                  initializer = _initialize_recommendation_worker, 
+                                  initargs    = (recommendation_data,) ) as executor:
+            # results are returned in chunk order
+            recommendations = [ recommendation for chunk in executor.map(_run_recommendation_worker, chunks)
+                                               for recommendation in chunk ]
+    else:
+        recommendations = recommend_users( user_ids, **recommendation_data )
+    
+    return dict(zip(user_ids, recommendations))
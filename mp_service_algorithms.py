@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:12:40 2026
+
+@author: jonat
+"""
+import json
+import asyncio
+from typing import List, Tuple
+from mp_parsing_algorithms import ParseDatabase, generate_user_set, generate_movie_set, generate_ratings_set
+from mp_parsing_algorithms import generate_ratings_database
+from mp_similarity_algorithms import generate_similarity_matrix, top_k_similar_users, generate_item_neighbors
+from mp_index_algorithms import generate_demographic_index, generate_genre_index
+from mp_prediction_algorithms import mean_user_rating_based_prediction, mean_movie_rating_based_prediction
+from mp_prediction_algorithms import demographic_based_prediction, genre_based_prediction, hybrid_based_prediction
+from mp_prediction_algorithms import item_based_prediction
+from mp_recommendation_algorithms import top_n_recommendations
+
+
+# predictors served, by request name
+PREDICTORS : Tuple[str, ...] = ( 'mean_user', 'mean_movie', 'demographic', 'genre', 'hybrid', 'item' )
+# neighborhood size of hybrid requests which do not give one
+DEFAULT_NEIGHBORS : int = 100
+# number of recommendations of requests which do not give one
+DEFAULT_RECOMMENDATIONS : int = 20
+
+
+def _positive_count(value : any, default : int, name : str) -> int :
+    # size asked by a query: a positive int, or the default when not given
+    if value is None:
+        return default
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise ValueError(f'{name} must be a positive integer, not {value!r}')
+    return value
+
+
+def _neighbor_count(k : any) -> int :
+    # neighborhood size of a query
+    return _positive_count(k, DEFAULT_NEIGHBORS, 'k')
+
+
+def _identifier(value : any, count : int, name : str) -> int :
+    # user or movie id of a query: an int (not a bool, nor a float) from 1 to count
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise ValueError(f'{name} must be an integer, not {value!r}')
+    if not 1 <= value <= count:
+        raise ValueError(f'unknown {name} {value}')
+    return value
+
+
+class PredictionModel:
+    """
+        The databases, indices and similarities the predictors read, built once and shared by every request.<br>
+        Neighbor lists are ranked on first use and kept per user ( the largest k asked for; any prefix is the
+        list for a smaller k ).
+    """
+    def __init__(self, *, user_database : ParseDatabase, movie_database : ParseDatabase, ratings_data : ParseDatabase) :
+        self.user_database  = user_database
+        self.movie_database = movie_database
+        ratings_database = generate_ratings_database(
+                                user_count   = user_database.get_count(),
+                                movie_count  = movie_database.get_count(),
+                                ratings_data = ratings_data)
+        self.ratings_per_user  = ratings_database.ratings_per_user
+        self.ratings_per_movie = ratings_database.ratings_per_movie
+        self.similarity_matrix = generate_similarity_matrix(self.ratings_per_user)
+        self.demographic_index = generate_demographic_index(user_database, self.ratings_per_user)
+        self.genre_index       = generate_genre_index(movie_database, self.ratings_per_user)
+        self.item_neighbors    = generate_item_neighbors(self.ratings_per_movie, user_database.get_count())
+        self.__neighbors = {}
+
+    def neighbors(self, user_id : int, k : int) -> List[Tuple[int, float]] :
+        """
+            Returns the k users most similar to <code>user_id</code>, as <code>kNearestNeighbors</code>.
+        """
+        cached = self.__neighbors.get(user_id)
+        if cached is None or cached[0] < k:
+            cached = ( k, top_k_similar_users(user_id, self.similarity_matrix, k) )
+            self.__neighbors[user_id] = cached
+        return cached[1][:k]
+
+    def predict(self, algorithm : str, user_id : int, movie_id : int, k : int | None = None) -> float | None :
+        """
+            Returns the prediction of one predictor for (user_id, movie_id), None where it has none.<br>
+
+            Parameters:<br>
+            - <strong>algorithm</strong> (<code>str</code>): one of <code>PREDICTORS</code><br>
+            - <strong>user_id</strong>   (<code>int</code>): user in question<br>
+            - <strong>movie_id</strong>  (<code>int</code>): movie in question<br>
+            - <strong>k</strong>         (<code>int</code>): (optional) neighborhood size of the hybrid predictor<br>
+
+            Returns:<br>
+            - <code>float</code>: the predicted rating
+        """
+        if algorithm not in PREDICTORS:
+            raise ValueError(f'unknown algorithm {algorithm!r}, expected one of {PREDICTORS}')
+        user_id  = _identifier(user_id, self.ratings_per_user.user_count, 'user_id')
+        movie_id = _identifier(movie_id, self.ratings_per_movie.movie_count, 'movie_id')
+        k = _neighbor_count(k)
+
+        if algorithm == 'mean_user':
+            return mean_user_rating_based_prediction(user_id, self.ratings_per_user)
+        if algorithm == 'mean_movie':
+            return mean_movie_rating_based_prediction(movie_id, self.ratings_per_movie)
+        if algorithm == 'demographic':
+            return demographic_based_prediction(user_id, movie_id, self.user_database, self.ratings_per_user,
+                                                demographic_index = self.demographic_index)
+        if algorithm == 'genre':
+            return genre_based_prediction(user_id, movie_id, self.movie_database, self.ratings_per_user,
+                                          genre_index = self.genre_index)
+        if algorithm == 'item':
+            return item_based_prediction(user_id, movie_id, self.ratings_per_user, self.item_neighbors)
+        return hybrid_based_prediction(user_id, movie_id, self.ratings_per_user, self.neighbors(user_id, k))
+
+    def recommend(self, user_id : int, n : int | None = None, k : int | None = None) -> List[Tuple[int, float]] :
+        """
+            Returns the <code>top_n_recommendations</code> of <code>user_id</code> as (movie id, predicted rating).
+        """
+        user_id = _identifier(user_id, self.ratings_per_user.user_count, 'user_id')
+        n = _positive_count(n, DEFAULT_RECOMMENDATIONS, 'recommend')
+        return top_n_recommendations(user_id, self.ratings_per_user, self.neighbors(user_id, _neighbor_count(k)),
+                                     n, self.ratings_per_movie.movie_count)
+
+    def answer(self, query : dict) -> dict :
+        """
+            Answers one query, <code>{'algorithm', 'user_id', 'movie_id', 'k'}</code> for a prediction or
+            <code>{'recommend' : n, 'user_id', 'k'}</code> for recommendations, as <code>{'prediction' : value}</code>,
+            <code>{'recommendations' : [[movie id, predicted rating], ...]}</code> or <code>{'error' : message}</code>.<br>
+            Any exception raised while answering is reported as the query's error, so that one bad query
+            cannot fail the others of its batch.
+        """
+        try:
+            if 'recommend' in query:
+                return { 'recommendations' : [ list(recommendation) for recommendation in 
+                                               self.recommend( query['user_id'], query['recommend'], query.get('k') ) ] }
+            return { 'prediction' : self.predict( query['algorithm'], query['user_id'], query['movie_id'], query.get('k') ) }
+        except Exception as error:
+            return { 'error' : f'{type(error).__name__}: {error}' }
+
+    def predict_batch(self, queries : List[dict]) -> List[dict] :
+        """
+            Answers a batch of queries in order, see <code>answer</code>.<br>
+            Each user's neighbors are ranked once for the batch, for the largest k its hybrid and recommendation
+            queries ask; invalid queries are left to <code>answer</code> to report.
+        """
+        # largest neighborhood per user, so the list is ranked once for the batch
+        largest_k = {}
+        for query in queries:
+            if not isinstance(query, dict) or not ( query.get('algorithm') == 'hybrid' or 'recommend' in query ):
+                continue
+            try:
+                user_id = _identifier(query.get('user_id'), self.ratings_per_user.user_count, 'user_id')
+                k       = _neighbor_count(query.get('k'))
+            except ValueError:
+                continue
+            largest_k[user_id] = max(k, largest_k.get(user_id, 0))
+        for user_id, k in largest_k.items():
+            self.neighbors(user_id, k)
+
+        return [ self.answer(query) for query in queries ]
+
+
+def generate_prediction_model() -> PredictionModel :
+    """
+        Function loads the ml-100k user, movie and ratings sets into a <code>PredictionModel</code>.
+    """
+    return PredictionModel(
+            user_database  = generate_user_set(),
+            movie_database = generate_movie_set(),
+            ratings_data   = generate_ratings_set())
+
+
+class PredictionServer:
+    """
+        asyncio front end of a <code>PredictionModel</code> on a local TCP port or unix socket.<br>
+        The protocol is one JSON object per line in each direction. A request
+        <code>{"id" : 7, "algorithm" : "hybrid", "user_id" : 1, "movie_id" : 20, "k" : 50}</code> is answered by
+        <code>{"id" : 7, "prediction" : 3.61}</code> or <code>{"id" : 7, "error" : "..."}</code>;
+        <code>{"id" : 8, "recommend" : 20, "user_id" : 1}</code> by <code>{"id" : 8, "recommendations" : [[movie id, rating], ...]}</code>.
+        Requests may be pipelined, and answers come back as they complete.<br>
+        Requests from every connection are queued and answered in batches of up to <code>max_batch</code>: a batch
+        is whatever is queued once the model is free, plus whatever arrives within <code>batch_window</code> seconds
+        ( by default none is waited for, which keeps a lone request's latency lowest ).<br>
+        The model holds a few hundred thousand objects; freezing them out of garbage collection once loaded
+        ( <code>gc.freeze()</code> ) avoids collection pauses of several milliseconds while serving.
+    """
+    def __init__(self, model : PredictionModel, *, max_batch : int = 256, batch_window : float = 0.0) :
+        self.model        = model
+        self.max_batch    = max_batch
+        self.batch_window = batch_window
+        self.__queue   = None
+        self.__batcher = None
+        self.__server  = None
+
+    async def start(self, *, host : str = '127.0.0.1', port : int = 0, path : str | None = None) -> str | Tuple[str, int] :
+        """
+            Starts listening, on a unix socket at <code>path</code> if given, else on <code>host:port</code>
+            ( port 0 ~ any free port ). Returns the address listened on.
+        """
+        self.__queue   = asyncio.Queue()
+        self.__batcher = asyncio.create_task(self.__run_batches())
+        if path is not None:
+            self.__server = await asyncio.start_unix_server(self.__handle_connection, path = path)
+            return path
+        self.__server = await asyncio.start_server(self.__handle_connection, host = host, port = port)
+        return self.__server.sockets[0].getsockname()[:2]
+
+    async def close(self) -> None :
+        """
+            Stops listening and stops the batcher.
+        """
+        self.__server.close()
+        await self.__server.wait_closed()
+        self.__batcher.cancel()
+        try:
+            await self.__batcher
+        except asyncio.CancelledError:
+            pass
+
+    async def serve_forever(self) -> None :
+        await self.__server.serve_forever()
+
+    async def submit(self, query : dict) -> dict :
+        """
+            Queues one query for the next batch and returns its answer.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.__queue.put((query, future))
+        return await future
+
+    async def __run_batches(self) -> None :
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [ await self.__queue.get() ]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                if not self.__queue.empty():
+                    batch.append(self.__queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.__queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            # a failing batch fails its own requests only, the batcher carries on
+            try:
+                answers = self.model.predict_batch([ query for query, future in batch ])
+            except Exception as error:
+                for query, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            for (query, future), answer in zip(batch, answers):
+                if not future.done():
+                    future.set_result(answer)
+
+    async def __answer(self, line : bytes, writer : asyncio.StreamWriter) -> None :
+        try:
+            query = json.loads(line)
+        except ValueError as error:
+            writer.write(json.dumps({ 'id' : None, 'error' : f'invalid request: {error}' }).encode() + b'\n')
+            return
+        if not isinstance(query, dict):
+            writer.write(json.dumps({ 'id' : None, 'error' : 'invalid request: expected an object' }).encode() + b'\n')
+            return
+        try:
+            answer = await self.submit(query)
+        except Exception as error:
+            # the request's batch failed
+            answer = { 'error' : f'internal error: {type(error).__name__}: {error}' }
+        answer = { 'id' : query.get('id'), **answer }
+        if not writer.is_closing():
+            writer.write(json.dumps(answer).encode() + b'\n')
+
+    async def __handle_connection(self, reader : asyncio.StreamReader, writer : asyncio.StreamWriter) -> None :
+        pending = set()
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                # answered concurrently, so that pipelined requests share batches
+                task = asyncio.create_task(self.__answer(line, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+class PredictionClient:
+    """
+        Local client of a <code>PredictionServer</code>; requests are pipelined over one connection and matched
+        to their answers by id.
+    """
+    def __init__(self) :
+        self.__reader  = None
+        self.__writer  = None
+        self.__pending = {}
+        self.__next_id = 0
+        self.__receiver = None
+
+    async def connect(self, *, host : str = '127.0.0.1', port : int | None = None, path : str | None = None) -> None :
+        if path is not None:
+            self.__reader, self.__writer = await asyncio.open_unix_connection(path)
+        else:
+            self.__reader, self.__writer = await asyncio.open_connection(host, port)
+        self.__receiver = asyncio.create_task(self.__receive())
+
+    async def close(self) -> None :
+        self.__writer.close()
+        await self.__writer.wait_closed()
+        await self.__receiver
+
+    async def __receive(self) -> None :
+        while line := await self.__reader.readline():
+            answer = json.loads(line)
+            future = self.__pending.pop(answer.pop('id'), None)
+            if future is not None and not future.done():
+                future.set_result(answer)
+        # connection closed ~ fail whatever is outstanding
+        for future in self.__pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError('connection closed'))
+        self.__pending.clear()
+
+    async def send(self, query : dict) -> dict :
+        """
+            Sends one query (the id is added) and returns its answer.
+        """
+        self.__next_id += 1
+        request_id = self.__next_id
+        future = asyncio.get_running_loop().create_future()
+        self.__pending[request_id] = future
+        self.__writer.write(json.dumps({ 'id' : request_id, **query }).encode() + b'\n')
+        await self.__writer.drain()
+        return await future
+
+    async def request(self, algorithm : str, user_id : int, movie_id : int, k : int | None = None) -> dict :
+        """
+            Sends one prediction request and returns its answer, <code>{'prediction' : value}</code> or <code>{'error' : message}</code>.
+        """
+        query = { 'algorithm' : algorithm, 'user_id' : user_id, 'movie_id' : movie_id }
+        if k is not None:
+            query['k'] = k
+        return await self.send(query)
+
+    async def predict(self, algorithm : str, user_id : int, movie_id : int, k : int | None = None) -> float | None :
+        """
+            Returns the served prediction, raising <code>ValueError</code> with the server's message on an error.
+        """
+        answer = await self.request(algorithm, user_id, movie_id, k)
+        if 'error' in answer:
+            raise ValueError(answer['error'])
+        return answer['prediction']
+
+    async def recommend(self, user_id : int, n : int = DEFAULT_RECOMMENDATIONS, k : int | None = None) -> List[Tuple[int, float]] :
+        """
+            Returns the served top n recommendations of <code>user_id</code>, raising <code>ValueError</code> on an error.
+        """
+        query = { 'recommend' : n, 'user_id' : user_id }
+        if k is not None:
+            query['k'] = k
+        answer = await self.send(query)
+        if 'error' in answer:
+            raise ValueError(answer['error'])
+        return [ ( movie_id, rating ) for movie_id, rating in answer['recommendations'] ]
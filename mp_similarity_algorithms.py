@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 09:12:40 2026
+
+@author: jonat
+"""
+import numpy as np
+from typing import List, Tuple
+from mp_parsing_algorithms import UserRatingsDatabase, MovieRatingsDatabase
+from mp_columnar_algorithms import UserRatingsView
+from mp_instrumentation_algorithms import count_event
+
+
+class RatingsMatrix:
+    """
+        Dense user x movie view of a <code>UserRatingsDatabase</code>.<br>
+        Row <code>user_id - 1</code> holds a user's ratings, column <code>movie_id - 1</code> a movie's.<br>
+        Unrated cells hold 0 and are flagged False in <code>mask</code>.<br>
+        The movie ids each user rated are kept in the user's dictionary insertion order, so that
+        summations can visit them in the same order as the dictionary based algorithms.
+    """
+    def __init__(self, *, ratings_per_user : UserRatingsDatabase | UserRatingsView) :
+        if isinstance(ratings_per_user, UserRatingsView):
+            self.__from_index(ratings_per_user)
+            return
+        _ratings_per_user = ratings_per_user.user_ratings
+        self.user_count   = ratings_per_user.user_count
+        # movie ids are 1 based, size columns to the largest rated id
+        self.movie_count  = max( ( max(x.ratings) for x in _ratings_per_user.values() if x.ratings ), default=0 )
+
+        self.ratings = np.zeros( (self.user_count, self.movie_count), dtype=np.float64 )
+        self.mask    = np.zeros( (self.user_count, self.movie_count), dtype=bool )
+        # user means, 0.0 where the user has provided no ratings
+        self.means   = np.zeros( self.user_count, dtype=np.float64 )
+        # per user column indices, in dictionary insertion order
+        self.rated_columns : List[np.ndarray] = []
+
+        for user_id in range(1, self.user_count+1):
+            user_ratings = _ratings_per_user[user_id]
+            columns = np.fromiter( (movie_id-1 for movie_id in user_ratings.ratings), dtype=np.intp,
+                                   count=len(user_ratings.ratings) )
+            values  = np.fromiter( user_ratings.ratings.values(), dtype=np.float64,
+                                   count=len(user_ratings.ratings) )
+            self.ratings[user_id-1, columns] = values
+            self.mask[user_id-1, columns]    = True
+            self.rated_columns.append(columns)
+            if user_ratings.ratings_count:
+                self.means[user_id-1] = float( user_ratings.score / user_ratings.ratings_count )
+
+    def __from_index(self, ratings_per_user : UserRatingsView) -> None :
+        # columnar ratings: fill straight from the CSR arrays
+        index = ratings_per_user.index
+        self.user_count  = ratings_per_user.user_count
+        self.movie_count = int(index.indices.max()) if len(index.indices) else 0
+        rows    = np.repeat( np.arange(self.user_count), index.counts )
+        columns = index.indices.astype(np.intp) - 1
+        self.ratings = np.zeros( (self.user_count, self.movie_count), dtype=np.float64 )
+        self.mask    = np.zeros( (self.user_count, self.movie_count), dtype=bool )
+        self.ratings[rows, columns] = index.values
+        self.mask[rows, columns]    = True
+        self.means   = np.divide( index.scores, index.counts, out=np.zeros(self.user_count), where=index.counts > 0 )
+        self.rated_columns = np.split( columns, index.indptr[1:-1] )
+
+
+class SimilarityMatrix:
+    """
+        User x user Pearson similarity values, as produced by <code>generate_similarity_matrix</code>.<br>
+        Entry <code>(user_id, alt_user_id)</code> equals
+        <code>pearson_correlation_coeff_similarity_prediction(user_id, alt_user_id, ...)</code>.
+    """
+    def __init__(self, *, similarities : np.ndarray) :
+        self.user_count   = similarities.shape[0]
+        self.similarities = similarities
+
+    def get_similarity(self, user_id : int, alt_user_id : int) -> float :
+        return float(self.similarities[user_id-1, alt_user_id-1])
+
+    def get_row(self, user_id : int) -> np.ndarray :
+        """
+            Returns the similarity of <code>user_id</code> to every user, indexed by <code>alt_user_id - 1</code>.
+        """
+        return self.similarities[user_id-1]
+
+
+# libm pow, matching the float(pow(x, y)) calls of the dictionary based algorithms bit for bit
+# (numpy's power fast-paths exponents 2 and 0.5 to square/sqrt, which round differently)
+_libm_pow = np.frompyfunc(pow, 2, 1)
+
+# neighbors are ranked on their similarity rounded to RANK_DECIMALS places, so that similarities differing only by
+# summation order (a few ulps, e.g. incremental statistics against a rebuilt matrix) tie, and ties go to the
+# lowest user_id. The similarities returned are not rounded.
+RANK_DECIMALS = 12
+
+
+def similarity_rank(similarities : np.ndarray | float) -> np.ndarray | float :
+    """
+        Returns the value(s) neighbors are ranked on: the similarity rounded to <code>RANK_DECIMALS</code> places.
+    """
+    return np.round(similarities, RANK_DECIMALS)
+
+
+def generate_similarity_matrix(ratings_per_user : UserRatingsDatabase, 
+                               ratings_matrix : RatingsMatrix | None = None) -> SimilarityMatrix :
+    """
+        Function calculates the Pearson similarity between every pair of users in a single pass over
+        a dense ratings matrix, rather than one dictionary walk per pair.<br>
+
+        Values are identical to <code>pearson_correlation_coeff_similarity_prediction</code>:
+        user means are taken over all of a user's ratings, deviations over co-rated movies only,
+        and 0.0 is returned for users without ratings or with zero covariance.<br>
+        Each row accumulates its sums in the same movie order as the dictionary walk
+        (a sequential <code>cumsum</code>), so no floating point drift is introduced.<br>
+
+        Parameters:<br>
+        - <strong>ratings_per_user</strong> (<code>UserRatingsDatabase</code>): database of ratings per user<br>
+        - <strong>ratings_matrix</strong>   (<code>RatingsMatrix</code>):       (optional) matrix view of the same database, if already built<br>
+
+        Returns:<br>
+        - <code>SimilarityMatrix</code>: similarity of each user to every other user
+    """
+    matrix       = ratings_matrix if ratings_matrix is not None else RatingsMatrix(ratings_per_user = ratings_per_user)
+    user_count   = matrix.user_count
+    # every (user, alt user) similarity is calculated, without a dictionary probe
+    count_event('similarity_calls', user_count * user_count)
+    similarities = np.zeros( (user_count, user_count), dtype=np.float64 )
+    # users without ratings have no defined mean -> similarity 0.0 (row and column)
+    has_ratings  = np.fromiter( (len(x) > 0 for x in matrix.rated_columns), dtype=bool, count=user_count )
+
+    # movie x user layouts, so that gathering a user's movies yields contiguous rows
+    mask_T       = np.ascontiguousarray(matrix.mask.T)
+    deviations   = np.where( matrix.mask, matrix.ratings - matrix.means[:, None], 0.0 )
+    # a user's deviations only take as many values as there are rating levels (1..5 for ml-100k),
+    # so the squares are looked up from a small per user table rather than calling pow per cell
+    levels       = np.unique( matrix.ratings[matrix.mask] )
+    level_table  = _libm_pow( levels[None, :] - matrix.means[:, None], 2 ).astype(np.float64)
+    level_index  = np.searchsorted( levels, matrix.ratings ).clip(0, max(len(levels)-1, 0))
+    squared_deviations = np.where( matrix.mask,
+                                   np.take_along_axis( level_table, level_index, axis=1 ) if len(levels) else 0.0,
+                                   0.0 )
+    deviations_T         = np.ascontiguousarray(deviations.T)
+    squared_deviations_T = np.ascontiguousarray(squared_deviations.T)
+
+    for x in range(user_count):
+        columns = matrix.rated_columns[x]
+        if not len(columns):
+            continue
+        # deviations of user X over its own ratings (c x 1)
+        dev_X    = deviations_T[columns, x][:, None]
+        sq_dev_X = squared_deviations_T[columns, x][:, None]
+        # sequential summations down X's movies, in X's rating order, for every user Y at once.
+        # cells Y did not rate contribute 0.0, which leaves a running sum unchanged
+        cov_summation      = np.cumsum( dev_X * deviations_T[columns], axis=0 )[-1]
+        stddev_summation_X = np.cumsum( np.where( mask_T[columns], sq_dev_X, 0.0 ), axis=0 )[-1]
+        stddev_summation_Y = np.cumsum( squared_deviations_T[columns], axis=0 )[-1]
+
+        valid = ( cov_summation != 0 ) & has_ratings
+        if not valid.any():
+            continue
+        stddev_X = _libm_pow( stddev_summation_X[valid], 0.5 ).astype(np.float64)
+        stddev_Y = _libm_pow( stddev_summation_Y[valid], 0.5 ).astype(np.float64)
+        similarities[x, valid] = cov_summation[valid] / ( stddev_X * stddev_Y )
+
+    return SimilarityMatrix(similarities = similarities)
+
+
+def rank_similar_users(user_id : int , similarity_matrix : SimilarityMatrix, k : int ) -> Tuple[np.ndarray , np.ndarray] :
+    """
+        Array form of <code>top_k_similar_users</code>: returns the 0 based indices (<code>user_id - 1</code>) of the
+        k users most similar to <code>user_id</code> and their similarities, ordered by similarity descending
+        (see <code>similarity_rank</code>), then user_id ascending.
+    """
+    row = similarity_matrix.get_row(user_id)
+    # candidate neighbors (all users but user_id), as 0 based indices in increasing user_id order
+    candidates   = np.delete( np.arange(similarity_matrix.user_count), user_id-1 )
+    similarities = np.asarray(row[candidates])
+    ranks        = similarity_rank(similarities)
+    k = max(min(k, len(candidates)), 0)
+    
+    if k < len(candidates):
+        if k == 0:
+            return candidates[:0], similarities[:0]
+        # rank of the k-th best neighbor
+        threshold = ranks[ np.argpartition(-ranks, k-1)[k-1] ]
+        above     = np.flatnonzero( ranks > threshold )
+        # users tied at the cutoff are taken lowest user_id first
+        tied      = np.flatnonzero( ranks == threshold )[: k-len(above)]
+        selected  = np.concatenate( (above, tied) )
+    else:
+        selected  = np.arange(len(candidates))
+    
+    # similarity descending, then user_id ascending
+    order = np.lexsort( ( candidates[selected], -ranks[selected] ) )
+    selected = selected[order]
+    return candidates[selected], similarities[selected]
+
+
+def top_k_similar_users(user_id : int , similarity_matrix : SimilarityMatrix, k : int ) -> List[Tuple[int , float]] :
+    """
+        Function selects the k users most similar to <code>user_id</code> from a precomputed 
+        <code>SimilarityMatrix</code>, ordered by similarity descending, then user_id ascending; similarities within
+        <code>RANK_DECIMALS</code> places of each other are ties.<br>
+        Selection is an <code>argpartition</code> followed by a sort of the k selected users only 
+        ( O(n + k log k) ), and any prefix of the result is itself the top result for a smaller k, 
+        so a single call can serve several neighborhood sizes.<br>
+        
+        Parameters:<br>
+        - <strong>user_id</strong>            (<code>int</code>):              the user in question<br>
+        - <strong>similarity_matrix</strong>  (<code>SimilarityMatrix</code>): precomputed user-user similarities<br>
+        - <strong>k</strong>                  (<code>int</code>):              number of neighbors desired<br>
+    
+        Returns:<br>
+        - <code>list</code> list of tuples of  neighbor id's and their similarity scores
+    """
+    neighbors, similarities = rank_similar_users(user_id, similarity_matrix, k)
+    return [ ( int(alt_user+1) , float(similarity) ) 
+             for alt_user, similarity in zip(neighbors, similarities) ]
+
+
+class ItemNeighbors:
+    """
+        Truncated item-item similarities: <code>neighbors[movie_id]</code> maps each of the (at most k) movies most
+        similar to <code>movie_id</code> to its similarity, best first.
+    """
+    def __init__(self, *, neighbors : dict, k : int) :
+        self.neighbors = neighbors
+        self.k         = k
+
+    def get_neighbors(self, movie_id : int) -> dict :
+        return self.neighbors.get(movie_id, {})
+
+
+def generate_item_neighbors(ratings_per_movie : MovieRatingsDatabase, user_count : int, k : int = 50,
+                            shrinkage : float = 100.0) -> ItemNeighbors :
+    """
+        Function computes the adjusted cosine similarity of every pair of movies, and keeps for each movie the k
+        most similar ones with a positive similarity.<br>
+        Adjusted cosine centers each rating on its rater's mean, then takes the cosine between two movies' rating
+        deviations over the users who rated both:<br>
+        sim(i, j) = sum( dev(u,i) dev(u,j) ) / ( sqrt( sum dev(u,i)^2 ) sqrt( sum dev(u,j)^2 ) ), over co-raters u.<br>
+        A similarity resting on few co-raters is mostly noise (two movies with one common rater are perfectly
+        similar), so each is shrunk by support / (support + <code>shrinkage</code>), support being the number of
+        co-raters. All pairs are computed with three matrix products over a dense movie x user matrix.<br>
+
+        Parameters:<br>
+        - <strong>ratings_per_movie</strong> (<code>MovieRatingsDatabase</code>): database of ratings per movie<br>
+        - <strong>user_count</strong>        (<code>int</code>):                  number of users (ids 1 to user_count)<br>
+        - <strong>k</strong>                 (<code>int</code>):                  neighbors kept per movie<br>
+        - <strong>shrinkage</strong>         (<code>float</code>):                support at which a similarity is halved<br>
+
+        Returns:<br>
+        - <code>ItemNeighbors</code>: top k neighbors of each movie
+    """
+    _ratings_per_movie = ratings_per_movie.movie_ratings
+    movie_count = ratings_per_movie.movie_count
+    ratings = np.zeros( (movie_count, user_count), dtype=np.float64 )
+    mask    = np.zeros( (movie_count, user_count), dtype=bool )
+    for movie_id in range(1, movie_count+1):
+        movie_ratings = _ratings_per_movie[movie_id].ratings
+        columns = np.fromiter( (user_id-1 for user_id in movie_ratings), dtype=np.intp, count=len(movie_ratings) )
+        ratings[movie_id-1, columns] = np.fromiter( movie_ratings.values(), dtype=np.float64, count=len(movie_ratings) )
+        mask[movie_id-1, columns]    = True
+
+    # rater means, from the columns
+    counts = mask.sum(axis=0)
+    means  = np.divide( ratings.sum(axis=0), counts, out=np.zeros(user_count), where=counts > 0 )
+    rated  = mask.astype(np.float64)
+    deviations = np.where( mask, ratings - means[None, :], 0.0 )
+    covariance = deviations @ deviations.T
+    # sum of i's squared deviations over the users who also rated j ( and transposed, j's over i's raters )
+    squared_summation = ( deviations * deviations ) @ rated.T
+    support           = rated @ rated.T
+    denominator  = np.sqrt(squared_summation) * np.sqrt(squared_summation.T)
+    similarities = np.zeros( covariance.shape, dtype=np.float64 )
+    np.divide( covariance, denominator, out=similarities, where=denominator > 0 )
+    np.multiply( similarities, support, out=similarities )
+    np.divide( similarities, support + shrinkage, out=similarities, where=( support + shrinkage ) > 0 )
+    np.fill_diagonal(similarities, 0.0)
+
+    neighbors = {}
+    k = max(min(k, movie_count-1), 0)
+    for movie_id in range(1, movie_count+1):
+        row = similarities[movie_id-1]
+        if k == 0:
+            neighbors[movie_id] = {}
+            continue
+        candidates = np.argpartition(-row, k-1)[:k]
+        candidates = candidates[ row[candidates] > 0 ]
+        # similarity descending, then movie_id ascending
+        candidates = candidates[ np.lexsort( ( candidates, -row[candidates] ) ) ]
+        neighbors[movie_id] = { int(candidate+1) : float(row[candidate]) for candidate in candidates }
+    return ItemNeighbors(neighbors = neighbors, k = k)
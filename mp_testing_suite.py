@@ -1,18 +1,34 @@
 from mp_prediction_algorithms import kNearestNeighbors, random_prediction, mean_user_rating_based_prediction
 from mp_prediction_algorithms import mean_movie_rating_based_prediction, demographic_based_prediction
-from mp_prediction_algorithms import genre_based_prediction, hybrid_based_prediction
+from mp_prediction_algorithms import genre_based_prediction, hybrid_based_prediction, hybrid_based_predictions_batch
 from mp_parsing_algorithms import generate_user_set, generate_movie_set, generate_genre_set, generate_ratings_database
 from mp_parsing_algorithms import generate_ratings_set 
-from mp_parsing_algorithms import RatingsDatabase, ParseDatabase, UserRatingsDatabase, MovieRatingsDatabase
-from mp_math_algorithms import rmse
+from mp_parsing_algorithms import RatingsDatabase, ParseDatabase, UserRatingsDatabase, MovieRatingsDatabase, RatingData
+from mp_metrics_algorithms import evaluate_predictions
+from mp_similarity_algorithms import generate_similarity_matrix, SimilarityMatrix, RatingsMatrix
+from mp_cache_algorithms import SimilarityCache
+from mp_index_algorithms import DemographicIndex, generate_demographic_index, GenreIndex, generate_genre_index
+from mp_incremental_algorithms import IncrementalRatingsDatabase
+from mp_factorization_algorithms import BiasedMatrixFactorization
+from mp_instrumentation_algorithms import Instrumentation, activate, stage, count_event
+from mp_format_algorithms import DatasetFormat, generate_user_set_for, generate_movie_set_for, generate_ratings_set_streamed
 from typing import List
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
 import random
+import heapq
+
+
+# releases whose dense users x users and users x movies matrices fit in memory; precision_testing refuses the others
+DENSE_EVALUATION_RELEASES = ('ml-100k', 'ml-1m')
 
 
 def generate_rmse_values( *, actual_ratings : List[int | float], predictions : List[int | float]) -> List[float]:
     """
         Function returns a list of rmse values calculated per algorithm result data passed through the
         predictions parameter.<br>
+        All algorithms are scored in one vectorized pass, see <code>evaluate_predictions</code>.<br>
         
         Parameters:<br>
         - <strong>actual_ratings</strong>   (<code>list</code>):   test dataset of actual ratings<br>
@@ -22,87 +38,237 @@ def generate_rmse_values( *, actual_ratings : List[int | float], predictions : L
         - <code>list</code>: resultant rmse values
     """
     #Returns a list of calculated RMSE values
-    output = []
-    #For each set of predictions
-    for algorithm in predictions:
-        #calculate the RMSE value
-        output.append(rmse(
-                            actual_ratings    = actual_ratings, 
-                            predicted_ratings = algorithm))    
-    return output
+    with stage('rmse'):
+        metrics = evaluate_predictions(
+                            actual_ratings = actual_ratings, 
+                            predictions    = predictions)
+    return [ algorithm.rmse for algorithm in metrics ]
 
 
-#USAGE: GENERATE LIST OF PREDICTIONS FOR THE 5 ALGORITHMS
-def generate_predictions( *, ratings_data : ParseDatabase, ratings_per_user : UserRatingsDatabase, 
-                                   ratings_per_movie : MovieRatingsDatabase, 
-                                   user_database : ParseDatabase, movie_database : ParseDatabase) -> dict:
-    
-    #list of true ratings
-    actual_ratings = []
-    #will provide a list of values for each algorithm implementation
-    algorithm_predictions = [[] for x in range(9)]
-    # similarity data per user
-    similar_users = {}
-    _ratings_data = ratings_data.get_data()
-    # calculating similarity data for each user as encountered in ratings dataset
-    for rating in _ratings_data:
-        rating_entry = _ratings_data[rating]
-        # has this user's similarity data been calculated ? 
-        if not (rating_entry.user_id in similar_users):
-            similar_users[rating_entry.user_id] = kNearestNeighbors(
-                        user_id          = rating_entry.user_id,
-                        ratings_per_user = ratings_per_user,
-                        k                = user_database.get_count())
-        #true rating
-        actual_ratings.append(rating_entry.rating)
-        #algorithm 1
-        algorithm_predictions[0].append(random_prediction())
-        #algorithm 2
-        algorithm_predictions[1].append(mean_user_rating_based_prediction(
+def predict_ratings_shard( rating_entries : List[RatingData], *, ratings_per_user : UserRatingsDatabase, 
+                           ratings_per_movie : MovieRatingsDatabase, 
+                           user_database : ParseDatabase, movie_database : ParseDatabase,
+                           similarity_matrix : SimilarityMatrix,
+                           ratings_matrix : RatingsMatrix | None = None,
+                           demographic_index : DemographicIndex | None = None,
+                           genre_index : GenreIndex | None = None,
+                           factor_model : BiasedMatrixFactorization | None = None,
+                           timed : bool = True ) -> List[List[float | None]]:
+    """
+        Function produces the predictions of algorithms 2 through 10 for a list of test ratings.<br>
+        The four hybrid algorithms are produced together in one batch, ranking each user's neighbors once.<br>
+        Each algorithm runs as its own pass over the test ratings, timed as a stage of the active instrumentation
+        unless <code>timed</code> is False (shards run concurrently in threads, whose wall and process CPU
+        times would add up).<br>
+        
+        Parameters:<br>
+        - <strong>rating_entries</strong>    (<code>list</code>):                 test ratings to predict<br>
+        - <strong>ratings_per_user</strong>  (<code>UserRatingsDatabase</code>):  training ratings per user<br>
+        - <strong>ratings_per_movie</strong> (<code>MovieRatingsDatabase</code>): training ratings per movie<br>
+        - <strong>user_database</strong>     (<code>ParseDatabase</code>):        database of user information
+          (None for releases without users: no demographic predictions)<br>
+        - <strong>movie_database</strong>    (<code>ParseDatabase</code>):        database of movie information<br>
+        - <strong>similarity_matrix</strong> (<code>SimilarityMatrix</code>):     similarities of the training set<br>
+        - <strong>ratings_matrix</strong>    (<code>RatingsMatrix</code>):        (optional) matrix view of the training ratings per user<br>
+        - <strong>demographic_index</strong> (<code>DemographicIndex</code>):     (optional) demographic index of the training set<br>
+        - <strong>genre_index</strong>       (<code>GenreIndex</code>):           (optional) genre index of the training set<br>
+        - <strong>factor_model</strong>      (<code>BiasedMatrixFactorization</code>): (optional) factor model fitted on the training set<br>
+        - <strong>timed</strong>             (<code>bool</code>):                 time each algorithm as a stage<br>
+        
+        Returns:<br>
+        - <code>list</code>: per algorithm list of predictions, in the order of <code>rating_entries</code>
+    """
+    timer = stage if timed else ( lambda name : nullcontext() )
+    #will provide a list of values for algorithms 2..10
+    algorithm_predictions = []
+    count_event('predictions', 9 * len(rating_entries))
+    #algorithm 2
+    with timer('predict:mean_user'):
+        algorithm_predictions.append([ mean_user_rating_based_prediction(
                                 user_id          = rating_entry.user_id, 
-                                ratings_per_user = ratings_per_user))
-        #algorithm 3
-        algorithm_predictions[2].append(mean_movie_rating_based_prediction(
+                                ratings_per_user = ratings_per_user) for rating_entry in rating_entries ])
+    #algorithm 3
+    with timer('predict:mean_movie'):
+        algorithm_predictions.append([ mean_movie_rating_based_prediction(
                                 movie_id          = rating_entry.movie_id, 
-                                ratings_per_movie = ratings_per_movie))
-        #algorithm 4
-        algorithm_predictions[3].append(demographic_based_prediction(
+                                ratings_per_movie = ratings_per_movie) for rating_entry in rating_entries ])
+    #algorithm 4 ~ no prediction without user demographics
+    with timer('predict:demographic'):
+        algorithm_predictions.append([ demographic_based_prediction(
                                 user_id           = rating_entry.user_id, 
                                 movie_id          = rating_entry.movie_id, 
                                 user_database     = user_database, 
-                                ratings_by_user   = ratings_per_user))
-        #algorithm 5
-        algorithm_predictions[4].append(genre_based_prediction(
+                                ratings_by_user   = ratings_per_user,
+                                demographic_index = demographic_index) for rating_entry in rating_entries ]
+                                if user_database is not None else [ None for rating_entry in rating_entries ])
+    #algorithm 5
+    with timer('predict:genre'):
+        algorithm_predictions.append([ genre_based_prediction(
                                 user_id           = rating_entry.user_id, 
                                 movie_id          = rating_entry.movie_id, 
                                 movie_database    = movie_database, 
-                                ratings_per_user  = ratings_per_user))
-        #algorithm 6
-        algorithm_predictions[5].append(hybrid_based_prediction(
-                                user_id          = rating_entry.user_id, 
-                                movie_id         = rating_entry.movie_id, 
-                                ratings_per_user = ratings_per_user, 
-                                similar_users    = similar_users[rating_entry.user_id][:10]))
-        #algorithm 7
-        algorithm_predictions[6].append(hybrid_based_prediction(
-                                user_id          = rating_entry.user_id, 
-                                movie_id         = rating_entry.movie_id, 
-                                ratings_per_user = ratings_per_user, 
-                                similar_users    = similar_users[rating_entry.user_id][:100]))
-        #algorithm 8
-        algorithm_predictions[7].append(hybrid_based_prediction(
-                                user_id          = rating_entry.user_id, 
-                                movie_id         = rating_entry.movie_id, 
-                                ratings_per_user = ratings_per_user, 
-                                similar_users    = similar_users[rating_entry.user_id][:500]))
-        #algorithm 9
-        algorithm_predictions[8].append(hybrid_based_prediction(
-                                user_id          = rating_entry.user_id, 
-                                movie_id         = rating_entry.movie_id, 
+                                ratings_per_user  = ratings_per_user,
+                                genre_index       = genre_index) for rating_entry in rating_entries ])
+    
+    if ratings_matrix is None:
+        with timer('ratings_matrix'):
+            ratings_matrix = RatingsMatrix(ratings_per_user = ratings_per_user)
+    #algorithms 6..9 ~ hybrid with the 10, 100, 500 and all most similar users
+    with timer('predict:hybrid'):
+        algorithm_predictions.extend(hybrid_based_predictions_batch(
+                                user_ids          = [ rating_entry.user_id for rating_entry in rating_entries ], 
+                                movie_ids         = [ rating_entry.movie_id for rating_entry in rating_entries ], 
+                                ratings_matrix    = ratings_matrix, 
+                                similarity_matrix = similarity_matrix, 
+                                k_values          = [10, 100, 500, None]))
+    if factor_model is None:
+        with timer('factorization_fit'):
+            factor_model = BiasedMatrixFactorization().fit(
                                 ratings_per_user = ratings_per_user, 
-                                similar_users    = similar_users[rating_entry.user_id]))
+                                movie_count      = ratings_per_movie.movie_count)
+    #algorithm 10 ~ biased matrix factorization
+    with timer('predict:factorization'):
+        algorithm_predictions.append(factor_model.predict_batch(
+                                user_ids  = [ rating_entry.user_id for rating_entry in rating_entries ], 
+                                movie_ids = [ rating_entry.movie_id for rating_entry in rating_entries ]))
+    return algorithm_predictions
+
+
+def shard_ratings_by_user( rating_entries : List[RatingData], shard_count : int ) -> List[List[int]]:
+    """
+        Function splits test ratings into at most <code>shard_count</code> shards, keeping all ratings of a user 
+        in the same shard so that the user's neighbors are calculated once.<br>
+        Users are assigned largest first to the least loaded shard.<br>
         
-    return { 'actual' : actual_ratings, 'predictions' :algorithm_predictions }
+        Returns:<br>
+        - <code>list</code>: per shard list of indices into <code>rating_entries</code>, in increasing order
+    """
+    indices_per_user = {}
+    for idx, rating_entry in enumerate(rating_entries):
+        indices_per_user.setdefault(rating_entry.user_id, []).append(idx)
+    
+    shards = [[] for x in range(max(min(shard_count, len(indices_per_user)), 1))]
+    # (load, shard number) heap
+    shard_loads = [ (0, x) for x in range(len(shards)) ]
+    for user_id in sorted(indices_per_user, key = lambda user: (-len(indices_per_user[user]), user)):
+        load, shard = heapq.heappop(shard_loads)
+        shards[shard].extend(indices_per_user[user_id])
+        heapq.heappush(shard_loads, (load + len(indices_per_user[user_id]), shard))
+    for shard in shards:
+        shard.sort()
+    return shards
+
+
+# data shared with a prediction worker process, set once per process by the pool initializer
+_prediction_worker_data : dict = {}
+
+def _initialize_prediction_worker( prediction_worker_data : dict ) -> None:
+    _prediction_worker_data.update(prediction_worker_data)
+
+def _run_prediction_worker( rating_entries : List[RatingData] ) -> List[List[float | None]]:
+    return predict_ratings_shard( rating_entries, **_prediction_worker_data )
+
+
+#USAGE: GENERATE LIST OF PREDICTIONS FOR THE 10 ALGORITHMS
+def generate_predictions( *, ratings_data : ParseDatabase, ratings_per_user : UserRatingsDatabase, 
+                                   ratings_per_movie : MovieRatingsDatabase, 
+                                   user_database : ParseDatabase, movie_database : ParseDatabase,
+                                   similarity_matrix : SimilarityMatrix | None = None,
+                                   workers : int = 1, pool : str = 'process') -> dict:
+    """
+        Function produces the predictions of each algorithm for every rating of the test set.<br>
+        With <code>workers</code> > 1 the test set is split into user-grouped shards which run on a 
+        process pool (<code>pool='process'</code>) or thread pool (<code>pool='thread'</code>), and are 
+        merged back in test set order. Results do not depend on the number of workers.<br>
+        Preparation and each algorithm are timed as stages of the active instrumentation. With workers > 1 the
+        shards are timed together as one 'predict:shards' stage instead: per algorithm stages are not recorded
+        in worker processes, nor in threads, where concurrent wall times and the process wide CPU time would be
+        counted once per thread.<br>
+        
+        Parameters:<br>
+        - <strong>ratings_data</strong>      (<code>ParseDatabase</code>):        test ratings<br>
+        - <strong>ratings_per_user</strong>  (<code>UserRatingsDatabase</code>):  training ratings per user<br>
+        - <strong>ratings_per_movie</strong> (<code>MovieRatingsDatabase</code>): training ratings per movie<br>
+        - <strong>user_database</strong>     (<code>ParseDatabase</code>):        database of user information (or None)<br>
+        - <strong>movie_database</strong>    (<code>ParseDatabase</code>):        database of movie information<br>
+        - <strong>similarity_matrix</strong> (<code>SimilarityMatrix</code>):     (optional) similarities of the training set<br>
+        - <strong>workers</strong>           (<code>int</code>):                  number of shards run concurrently<br>
+        - <strong>pool</strong>              (<code>str</code>):                  'process' or 'thread'<br>
+        
+        Returns:<br>
+        - <code>dict</code>: actual ratings, per algorithm predictions, and the user and movie of each test rating
+    """
+    # matrix view of the training ratings, shared by the similarity and hybrid calculations
+    with stage('ratings_matrix'):
+        ratings_matrix = RatingsMatrix(ratings_per_user = ratings_per_user)
+    # all user-user similarities for this training set, calculated in one pass (unless provided)
+    if similarity_matrix is None:
+        with stage('neighbors'):
+            similarity_matrix = generate_similarity_matrix(
+                                    ratings_per_user = ratings_per_user, 
+                                    ratings_matrix   = ratings_matrix)
+    _ratings_data  = ratings_data.get_data()
+    rating_entries = [ _ratings_data[rating] for rating in _ratings_data ]
+    
+    #list of true ratings
+    actual_ratings = [ rating_entry.rating for rating_entry in rating_entries ]
+    #will provide a list of values for each algorithm implementation
+    #algorithm 1 (drawn in test set order, so the random sequence does not depend on sharding)
+    with stage('predict:random'):
+        algorithm_predictions = [ [ random_prediction() for rating_entry in rating_entries ] ]
+    count_event('predictions', len(rating_entries))
+    
+    shard_data = {
+            'ratings_per_user'  : ratings_per_user,
+            'ratings_per_movie' : ratings_per_movie,
+            'user_database'     : user_database,
+            'movie_database'    : movie_database,
+            'similarity_matrix' : similarity_matrix,
+            'ratings_matrix'    : ratings_matrix
+        }
+    # per (movie, gender) age sorted ratings, for the demographic algorithm
+    if user_database is not None:
+        with stage('demographic_index'):
+            shard_data['demographic_index'] = generate_demographic_index(
+                                            user_database    = user_database, 
+                                            ratings_per_user = ratings_per_user)
+    # per user, per genre combination totals, for the genre algorithm
+    with stage('genre_index'):
+        shard_data['genre_index']       = generate_genre_index(
+                                        movie_database   = movie_database, 
+                                        ratings_per_user = ratings_per_user)
+    # latent factors of the training set, fitted once rather than per shard
+    with stage('factorization_fit'):
+        shard_data['factor_model']      = BiasedMatrixFactorization().fit(
+                                        ratings_per_user = ratings_per_user, 
+                                        movie_count      = ratings_per_movie.movie_count)
+    if workers <= 1:
+        algorithm_predictions.extend(predict_ratings_shard( rating_entries, **shard_data ))
+    else:
+        shards = shard_ratings_by_user( rating_entries, workers )
+        shard_entries = [ [ rating_entries[idx] for idx in shard ] for shard in shards ]
+        with stage('predict:shards'):
+            if pool == 'thread':
+                with ThreadPoolExecutor( max_workers = workers ) as executor:
+                    shard_predictions = list(executor.map(
+                                            lambda entries: predict_ratings_shard( entries, **shard_data, timed = False ), shard_entries))
+            else:
+                with ProcessPoolExecutor( max_workers = workers, 
+                                          initializer = _initialize_prediction_worker, 
+                                          initargs    = (shard_data,) ) as executor:
+                    shard_predictions = list(executor.map(_run_prediction_worker, shard_entries))
+        # merge back into test set order
+        for algorithm in range(9):
+            merged = [None] * len(rating_entries)
+            for shard, predictions in zip(shards, shard_predictions):
+                for idx, prediction in zip(shard, predictions[algorithm]):
+                    merged[idx] = prediction
+            algorithm_predictions.append(merged)
+        
+    return { 'actual'      : actual_ratings, 
+             'predictions' : algorithm_predictions,
+             'user_ids'    : [ rating_entry.user_id for rating_entry in rating_entries ],
+             'movie_ids'   : [ rating_entry.movie_id for rating_entry in rating_entries ] }
 
 def partition_ratings_parse_database( *, database : ParseDatabase, percent_tests : int ) -> dict:
     """
@@ -141,55 +307,231 @@ def partition_ratings_parse_database( *, database : ParseDatabase, percent_tests
     #return resultant data structures
     return { 'train': training_database, 'test' : test_database }
 
-#USAGE: FUNCTION TAKES THE TEMPLATED ALGORITHMS AND PRODUCES 'DEGREE' NUMBER OF PREDICTION RESULTS VIA CROSS-VALIDATION
-def precision_testing(*, degree : int , test_class_size_percent : int ) -> List[any]:
-    #load data structures
-    user_database  = generate_user_set()
-    movie_database = generate_movie_set()
-    ratings        = generate_ratings_set()
-
-    i = 0
-    #Extract per algorithm data
-    algorithm_data = [[] for x in range(9)]
-    while (i < degree): 
-        #print('iteration ', i)
-        # create a partition of training set and testing set
+def cross_validation_fold( *, user_database : ParseDatabase, movie_database : ParseDatabase, ratings : ParseDatabase,
+                           test_class_size_percent : int, fold_seed : int | None = None,
+                           similarity_cache : SimilarityCache | None = None,
+                           incremental_database : IncrementalRatingsDatabase | None = None,
+                           user_count : int | None = None, movie_count : int | None = None ) -> List[float]:
+    """
+        Function runs a single cross-validation fold: partitions the ratings, builds the training databases,
+        produces predictions for the test set and scores each algorithm.<br>
+        Each step is timed as a stage of the active instrumentation, if any (see <code>precision_testing</code>).<br>
+        
+        Parameters:<br>
+        - <strong>user_database</strong>           (<code>ParseDatabase</code>):   database of user information (or None)<br>
+        - <strong>movie_database</strong>          (<code>ParseDatabase</code>):   database of movie information<br>
+        - <strong>ratings</strong>                 (<code>ParseDatabase</code>):   all ratings, as loaded from generate_ratings_set<br>
+        - <strong>test_class_size_percent</strong> (<code>int</code>):             the percentage of ratings designated as the test set<br>
+        - <strong>fold_seed</strong>               (<code>int</code>):             (optional) seed for the partition and random predictions<br>
+        - <strong>similarity_cache</strong>        (<code>SimilarityCache</code>): (optional) cache of similarity matrices<br>
+        - <strong>incremental_database</strong>    (<code>IncrementalRatingsDatabase</code>): (optional) database of all ratings,
+          turned into the training database by removing the test ratings instead of building one<br>
+        - <strong>user_count</strong>              (<code>int</code>):             (optional) largest user id, else the number of users<br>
+        - <strong>movie_count</strong>             (<code>int</code>):             (optional) largest movie id, else the number of movies<br>
+        
+        Returns:<br>
+        - <code>list</code>: rmse value per algorithm
+    """
+    # reproducible fold ?
+    if fold_seed is not None:
+        random.seed(fold_seed)
+    # ids of the later releases are not contiguous, their databases are sized by the largest id
+    if user_count is None:
+        user_count  = user_database.get_count()
+    if movie_count is None:
+        movie_count = movie_database.get_count()
+    # create a partition of training set and testing set
+    with stage('partition'):
         data_set = partition_ratings_parse_database(
                 database       = ratings, 
                 percent_tests = test_class_size_percent)
-        #print('data set partitioned')
-        # create a ratings_per_user and ratings_per_movie which regards to the training set.
-        training_set = generate_ratings_database(
-                user_count   = user_database.get_count(), 
-                movie_count  = movie_database.get_count(), 
-                ratings_data = data_set['train'])
-        train_ratings_per_user  = training_set.ratings_per_user
-        train_ratings_per_movie = training_set.ratings_per_movie
-        #print('training set created')
-        #Produce algorithmic predictions and actual ratings
-        prediction_data       = generate_predictions(
-                                    ratings_data      = data_set['test'], 
-                                    ratings_per_user  = train_ratings_per_user, 
-                                    ratings_per_movie = train_ratings_per_movie, 
-                                    user_database     = user_database, 
-                                    movie_database    = movie_database)
-        actual_ratings        = prediction_data['actual']
-        algorithm_predictions = prediction_data['predictions']
-        #print('predictions produced')
-        result = (generate_rmse_values(
-            actual_ratings = actual_ratings, 
-            predictions    = algorithm_predictions))
-        #print('rmse values produced')
-        algorithm_data[0].append(result[0])
-        algorithm_data[1].append(result[1])
-        algorithm_data[2].append(result[2])
-        algorithm_data[3].append(result[3])
-        algorithm_data[4].append(result[4])
-        algorithm_data[5].append(result[5])
-        algorithm_data[6].append(result[6])
-        algorithm_data[7].append(result[7])
-        algorithm_data[8].append(result[8])
-        i += 1
+    # create a ratings_per_user and ratings_per_movie which regards to the training set.
+    with stage('training_database'):
+        if incremental_database is not None:
+            training_set = incremental_database.apply_fold(data_set['test'])
+        else:
+            training_set = generate_ratings_database(
+                    user_count   = user_count, 
+                    movie_count  = movie_count, 
+                    ratings_data = data_set['train'])
+    train_ratings_per_user  = training_set.ratings_per_user
+    train_ratings_per_movie = training_set.ratings_per_movie
+    # reuse similarities of a training set seen on a previous run
+    similarity_matrix = None
+    if similarity_cache is not None:
+        with stage('neighbors'):
+            similarity_matrix = similarity_cache.get_similarity_matrix(
+                                ratings_data     = data_set['train'], 
+                                ratings_per_user = train_ratings_per_user)
+    elif incremental_database is not None:
+        with stage('neighbors'):
+            similarity_matrix = incremental_database.similarity_matrix()
+    #Produce algorithmic predictions and actual ratings
+    prediction_data       = generate_predictions(
+                                ratings_data      = data_set['test'], 
+                                ratings_per_user  = train_ratings_per_user, 
+                                ratings_per_movie = train_ratings_per_movie, 
+                                user_database     = user_database, 
+                                movie_database    = movie_database,
+                                similarity_matrix = similarity_matrix)
+    actual_ratings        = prediction_data['actual']
+    algorithm_predictions = prediction_data['predictions']
+    return generate_rmse_values(
+        actual_ratings = actual_ratings, 
+        predictions    = algorithm_predictions)
+
+
+# data shared with a fold worker process, set once per process by the pool initializer
+_fold_worker_data : dict = {}
+
+def _initialize_fold_worker( fold_worker_data : dict ) -> None:
+    _fold_worker_data.update(fold_worker_data)
+
+def _run_fold_worker( fold_seed : int, instrumented : bool = False ) -> tuple:
+    # (rmse values, the fold's stages and counters ~ None unless instrumented)
+    if not instrumented:
+        return cross_validation_fold( fold_seed = fold_seed, **_fold_worker_data ), None
+    instrumentation = Instrumentation()
+    instrumentation.begin_fold()
+    with activate(instrumentation):
+        rmse_values = cross_validation_fold( fold_seed = fold_seed, **_fold_worker_data )
+    return rmse_values, instrumentation.folds[0]
+
+
+def _precision_testing_folds( *, degree : int, test_class_size_percent : int, similarity_cache : SimilarityCache | None,
+                              workers : int, seed : int | None, incremental : bool,
+                              instrumentation : Instrumentation | None,
+                              dataset : DatasetFormat | None, directory : str | None ) -> List[List[float]]:
+    # rmse values per fold, in fold order (see precision_testing)
+    #load data structures
+    with stage('load'):
+        if dataset is None:
+            user_database  = generate_user_set()
+            movie_database = generate_movie_set()
+            ratings        = generate_ratings_set()
+        else:
+            user_database  = generate_user_set_for(dataset, directory)
+            movie_database = generate_movie_set_for(dataset, directory)
+            ratings        = generate_ratings_set_streamed(dataset, directory)
+    # databases sized by the largest id (the counts, for ml-100k)
+    _ratings = ratings.get_data()
+    user_count  = max( ( _ratings[entry].user_id for entry in _ratings ), default = 0 )
+    movie_count = max( ( _ratings[entry].movie_id for entry in _ratings ), default = 0 )
+    if user_database is not None:
+        user_count  = max( user_count, user_database.get_count() )
+    movie_count = max( movie_count, movie_database.get_count() )
+    
+    fold_data = {
+            'user_database'           : user_database,
+            'movie_database'          : movie_database,
+            'ratings'                 : ratings,
+            'test_class_size_percent' : test_class_size_percent,
+            'similarity_cache'        : similarity_cache,
+            'user_count'              : user_count,
+            'movie_count'             : movie_count
+        }
+    if incremental:
+        with stage('incremental_database'):
+            fold_data['incremental_database'] = IncrementalRatingsDatabase(
+                                                user_count   = user_count,
+                                                movie_count  = movie_count,
+                                                ratings_data = ratings)
+    # seed per fold
+    if seed is not None:
+        fold_seeds = [ seed + i for i in range(degree) ]
+    elif workers > 1:
+        # forked workers would otherwise share one random state
+        fold_seeds = [ random.randrange(2**32) for i in range(degree) ]
+    else:
+        fold_seeds = [ None for i in range(degree) ]
+
+    results = []
+    if workers > 1:
+        with ProcessPoolExecutor( max_workers      = workers, 
+                                  initializer      = _initialize_fold_worker, 
+                                  initargs         = (fold_data,) ) as executor:
+            # results are returned in fold order
+            for rmse_values, fold in executor.map(_run_fold_worker, fold_seeds, repeat(instrumentation is not None)):
+                results.append(rmse_values)
+                if fold is not None:
+                    instrumentation.merge_fold(fold)
+    else:
+        i = 0
+        while (i < degree): 
+            if instrumentation is not None:
+                instrumentation.begin_fold()
+            results.append(cross_validation_fold( fold_seed = fold_seeds[i], **fold_data ))
+            i += 1
+    return results
+
+
+#USAGE: FUNCTION TAKES THE TEMPLATED ALGORITHMS AND PRODUCES 'DEGREE' NUMBER OF PREDICTION RESULTS VIA CROSS-VALIDATION
+def precision_testing(*, degree : int , test_class_size_percent : int , 
+                      similarity_cache : SimilarityCache | None = None ,
+                      workers : int = 1 , seed : int | None = None ,
+                      incremental : bool = False ,
+                      instrumentation : Instrumentation | None = None ,
+                      dataset : DatasetFormat | None = None ,
+                      directory : str | None = None ) -> List[any]:
+    """
+        Function produces <code>degree</code> rmse results per algorithm via cross-validation.<br>
+        With <code>workers</code> > 1 the folds run in a process pool; the parsed user, movie and ratings
+        sets are handed to each worker process once, rather than with every fold.<br>
+        Fold i is seeded with <code>seed + i</code>, so for a given seed serial and parallel runs produce
+        identical results. Without a seed, serial runs use the global random state as is, and parallel 
+        runs draw their fold seeds from it.<br>
+        With <code>incremental</code> a database of all ratings is built once (per worker process), and each fold
+        removes its test ratings from it, see <code>IncrementalRatingsDatabase</code>.<br>
+        With <code>instrumentation</code> the run is recorded into it: wall and CPU seconds per stage (loading,
+        partitioning, training database, neighbors, indices, each algorithm's predictions, rmse), summed and per
+        fold, counters such as similarity calculations and dictionary probes, and, if enabled, a cProfile and
+        tracemalloc summary; <code>instrumentation.report()</code> returns them alongside the rmse values.
+        Folds run in worker processes report their stages and counters back to it.<br>
+        With <code>dataset</code> (one of <code>DATASET_FORMATS</code>) the folds run on that release, read from
+        <code>directory</code> or its default directory; releases without users (ml-10m on) have no demographic
+        predictions, whose rmse is then None. The similarity and ratings matrices are dense (users x users,
+        users x movies) and every rating is parsed into a <code>RatingData</code>, so only the releases of
+        <code>DENSE_EVALUATION_RELEASES</code> are accepted; ml-10m and later raise a ValueError before anything is loaded.<br>
+        
+        Parameters:<br>
+        - <strong>degree</strong>                  (<code>int</code>):             number of folds<br>
+        - <strong>test_class_size_percent</strong> (<code>int</code>):             the percentage of ratings designated as the test set<br>
+        - <strong>similarity_cache</strong>        (<code>SimilarityCache</code>): (optional) cache of similarity matrices<br>
+        - <strong>workers</strong>                 (<code>int</code>):             number of worker processes<br>
+        - <strong>seed</strong>                    (<code>int</code>):             (optional) base seed for the folds<br>
+        - <strong>incremental</strong>             (<code>bool</code>):            update one database per fold instead of rebuilding it<br>
+        - <strong>instrumentation</strong>         (<code>Instrumentation</code>): (optional) receives the stage timers and counters<br>
+        - <strong>dataset</strong>                 (<code>DatasetFormat</code>):   (optional) release to test on, else ml-100k<br>
+        - <strong>directory</strong>               (<code>str</code>):             (optional) location of the release<br>
+        
+        Returns:<br>
+        - <code>list</code>: per algorithm list of rmse values, one per fold
+    """
+    if dataset is not None and dataset.name not in DENSE_EVALUATION_RELEASES:
+        raise ValueError(f'precision_testing cannot evaluate {dataset.name}: its dense similarity and ratings matrices '
+                         f'would not fit in memory (supported: {", ".join(DENSE_EVALUATION_RELEASES)})')
+    with activate(instrumentation):
+        if instrumentation is not None:
+            instrumentation.start()
+        try:
+            results = _precision_testing_folds( degree                  = degree, 
+                                                test_class_size_percent = test_class_size_percent, 
+                                                similarity_cache        = similarity_cache, 
+                                                workers                 = workers, 
+                                                seed                    = seed, 
+                                                incremental             = incremental,
+                                                instrumentation         = instrumentation,
+                                                dataset                 = dataset,
+                                                directory               = directory)
+        finally:
+            if instrumentation is not None:
+                instrumentation.stop()
+    
+    #Extract per algorithm data
+    algorithm_data = [[] for x in range(10)]
+    for result in results:
+        for algorithm, rmse_value in enumerate(result):
+            algorithm_data[algorithm].append(rmse_value)
     
     #Return testing results   
     return algorithm_data
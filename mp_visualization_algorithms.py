@@ -4,6 +4,7 @@ import numpy as np
 from typing import List
 from mp_parsing_algorithms import ParseDatabase, UserRatingsDatabase
 from mp_math_algorithms import calculate_per_genre_ratings_ratios_byGender, calculate_quartile_data
+from mp_aggregation_algorithms import GenreRatingsCube
 
 
 def extract_list_from_dict(key_legend : List[any], d : dict):
@@ -112,14 +113,21 @@ def create_whisker_plot(data_set : List[any] , filename : str, title : str ,
 def genre_ratings_ratios_by_gender_asLists(user_database : ParseDatabase, movie_database : ParseDatabase,
                                            genre_database : ParseDatabase,
                                            ratings_per_user : UserRatingsDatabase , age_range, 
-                                           rating_range, genre_indices : List[int]) -> dict :
-    dataset_Male_vs_Female = calculate_per_genre_ratings_ratios_byGender(
-        user_database    = user_database, 
-        movie_database   = movie_database,
-        ratings_per_user = ratings_per_user, 
-        age_range        = age_range, 
-        rating_range     = rating_range,
-        genre_count      = genre_database.get_count())
+                                           rating_range, genre_indices : List[int],
+                                           ratings_cube : GenreRatingsCube | None = None) -> dict :
+    # a count cube of the same databases answers the slice without rescanning the ratings
+    if ratings_cube is not None:
+        dataset_Male_vs_Female = ratings_cube.genre_ratios(
+            age_range        = age_range, 
+            rating_range     = rating_range)
+    else:
+        dataset_Male_vs_Female = calculate_per_genre_ratings_ratios_byGender(
+            user_database    = user_database, 
+            movie_database   = movie_database,
+            ratings_per_user = ratings_per_user, 
+            age_range        = age_range, 
+            rating_range     = rating_range,
+            genre_count      = genre_database.get_count())
     dataset_Male_List   = extract_list_from_dict(genre_indices, dataset_Male_vs_Female['M'])
     dataset_Female_List = extract_list_from_dict(genre_indices, dataset_Male_vs_Female['F'])
     
@@ -1,5 +1,6 @@
 from mp_parsing_algorithms import ParseDatabase, UserRatingsDatabase
 from mp_visualization_algorithms import genre_ratings_ratios_by_gender_asLists, create_bar_plot
+from mp_aggregation_algorithms import generate_genre_ratings_cube
 from matplotlib.backends.backend_pdf import PdfPages
 from typing import List
 
@@ -16,6 +17,12 @@ def visualize_gender_rating_data(user_database : ParseDatabase, movie_database :
     # genre indicies ->('Action', 'Comedy', 'Drama', 'Horror',  'Romance')
     # retrieve database indices of desired genres to plot
     genre_indices = [ genre_database.get_data()[x] for x in genres_to_disply ]
+    # every rating tallied once, each slice below is read from the cube
+    ratings_cube  = generate_genre_ratings_cube(
+        user_database    = user_database, 
+        movie_database   = movie_database,
+        ratings_per_user = ratings_per_user, 
+        genre_count      = genre_database.get_count())
     
     # Loading plot data 
     #---------------Female and Male differences-----------------------------------------
@@ -27,7 +34,8 @@ def visualize_gender_rating_data(user_database : ParseDatabase, movie_database :
         ratings_per_user = ratings_per_user, 
         age_range        = [0,9999], 
         rating_range     = [4,5],
-        genre_indices    = genre_indices)
+        genre_indices    = genre_indices,
+        ratings_cube     = ratings_cube)
     
     # Low ratings
     dataset_Male_vs_Female_Low_Ratings = genre_ratings_ratios_by_gender_asLists(
@@ -37,7 +45,8 @@ def visualize_gender_rating_data(user_database : ParseDatabase, movie_database :
         ratings_per_user = ratings_per_user, 
         age_range        = [0,9999], 
         rating_range     = [1,2],
-        genre_indices    = genre_indices)
+        genre_indices    = genre_indices,
+        ratings_cube     = ratings_cube)
     #----------------Younger and older differences--------------------------------------
     #Younger - High
     dataset_Young_High_Ratings = genre_ratings_ratios_by_gender_asLists(
@@ -47,7 +56,8 @@ def visualize_gender_rating_data(user_database : ParseDatabase, movie_database :
         ratings_per_user = ratings_per_user, 
         age_range        = [20,30], 
         rating_range     = [4,5],
-        genre_indices    = genre_indices)
+        genre_indices    = genre_indices,
+        ratings_cube     = ratings_cube)
     #Younger - Low
     dataset_Young_Low_Ratings = genre_ratings_ratios_by_gender_asLists(
         user_database    = user_database, 
@@ -56,7 +66,8 @@ def visualize_gender_rating_data(user_database : ParseDatabase, movie_database :
         ratings_per_user = ratings_per_user, 
         age_range        = [20,30], 
         rating_range     = [1,2],
-        genre_indices    = genre_indices)
+        genre_indices    = genre_indices,
+        ratings_cube     = ratings_cube)
     #Older - High
     dataset_Old_High_Ratings = genre_ratings_ratios_by_gender_asLists(
         user_database    = user_database, 
@@ -65,7 +76,8 @@ def visualize_gender_rating_data(user_database : ParseDatabase, movie_database :
         ratings_per_user = ratings_per_user, 
         age_range        = [50,60], 
         rating_range     = [4,5],
-        genre_indices    = genre_indices)
+        genre_indices    = genre_indices,
+        ratings_cube     = ratings_cube)
     #Older - Low
     dataset_Old_Low_Ratings = genre_ratings_ratios_by_gender_asLists(
         user_database    = user_database, 
@@ -74,7 +86,8 @@ def visualize_gender_rating_data(user_database : ParseDatabase, movie_database :
         ratings_per_user = ratings_per_user, 
         age_range        = [50,60], 
         rating_range     = [1,2],
-        genre_indices    = genre_indices)
+        genre_indices    = genre_indices,
+        ratings_cube     = ratings_cube)
     #-----------------------------------------------------------------------------------
     y_axis_description = 'Ratio (%) (# of target ratings) / (total # of ratings in given demographic)'
     #PLOT 1 MALE VS FEMALE (HIGH RATINGS)
@@ -0,0 +1,19 @@
+import gc
+import asyncio
+from mp_service_algorithms import PredictionServer, generate_prediction_model
+
+HOST = '127.0.0.1'
+PORT = 8765
+
+async def serve() -> None:
+    # databases, indices and similarities are loaded once, then shared by every request
+    model   = generate_prediction_model()
+    # the loaded databases live as long as the process, keep them out of garbage collection passes
+    gc.freeze()
+    server  = PredictionServer(model)
+    address = await server.start(host = HOST, port = PORT)
+    print(f'serving predictions on {address[0]}:{address[1]}')
+    await server.serve_forever()
+
+if __name__ == '__main__':
+    asyncio.run(serve())